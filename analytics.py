@@ -0,0 +1,202 @@
+# analytics.py
+"""
+Attendance Analytics Queries
+- Present/absent counts per student, class, period and date computed in
+  the database (GROUP BY + SUM(CASE ...)), returned as plain rows/dicts -
+  no Student/Attendance objects are loaded
+- Reads the rollup tables of attendance_rollups.py when their triggers are
+  installed, otherwise aggregates the attendance table directly
+- 'present' and 'absent' count records with exactly that status (any case);
+  records with another status are in neither count nor in total_records
+- Used by the analytics pages, the comprehensive report and verify_class_stats.py
+- attendance_export_rows(): the attendance records of the CSV exports as one
+  Attendance JOIN Student projection
+"""
+
+from sqlalchemy import select, func, case, text, literal
+from models import Student, Attendance, AttendanceStudentTotal, AttendancePeriodTotal, AttendanceDateTotal
+
+ROLLUPS = 'rollups'
+ATTENDANCE = 'attendance'
+
+_rollup_engines = set()  # engines known to have the rollup triggers
+
+def rollups_installed(db):
+    """True when the rollup triggers exist in the session's database"""
+    bind = db.get_bind()
+    if bind in _rollup_engines:
+        return True
+    if bind.dialect.name != 'sqlite':
+        return False
+    installed = db.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'attendance_rollup_insert'"
+    )).first() is not None
+    if installed:
+        _rollup_engines.add(bind)
+    return installed
+
+def _source(db, source):
+    if source is None:
+        return ROLLUPS if rollups_installed(db) else ATTENDANCE
+    if source not in (ROLLUPS, ATTENDANCE):
+        raise ValueError(f"Unknown analytics source: {source}")
+    return source
+
+def _grouped(key, source, rollup):
+    """
+    Subquery of (key, present, absent) per key value.
+    
+    Args:
+        key: Attendance column to group by
+        source: ROLLUPS or ATTENDANCE
+        rollup: Rollup model keyed by the same column
+    """
+    if source == ROLLUPS:
+        table = rollup.__table__
+        return select(
+            table.c[key.key].label('key'),
+            table.c.present.label('present'),
+            table.c.absent.label('absent')
+        ).where(table.c.present + table.c.absent > 0).subquery()
+    
+    status = func.lower(Attendance.status)
+    return select(
+        key.label('key'),
+        func.sum(case((status == 'present', 1), else_=0)).label('present'),
+        func.sum(case((status == 'absent', 1), else_=0)).label('absent')
+    ).group_by(key).subquery()
+
+def _counts(db, key, source, rollup):
+    grouped = _grouped(key, _source(db, source), rollup)
+    return {row.key: (int(row.present), int(row.absent)) for row in db.execute(select(grouped))}
+
+def period_counts(db, source=None):
+    """{period: (present, absent)}"""
+    return _counts(db, Attendance.period, source, AttendancePeriodTotal)
+
+def date_counts(db, source=None):
+    """{date: (present, absent)}"""
+    return _counts(db, Attendance.date, source, AttendanceDateTotal)
+
+def student_rows(db, source=None, order_by=(Student.id,)):
+    """
+    One row per student with their attendance counts (0/0 when they have no records).
+    
+    Returns:
+        rows: id, name, roll_no, class_name, email, enrolled (bool), present, absent
+    """
+    grouped = _grouped(Attendance.student_id, _source(db, source), AttendanceStudentTotal)
+    query = select(
+        Student.id, Student.name, Student.roll_no, Student.class_name, Student.email,
+        Student.encodings_path.isnot(None).label('enrolled'),
+        func.coalesce(grouped.c.present, 0).label('present'),
+        func.coalesce(grouped.c.absent, 0).label('absent')
+    ).outerjoin(grouped, grouped.c.key == Student.id).order_by(*order_by)
+    return db.execute(query).all()
+
+def class_stats(db, source=None):
+    """
+    {class name ('No Class' when unset): {'students', 'total_records', 'present', 'absent'}}
+    
+    total_records is present + absent: records with another status are not counted.
+    """
+    grouped = _grouped(Attendance.student_id, _source(db, source), AttendanceStudentTotal)
+    class_name = func.coalesce(Student.class_name, literal('No Class'))
+    query = select(
+        class_name.label('class_name'),
+        func.count(Student.id).label('students'),
+        func.coalesce(func.sum(grouped.c.present), 0).label('present'),
+        func.coalesce(func.sum(grouped.c.absent), 0).label('absent')
+    ).outerjoin(grouped, grouped.c.key == Student.id).group_by(class_name)
+    
+    return {
+        row.class_name: {
+            'students': row.students,
+            'total_records': int(row.present + row.absent),
+            'present': int(row.present),
+            'absent': int(row.absent)
+        }
+        for row in db.execute(query)
+    }
+
+def overview(db, source=None):
+    """
+    Statistics shared by the teacher and admin analytics pages
+    (template variables of reports_analytics.html / admin_analytics.html).
+    """
+    source = _source(db, source)
+    students = student_rows(db, source)
+    by_period = period_counts(db, source)
+    by_class = class_stats(db, source)
+    
+    # Student-wise statistics
+    student_stats = []
+    for student in students:
+        present_count, absent_count = int(student.present), int(student.absent)
+        total_records = present_count + absent_count
+        attendance_percentage = (present_count / total_records * 100) if total_records > 0 else 0
+        student_stats.append({
+            'id': student.id,
+            'name': student.name,
+            'roll_no': student.roll_no,
+            'class_name': student.class_name or '-',
+            'total_records': total_records,
+            'present': present_count,
+            'absent': absent_count,
+            'percentage': round(attendance_percentage, 2)
+        })
+    
+    # Sort by percentage (descending)
+    student_stats.sort(key=lambda x: x['percentage'], reverse=True)
+    
+    period_stats = {
+        period: {'total': present + absent, 'present': present, 'absent': absent}
+        for period, (present, absent) in by_period.items()
+    }
+    
+    # Calculate overall statistics
+    total_present = sum(present for present, _ in by_period.values())
+    total_absent = sum(absent for _, absent in by_period.values())
+    total_attendance_records = total_present + total_absent
+    overall_percentage = (total_present / total_attendance_records * 100) if total_attendance_records > 0 else 0
+    
+    # Prepare chart data (arrays for Chart.js)
+    class_names = sorted(by_class.keys())
+    period_names = sorted(period_stats.keys())
+    enrolled_students = sum(1 for s in students if s.enrolled)
+    
+    return {
+        'total_students': len(students),
+        'enrolled_students': enrolled_students,
+        'pending_students': len(students) - enrolled_students,
+        'classes': list(set([s.class_name for s in students if s.class_name])),
+        'total_attendance_records': total_attendance_records,
+        'total_present': total_present,
+        'total_absent': total_absent,
+        'overall_percentage': overall_percentage,
+        'student_stats': student_stats,
+        'period_stats': period_stats,
+        'class_stats': by_class,
+        'class_names': class_names,
+        'class_present_data': [by_class[c]['present'] for c in class_names],
+        'class_absent_data': [by_class[c]['absent'] for c in class_names],
+        'period_names': period_names,
+        'period_present_data': [period_stats[p]['present'] for p in period_names],
+        'period_absent_data': [period_stats[p]['absent'] for p in period_names]
+    }
+
+def attendance_export_rows(db, yield_per=1000):
+    """
+    Every attendance record with its student, newest first, as plain tuples
+    fetched in batches (one query; records of deleted students are skipped).
+    
+    Returns:
+        rows: Iterable of (date, period, status, roll_no, name, class_name)
+    """
+    query = select(
+        Attendance.date, Attendance.period, Attendance.status,
+        Student.roll_no, Student.name, Student.class_name
+    ).join(Student, Student.id == Attendance.student_id).order_by(
+        Attendance.date.desc(), Attendance.period, Attendance.id
+    )
+    return db.execute(query.execution_options(yield_per=yield_per))
@@ -1,19 +1,30 @@
 # app.py
+import io
 import os
-import csv
-import cv2
-import base64
-import numpy as np
-from io import StringIO
-from datetime import datetime, timedelta
-from collections import defaultdict
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload, raiseload
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models import Base, engine, SessionLocal, User, Student, Timetable, Attendance
+from models import Base, engine, SessionLocal, db_session, User, Student, Timetable, Attendance, as_date
+from frame_stream import FrameStream
+from attendance_sessions import SessionManager
+from attendance_writer import insert_absentees
+from attendance_rollups import install_rollups
+import analytics
+from csv_stream import csv_response, YIELD_PER
+from user_cache import UserCache
+import student_import
 
 # Create database tables
 Base.metadata.create_all(engine)
+install_rollups(engine)
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this-in-production'  # Change this in production!
@@ -23,27 +34,52 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Global variable for face recognition enrolled students
-ENROLLED = {}
+@app.teardown_appcontext
+def shutdown_session(exception=None):
+    """End the request's database session (uncommitted changes are rolled back)"""
+    db_session.remove()
 
-# Load enrolled students at startup
-def init_face_recognition():
-    """Load all face encodings at application startup"""
-    global ENROLLED
-    try:
-        from face_utils import load_all_enrollments
-        ENROLLED = load_all_enrollments()
-        print(f"✅ Loaded {len(ENROLLED)} enrolled students for face recognition")
-    except Exception as e:
-        print(f"⚠️ Warning: Could not load face encodings: {e}")
-        ENROLLED = {}
+# Face recognition (OpenCV, DeepFace/TensorFlow) lives in recognition_service.py
+# and is imported on first use. Set ATTENDANCE_RECOGNITION=0 for workers that only
+# serve dashboards, reports and timetables - they then never load it at all.
+RECOGNITION_ENABLED = os.environ.get('ATTENDANCE_RECOGNITION', '1') != '0'
+
+# When a face doesn't match the session's class, also search the whole school
+# so students from another class can be flagged instead of ignored
+CROSS_CLASS_CHECK = True
+
+def get_recognition_service():
+    """Import the face recognition service on first use (None when disabled in this process)"""
+    if not RECOGNITION_ENABLED:
+        return None
+    import recognition_service
+    return recognition_service
+
+def recognition_disabled_response():
+    """JSON error for recognition endpoints on a worker started with ATTENDANCE_RECOGNITION=0"""
+    return jsonify({'status': 'error', 'error': 'Face recognition is disabled on this server',
+                    'message': 'Face recognition is disabled on this server'}), 503
+
+def update_gallery(student_id, embeddings=None):
+    """
+    Apply an enrollment (new samples) or a deletion (embeddings=None) to the
+    loaded face gallery and to the running attendance session
+    """
+    service = sys.modules.get('recognition_service')
+    if service is None:
+        # Recognition not loaded in this process - it reads the store fresh when it is
+        return
+    
+    service.update_gallery(student_id, embeddings)
+    for att_session in attendance_sessions.active():
+        att_session.gallery = service.get_class_gallery(att_session.class_name)
+
+# Logged-in users by ID (see user_cache.py); routes that change or delete a user invalidate it
+user_cache = UserCache(lambda user_id: db_session.get(User, user_id))
 
 @login_manager.user_loader
 def load_user(user_id):
-    db = SessionLocal()
-    user = db.query(User).get(int(user_id))
-    db.close()
-    return user
+    return user_cache.get(int(user_id))
 
 # Home route - redirect to login
 @app.route('/')
@@ -91,13 +127,12 @@ def teacher_register():
             flash('Passwords do not match!', 'error')
             return render_template('teacher_register.html')
         
-        db = SessionLocal()
+        db = db_session()
         
         # Check if username already exists
         existing_user = db.query(User).filter(User.username == username).first()
         if existing_user:
             flash('Username already exists! Please choose another.', 'error')
-            db.close()
             return render_template('teacher_register.html')
         
         # Create new teacher
@@ -110,7 +145,6 @@ def teacher_register():
         
         db.add(new_teacher)
         db.commit()
-        db.close()
         
         flash('Registration successful! Please login.', 'success')
         return redirect(url_for('teacher_login'))
@@ -129,13 +163,12 @@ def teacher_login():
         username = request.form.get('username')
         password = request.form.get('password')
         
-        db = SessionLocal()
+        db = db_session()
         # Allow both teacher and admin login through this page
         user = db.query(User).filter(
             User.username == username,
             User.role.in_(['teacher', 'admin'])
         ).first()
-        db.close()
         
         if user and check_password_hash(user.password_hash, password):
             login_user(user)
@@ -167,7 +200,7 @@ def teacher_settings():
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     teacher = db.query(User).get(current_user.id)
     
     if request.method == 'POST':
@@ -194,7 +227,6 @@ def teacher_settings():
                 elif file:
                     # Save profile photo
                     import os
-                    from werkzeug.utils import secure_filename
                     
                     # Create uploads directory if not exists
                     upload_folder = os.path.join('static', 'uploads', 'teachers')
@@ -228,13 +260,13 @@ def teacher_settings():
                 teacher.password_hash = generate_password_hash(new_password)
                 db.commit()
                 flash('Password changed successfully!', 'success')
+        
+        user_cache.invalidate(teacher.id)
     
     # Get statistics for dashboard
     total_students = db.query(Student).count()
     total_attendance = db.query(Attendance).count()
-    total_classes = len(set([s.class_name for s in db.query(Student).all() if s.class_name]))
-    
-    db.close()
+    total_classes = db.query(Student.class_name).filter(Student.class_name.isnot(None), Student.class_name != '').distinct().count()
     
     return render_template('teacher_settings.html',
                          user=current_user,
@@ -251,100 +283,10 @@ def reports_analytics():
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
-    
-    # Get all students
-    students = db.query(Student).all()
+    overview = analytics.overview(db_session())
     
-    # Get all attendance records
-    attendance_records = db.query(Attendance).all()
-    
-    # Calculate statistics
-    total_students = len(students)
-    enrolled_students = len([s for s in students if s.encodings_path])
-    pending_students = total_students - enrolled_students
-    
-    # Get unique classes
-    classes = list(set([s.class_name for s in students if s.class_name]))
-    
-    # Calculate period-wise statistics
-    period_stats = defaultdict(lambda: {'total': 0, 'present': 0, 'absent': 0})
-    for record in attendance_records:
-        period = record.period
-        period_stats[period]['total'] += 1
-        if record.status.lower() == 'present':
-            period_stats[period]['present'] += 1
-        else:
-            period_stats[period]['absent'] += 1
-    
-    # Calculate student-wise statistics
-    student_stats = []
-    for student in students:
-        student_records = [r for r in attendance_records if r.student_id == student.id]
-        total_records = len(student_records)
-        present_count = len([r for r in student_records if r.status.lower() == 'present'])
-        absent_count = total_records - present_count
-        attendance_percentage = (present_count / total_records * 100) if total_records > 0 else 0
-        
-        student_stats.append({
-            'id': student.id,
-            'name': student.name,
-            'roll_no': student.roll_no,
-            'class_name': student.class_name or '-',
-            'total_records': total_records,
-            'present': present_count,
-            'absent': absent_count,
-            'percentage': round(attendance_percentage, 2)
-        })
-    
-    # Sort by percentage (descending)
-    student_stats.sort(key=lambda x: x['percentage'], reverse=True)
-    
-    # Class-wise statistics
-    class_stats = defaultdict(lambda: {'students': 0, 'total_records': 0, 'present': 0, 'absent': 0})
-    for student in students:
-        class_name = student.class_name or 'No Class'
-        class_stats[class_name]['students'] += 1
-        student_records = [r for r in attendance_records if r.student_id == student.id]
-        class_stats[class_name]['total_records'] += len(student_records)
-        class_stats[class_name]['present'] += len([r for r in student_records if r.status.lower() == 'present'])
-        class_stats[class_name]['absent'] += len([r for r in student_records if r.status.lower() == 'absent'])
-    
-    # Calculate overall statistics
-    total_attendance_records = len(attendance_records)
-    total_present = len([r for r in attendance_records if r.status.lower() == 'present'])
-    total_absent = total_attendance_records - total_present
-    overall_percentage = (total_present / total_attendance_records * 100) if total_attendance_records > 0 else 0
-    
-    # Prepare chart data (arrays for Chart.js)
-    class_names = sorted(list(class_stats.keys()))
-    class_present_data = [class_stats[c]['present'] for c in class_names]
-    class_absent_data = [class_stats[c]['absent'] for c in class_names]
-    
-    period_names = sorted(list(period_stats.keys()))
-    period_present_data = [period_stats[p]['present'] for p in period_names]
-    period_absent_data = [period_stats[p]['absent'] for p in period_names]
-    
-    db.close()
-    
-    return render_template('reports_analytics.html',
-                         total_students=total_students,
-                         enrolled_students=enrolled_students,
-                         pending_students=pending_students,
-                         classes=classes,
-                         total_attendance_records=total_attendance_records,
-                         total_present=total_present,
-                         total_absent=total_absent,
-                         overall_percentage=round(overall_percentage, 2),
-                         student_stats=student_stats,
-                         period_stats=dict(period_stats),
-                         class_stats=dict(class_stats),
-                         class_names=class_names,
-                         class_present_data=class_present_data,
-                         class_absent_data=class_absent_data,
-                         period_names=period_names,
-                         period_present_data=period_present_data,
-                         period_absent_data=period_absent_data)
+    overview['overall_percentage'] = round(overview['overall_percentage'], 2)
+    return render_template('reports_analytics.html', **overview)
 
 @app.route('/reports/download')
 @login_required
@@ -354,42 +296,28 @@ def download_report():
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
-    
-    # Get all attendance records with student info
-    attendance_records = db.query(Attendance).order_by(Attendance.date.desc(), Attendance.period).all()
-    
-    # Create CSV in memory
-    si = StringIO()
-    writer = csv.writer(si)
-    
+    return csv_response(attendance_report_rows(),
+                        f"attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+
+def attendance_report_rows():
+    """Rows of the teacher attendance report, read from the database in batches"""
     # Write header
-    writer.writerow(['Roll Number', 'Student Name', 'Class', 'Date', 'Period', 'Status'])
-    
-    # Write attendance records
-    for record in attendance_records:
-        student = db.query(Student).filter_by(id=record.student_id).first()
-        if student:
-            # Handle date - might be string or date object
-            date_str = record.date if isinstance(record.date, str) else record.date.strftime('%Y-%m-%d')
-            
-            writer.writerow([
-                student.roll_no,
-                student.name,
-                student.class_name or '-',
-                date_str,
-                record.period,
-                record.status
-            ])
-    
-    db.close()
-    
-    # Create response
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = f"attachment; filename=attendance_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    output.headers["Content-type"] = "text/csv"
-    
-    return output
+    yield ['Roll Number', 'Student Name', 'Class', 'Date', 'Period', 'Status']
+    
+    db = db_session()
+    # All attendance records with their student's columns, in one query
+    for date_value, period, status, roll_no, name, class_name in analytics.attendance_export_rows(db, YIELD_PER):
+        # Handle date - might be string or date object
+        date_str = date_value if isinstance(date_value, str) else date_value.strftime('%Y-%m-%d')
+        
+        yield [
+            roll_no,
+            name,
+            class_name or '-',
+            date_str,
+            period,
+            status
+        ]
 
 @app.route('/logout')
 @login_required
@@ -421,13 +349,12 @@ def register_student():
             flash('Name and Roll Number are required!', 'error')
             return render_template('register_student.html')
         
-        db = SessionLocal()
+        db = db_session()
         
         # Check if roll number already exists
         existing_student = db.query(Student).filter(Student.roll_no == roll_no).first()
         if existing_student:
             flash('Roll Number already exists! Please use a unique Roll Number.', 'error')
-            db.close()
             return render_template('register_student.html')
         
         # Create new student
@@ -455,12 +382,95 @@ def register_student():
         db.commit()
         
         flash(f'✅ Student registered successfully! Login Credentials - Username: {roll_no}, Password: {roll_no}', 'success')
-        db.close()
         
         return redirect(url_for('view_students'))
     
     return render_template('register_student.html')
 
+# Bulk imports started by this process: {job_id: progress/result dict}
+import_jobs = {}
+IMPORT_JOB_TTL = 3600  # Seconds a finished import's result stays available
+
+def prune_import_jobs(now=None):
+    """Forget imports that finished more than IMPORT_JOB_TTL seconds ago"""
+    now = now or time.time()
+    for job_id, job in list(import_jobs.items()):
+        if job.get('finished_at') and now - job['finished_at'] > IMPORT_JOB_TTL:
+            import_jobs.pop(job_id, None)
+
+@app.route('/students/import', methods=['POST'])
+@login_required
+def import_students():
+    """Start a bulk import of a CSV/XLSX sheet of students, with an optional ZIP of face photos"""
+    if current_user.role != 'teacher':
+        return jsonify({'status': 'error', 'message': 'Access denied'}), 403
+    
+    sheet = request.files.get('file')
+    if not sheet or not sheet.filename.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+        return jsonify({'status': 'error', 'message': 'Upload a .csv or .xlsx file'}), 400
+    try:
+        rows = student_import.read_rows(io.BytesIO(sheet.read()), sheet.filename)
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Could not read the sheet: {e}'}), 400
+    
+    # Face photos: <roll_no>/*.jpg folders or <roll_no>.jpg files inside the ZIP
+    photos = request.files.get('photos')
+    photos_dir = None
+    if photos and photos.filename:
+        if get_recognition_service() is None:
+            return recognition_disabled_response()
+        try:
+            photos_dir = student_import.extract_photos_zip(photos.stream)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    job = {'id': uuid.uuid4().hex, 'status': 'running', 'rows': len(rows), 'stage': 'students', 'done': 0, 'total': len(rows)}
+    prune_import_jobs()
+    import_jobs[job['id']] = job
+    threading.Thread(target=run_student_import, args=(job, rows, photos_dir), daemon=True).start()
+    
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job['id'],
+        'rows': len(rows),
+        'progress_url': url_for('import_students_progress', job_id=job['id'])
+    }), 202
+
+def run_student_import(job, rows, photos_dir):
+    """Import thread: runs student_import.import_students and records its progress in job"""
+    def progress(stage, done, total):
+        job.update(stage=stage, done=done, total=total)
+    
+    db = SessionLocal()
+    try:
+        result = student_import.import_students(db, rows, photos_dir=photos_dir,
+                                                on_enrolled=update_gallery, progress=progress)
+        job.update(status='done', imported=result['imported'], errors=result['errors'])
+        if 'photos' in result:
+            job['photos'] = result['photos']
+        print(f"✅ Bulk import {job['id']}: {result['imported']} students imported, {len(result['errors'])} rows skipped")
+    except Exception as e:
+        print(f"❌ Bulk import {job['id']} failed: {e}")
+        job.update(status='error', message=str(e))
+    finally:
+        job['finished_at'] = time.time()
+        db.close()
+        if photos_dir:
+            shutil.rmtree(photos_dir, ignore_errors=True)
+
+@app.route('/students/import/<job_id>')
+@login_required
+def import_students_progress(job_id):
+    """Progress of a bulk import (stage, done/total) and its result once finished"""
+    if current_user.role != 'teacher':
+        return jsonify({'status': 'error', 'message': 'Access denied'}), 403
+    
+    prune_import_jobs()
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Import not found'}), 404
+    return jsonify(dict(job))
+
 @app.route('/students/view')
 @login_required
 def view_students():
@@ -469,9 +479,8 @@ def view_students():
         flash('Access denied! Teachers and admins only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
-    students = db.query(Student).all()
-    db.close()
+    # Column values only - raiseload makes any per-row relationship access in the template an error
+    students = db_session().query(Student).options(raiseload('*')).all()
     
     return render_template('view_students.html', students=students)
 
@@ -483,7 +492,7 @@ def delete_student(id):
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     try:
         # Find the student
         student = db.query(Student).filter_by(id=id).first()
@@ -494,12 +503,13 @@ def delete_student(id):
         student_name = student.name
         roll_no = student.roll_no
         
-        # Delete face encodings file if it exists
-        if student.encodings_path and os.path.exists(student.encodings_path):
+        # Delete face embeddings if the student was enrolled
+        if student.encodings_path:
             try:
-                os.remove(student.encodings_path)
+                from face_utils import remove_student_embeddings
+                remove_student_embeddings(student.id)
             except Exception as e:
-                print(f"Error deleting encodings file: {e}")
+                print(f"Error deleting face embeddings: {e}")
         
         # Delete associated user account
         user = db.query(User).filter_by(username=student.roll_no).first()
@@ -512,13 +522,16 @@ def delete_student(id):
         # Delete the student record
         db.delete(student)
         db.commit()
+        if user:
+            user_cache.invalidate(user.id)
+        
+        # Drop the student's samples from the in-memory gallery
+        update_gallery(id)
         
         flash(f'✅ Student {student_name} (Roll: {roll_no}) has been deleted successfully!', 'success')
     except Exception as e:
         db.rollback()
         flash(f'❌ Error deleting student: {str(e)}', 'error')
-    finally:
-        db.close()
     
     return redirect(url_for('view_students'))
 
@@ -536,17 +549,7 @@ def register_student_with_face():
         student_data = None
         
         if student_id:
-            db = SessionLocal()
-            student = db.query(Student).filter_by(id=int(student_id)).first()
-            if student:
-                student_data = {
-                    'id': student.id,
-                    'name': student.name,
-                    'roll_no': student.roll_no,
-                    'class_name': student.class_name,
-                    'email': student.email
-                }
-            db.close()
+            student_data = db_session().query(Student).filter_by(id=int(student_id)).first()
         
         return render_template('register_student_with_face.html', student=student_data)
     
@@ -576,14 +579,17 @@ def enroll_student_with_face():
         if len(images) == 0:
             return jsonify({'status': 'error', 'message': 'No face images captured'})
         
-        db = SessionLocal()
+        service = get_recognition_service()
+        if service is None:
+            return recognition_disabled_response()
+        
+        db = db_session()
         
         # Check if we're completing enrollment for existing student
         if student_id:
             # Completing enrollment for existing student
             existing_student = db.query(Student).filter_by(id=int(student_id)).first()
             if not existing_student:
-                db.close()
                 return jsonify({'status': 'error', 'message': 'Student not found'})
             
             student_id = existing_student.id
@@ -593,7 +599,6 @@ def enroll_student_with_face():
             # Check if roll number exists
             existing_student = db.query(Student).filter(Student.roll_no == roll_no).first()
             if existing_student:
-                db.close()
                 return jsonify({'status': 'error', 'message': 'Roll Number already exists'})
             
             # Create student record
@@ -620,53 +625,42 @@ def enroll_student_with_face():
             is_new_student = True
         
         # Process face images and generate embeddings
-        from face_utils import get_embeddings_from_image_bgr, append_embedding_for_student
-        import base64
+        from face_utils import get_embeddings_batch_from_images_bgr, append_embedding_for_student
         import numpy as np
         
-        successful_embeddings = 0
-        failed_images = 0
-        
         # Create dataset folder for raw images (optional)
         student_folder = os.path.join('dataset', roll_no)
         os.makedirs(student_folder, exist_ok=True)
         
+        # Decode all captured frames first (raw images are saved as well)
+        decoded_images = []
         for idx, img_data in enumerate(images):
             try:
-                # Decode base64 image
-                header, encoded = img_data.split(',', 1)
-                img_bytes = base64.b64decode(encoded)
-                img_array = np.frombuffer(img_bytes, np.uint8)
-                img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                
-                # Save raw image (optional)
-                cv2.imwrite(os.path.join(student_folder, f'sample_{idx}.jpg'), img)
-                
-                # Extract face embeddings
-                embeddings, faces = get_embeddings_from_image_bgr(img, enforce_detection=False)
-                
-                # Save embeddings if face detected
-                if len(embeddings) > 0:
-                    for emb in embeddings:
-                        append_embedding_for_student(str(student_id), emb)
-                        successful_embeddings += 1
-                else:
-                    failed_images += 1
-                    
+                decoded_images.append(service.decode_image(
+                    img_data, save_path=os.path.join(student_folder, f'sample_{idx}.jpg')
+                ))
             except Exception as e:
                 print(f"Error processing image {idx}: {str(e)}")
-                failed_images += 1
+                decoded_images.append(None)
+        
+        # Detect faces in every frame, then embed all crops in one model call
+        embeddings_per_image = get_embeddings_batch_from_images_bgr(decoded_images, enforce_detection=False)
+        new_embeddings = [emb for embeddings in embeddings_per_image for emb in embeddings]
+        successful_embeddings = len(new_embeddings)
+        failed_images = sum(1 for embeddings in embeddings_per_image if not embeddings)
+        
+        # Save all embeddings in a single store update
+        if new_embeddings:
+            append_embedding_for_student(str(student_id), np.vstack(new_embeddings))
         
         # Update student record with encodings path
         student = db.query(Student).filter_by(id=student_id).first()
-        student.encodings_path = f"encodings/{student_id}.npy"
+        student.encodings_path = service.EMBEDDING_STORE_PATH
         db.commit()
-        db.close()
         
-        # Reload enrollment database in memory
-        global ENROLLED
-        from face_utils import load_all_enrollments
-        ENROLLED = load_all_enrollments()
+        # Add the new samples to the in-memory gallery
+        if new_embeddings:
+            update_gallery(student_id, np.vstack(new_embeddings))
         
         success_message = f'Face enrollment completed! {successful_embeddings} face samples saved.' if not is_new_student else f'Student registered! {successful_embeddings} face samples saved.'
         
@@ -677,7 +671,7 @@ def enroll_student_with_face():
             'successful_embeddings': successful_embeddings,
             'failed_images': failed_images
         })
-        
+    
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
@@ -693,7 +687,7 @@ def manage_timetable():
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     
     if request.method == 'POST':
         class_name = request.form.get('class_name')
@@ -727,8 +721,6 @@ def manage_timetable():
     # Sort entries
     timetable_entries.sort(key=lambda x: (day_order.index(x.day_of_week) if x.day_of_week in day_order else 999, x.period))
     
-    db.close()
-    
     return render_template('manage_timetable.html', timetable_entries=timetable_entries)
 
 @app.route('/timetable/bulk-add', methods=['POST'])
@@ -739,14 +731,13 @@ def bulk_add_timetable():
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     
     class_name = request.form.get('class_name')
     day_of_week = request.form.get('day_of_week')
     
     if not class_name or not day_of_week:
         flash('Class and Day are required!', 'error')
-        db.close()
         return redirect(url_for('manage_timetable'))
     
     added_count = 0
@@ -770,7 +761,6 @@ def bulk_add_timetable():
             added_count += 1
     
     db.commit()
-    db.close()
     
     flash(f'Successfully added {added_count} periods for {class_name} - {day_of_week}!', 'success')
     return redirect(url_for('manage_timetable'))
@@ -783,7 +773,7 @@ def delete_timetable(id):
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     entry = db.query(Timetable).get(id)
     
     if entry:
@@ -793,7 +783,6 @@ def delete_timetable(id):
     else:
         flash('Timetable entry not found!', 'error')
     
-    db.close()
     return redirect(url_for('manage_timetable'))
 
 @app.route('/timetable/edit/<int:id>', methods=['GET', 'POST'])
@@ -804,12 +793,11 @@ def edit_timetable(id):
         flash('Access denied! Teachers only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     entry = db.query(Timetable).get(id)
     
     if not entry:
         flash('Timetable entry not found!', 'error')
-        db.close()
         return redirect(url_for('manage_timetable'))
     
     if request.method == 'POST':
@@ -822,10 +810,8 @@ def edit_timetable(id):
         
         db.commit()
         flash('Timetable entry updated successfully!', 'success')
-        db.close()
         return redirect(url_for('manage_timetable'))
     
-    db.close()
     return render_template('edit_timetable.html', entry=entry)
 
 #########################
@@ -840,7 +826,7 @@ def admin_dashboard():
         flash('Access denied! Admins only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     
     # Get statistics
     total_teachers = db.query(User).filter(User.role == 'teacher').count()
@@ -852,8 +838,6 @@ def admin_dashboard():
     recent_teachers = db.query(User).filter(User.role == 'teacher').order_by(User.id.desc()).limit(5).all()
     recent_students = db.query(Student).order_by(Student.id.desc()).limit(5).all()
     
-    db.close()
-    
     return render_template('admin_dashboard.html',
                          total_teachers=total_teachers,
                          total_students=total_students,
@@ -870,15 +854,13 @@ def admin_users():
         flash('Access denied! Admins only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     
     # Get all teachers
     teachers = db.query(User).filter(User.role == 'teacher').all()
     
-    # Get all students with their user accounts
-    students = db.query(Student).all()
-    
-    db.close()
+    # Get all students with their user accounts (one extra query for all accounts)
+    students = db.query(Student).options(selectinload(Student.user)).all()
     
     return render_template('admin_users.html', teachers=teachers, students=students)
 
@@ -889,7 +871,7 @@ def admin_delete_user(user_type, user_id):
     if current_user.role != 'admin':
         return jsonify({'error': 'Access denied'}), 403
     
-    db = SessionLocal()
+    db = db_session()
     
     try:
         if user_type == 'teacher':
@@ -897,34 +879,49 @@ def admin_delete_user(user_type, user_id):
             if user:
                 db.delete(user)
                 db.commit()
+                user_cache.invalidate(user_id)
                 flash(f'Teacher {user.username} deleted successfully!', 'success')
             else:
                 flash('Teacher not found!', 'error')
-                
+        
         elif user_type == 'student':
             student = db.query(Student).filter(Student.id == user_id).first()
             if student:
                 # Delete associated user account if exists
-                if student.user_account:
-                    db.delete(student.user_account)
+                account_ids = [account.id for account in student.user]
+                for account in student.user:
+                    db.delete(account)
+                # Delete face embeddings if the student was enrolled
+                if student.encodings_path:
+                    from face_utils import remove_student_embeddings
+                    remove_student_embeddings(student.id)
                 # Delete attendance records
                 db.query(Attendance).filter(Attendance.student_id == user_id).delete()
                 # Delete student
                 db.delete(student)
                 db.commit()
+                user_cache.invalidate(*account_ids)
+                # Drop the student's samples from the in-memory gallery
+                update_gallery(user_id)
                 flash(f'Student {student.name} deleted successfully!', 'success')
             else:
                 flash('Student not found!', 'error')
-        
-        db.close()
-        
+    
     except Exception as e:
         db.rollback()
-        db.close()
         flash(f'Error deleting user: {str(e)}', 'error')
     
     return redirect(url_for('admin_users'))
 
+@app.route('/admin/cache-stats')
+@login_required
+def admin_cache_stats():
+    """Hit rate and size of the login user cache (JSON, for monitoring)"""
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify({'user_cache': user_cache.stats()})
+
 @app.route('/admin/analytics')
 @login_required
 def admin_analytics():
@@ -933,107 +930,17 @@ def admin_analytics():
         flash('Access denied! Admins only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
-    
+    db = db_session()
     # Get all teachers
     total_teachers = db.query(User).filter(User.role == 'teacher').count()
+    overview = analytics.overview(db)
     
-    # Get all students
-    students = db.query(Student).all()
-    
-    # Get all attendance records
-    attendance_records = db.query(Attendance).all()
-    
-    # Calculate statistics
-    total_students = len(students)
-    enrolled_students = len([s for s in students if s.encodings_path])
-    pending_students = total_students - enrolled_students
-    
-    # Get unique classes
-    classes = list(set([s.class_name for s in students if s.class_name]))
-    
-    # Calculate period-wise statistics
-    from collections import defaultdict
-    period_stats = defaultdict(lambda: {'total': 0, 'present': 0, 'absent': 0})
-    for record in attendance_records:
-        period = record.period
-        period_stats[period]['total'] += 1
-        if record.status.lower() == 'present':
-            period_stats[period]['present'] += 1
-        else:
-            period_stats[period]['absent'] += 1
-    
-    # Calculate student-wise statistics
-    student_stats = []
-    for student in students:
-        student_records = [r for r in attendance_records if r.student_id == student.id]
-        total_records = len(student_records)
-        present_count = len([r for r in student_records if r.status.lower() == 'present'])
-        absent_count = total_records - present_count
-        attendance_percentage = (present_count / total_records * 100) if total_records > 0 else 0
-        
-        student_stats.append({
-            'id': student.id,
-            'name': student.name,
-            'roll_no': student.roll_no,
-            'class_name': student.class_name or '-',
-            'total_records': total_records,
-            'present': present_count,
-            'absent': absent_count,
-            'percentage': round(attendance_percentage, 2)
-        })
-    
-    # Sort by percentage (descending)
-    student_stats.sort(key=lambda x: x['percentage'], reverse=True)
-    
-    # Class-wise statistics
-    class_stats = defaultdict(lambda: {'students': 0, 'total_records': 0, 'present': 0, 'absent': 0})
-    for student in students:
-        class_name = student.class_name or 'No Class'
-        class_stats[class_name]['students'] += 1
-        student_records = [r for r in attendance_records if r.student_id == student.id]
-        class_stats[class_name]['total_records'] += len(student_records)
-        class_stats[class_name]['present'] += len([r for r in student_records if r.status.lower() == 'present'])
-        class_stats[class_name]['absent'] += len([r for r in student_records if r.status.lower() == 'absent'])
-    
-    # Calculate overall statistics
-    total_attendance_records = len(attendance_records)
-    total_present = len([r for r in attendance_records if r.status.lower() == 'present'])
-    total_absent = total_attendance_records - total_present
-    overall_percentage = (total_present / total_attendance_records * 100) if total_attendance_records > 0 else 0
-    
-    # Prepare chart data (arrays for Chart.js)
-    class_names = sorted(list(class_stats.keys()))
-    class_present_data = [class_stats[c]['present'] for c in class_names]
-    class_absent_data = [class_stats[c]['absent'] for c in class_names]
-    
-    period_names = sorted(list(period_stats.keys()))
-    period_present_data = [period_stats[p]['present'] for p in period_names]
-    period_absent_data = [period_stats[p]['absent'] for p in period_names]
-    
-    db.close()
-    
+    overview['overall_percentage'] = round(overview['overall_percentage'], 1)
     return render_template('admin_analytics.html',
                          total_teachers=total_teachers,
-                         total_students=total_students,
-                         enrolled_students=enrolled_students,
-                         pending_students=pending_students,
-                         classes=classes,
-                         total_records=total_attendance_records,
-                         total_attendance_records=total_attendance_records,
-                         total_present=total_present,
-                         total_absent=total_absent,
-                         overall_percentage=round(overall_percentage, 1),
-                         student_stats=student_stats,
-                         class_stats=dict(class_stats),
-                         period_stats=dict(period_stats),
-                         class_names=class_names,
-                         class_present_data=class_present_data,
-                         class_absent_data=class_absent_data,
-                         period_names=period_names,
-                         period_present_data=period_present_data,
-                         period_absent_data=period_absent_data,
-                         is_admin=True)
+                         total_records=overview['total_attendance_records'],
+                         is_admin=True,
+                         **overview)
 
 @app.route('/admin/download_comprehensive_report')
 @login_required
@@ -1047,13 +954,13 @@ def admin_download_comprehensive_report():
         flash('Access denied! Admins only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     
     try:
         print("✅ Database session created")
         
-        # Get all students
-        students = db.query(Student).order_by(Student.class_name, Student.roll_no).all()
+        # All students with their attendance counts, aggregated in the database
+        students = analytics.student_rows(db, order_by=(Student.class_name, Student.roll_no))
         print(f"📊 Found {len(students)} students")
         
         # Get all teachers
@@ -1061,165 +968,138 @@ def admin_download_comprehensive_report():
         print(f"👨‍🏫 Found {len(teachers)} teachers")
         
         # Get all unique periods taken
-        all_periods = db.query(Attendance.period).distinct().order_by(Attendance.period).all()
-        periods_taken = [str(p[0]) for p in all_periods]
+        periods_taken = [str(p) for p in sorted(analytics.period_counts(db))]
         print(f"📅 Found {len(periods_taken)} unique periods")
         
         # Get all unique dates
-        all_dates = db.query(Attendance.date).distinct().order_by(Attendance.date).all()
-        dates_taken = [d[0] for d in all_dates]
+        dates_taken = sorted(analytics.date_counts(db))
         print(f"📆 Found {len(dates_taken)} unique dates")
-        
-        # Create CSV in memory
-        si = StringIO()
-        writer = csv.writer(si)
-        
-        print("📝 Writing CSV sections...")
-        
-        # Write system overview header
-        writer.writerow(['=== ATTENDAI SYSTEM - COMPREHENSIVE ANALYTICS REPORT ==='])
-        writer.writerow(['Generated On:', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
-        writer.writerow([])
-        
-        # Write teachers section
-        writer.writerow(['=== TEACHERS IN SYSTEM ==='])
-        writer.writerow(['ID', 'Username', 'Full Name', 'Email', 'Department', 'Subject', 'Phone'])
-        for teacher in teachers:
-            writer.writerow([
-                teacher.id,
-                teacher.username,
-                teacher.full_name or '-',
-                teacher.email or '-',
-                teacher.department or '-',
-                teacher.subject or '-',
-                teacher.phone or '-'
-            ])
-        writer.writerow([])
-        
-        # Write periods overview
-        writer.writerow(['=== PERIODS TAKEN TILL NOW ==='])
-        writer.writerow(['Total Unique Periods:', len(periods_taken)])
-        writer.writerow(['Periods:', ', '.join(periods_taken) if periods_taken else 'None'])
-        writer.writerow(['Total Days Covered:', len(dates_taken)])
-        writer.writerow([])
-        
-        # Write student-wise comprehensive data
-        writer.writerow(['=== STUDENT-WISE ATTENDANCE DETAILS ==='])
-        writer.writerow([
-            'Roll No',
-            'Student Name',
-            'Class',
-            'Email',
-            'Face Enrolled',
-            'Total Classes Held',
-            'Present Count',
-            'Absent Count',
-            'Attendance %'
-        ])
-        
-        total_students = 0
-        total_present_all = 0
-        total_absent_all = 0
-        
-        for student in students:
-            total_students += 1
-            
-            # Get all attendance records for this student
-            student_attendance = db.query(Attendance).filter(
-                Attendance.student_id == student.id
-            ).all()
-            
-            # Count present and absent
-            present_count = sum(1 for a in student_attendance if a.status.lower() == 'present')
-            absent_count = sum(1 for a in student_attendance if a.status.lower() == 'absent')
-            total_classes = present_count + absent_count
-            
-            # Calculate percentage
-            if total_classes > 0:
-                attendance_percentage = round((present_count / total_classes) * 100, 2)
-            else:
-                attendance_percentage = 0.0
-            
-            total_present_all += present_count
-            total_absent_all += absent_count
-            
-            # Enrollment status
-            enrollment_status = 'Yes' if student.encodings_path else 'No'
-            
-            writer.writerow([
-                student.roll_no,
-                student.name,
-                student.class_name or '-',
-                student.email or '-',
-                enrollment_status,
-                total_classes,
-                present_count,
-                absent_count,
-                f'{attendance_percentage}%'
-            ])
-        
-        writer.writerow([])
-        
-        # Write summary statistics
-        writer.writerow(['=== OVERALL SYSTEM STATISTICS ==='])
-        writer.writerow(['Total Students:', total_students])
-        writer.writerow(['Total Teachers:', len(teachers)])
-        writer.writerow(['Total Periods Taken:', len(periods_taken)])
-        writer.writerow(['Total Days Covered:', len(dates_taken)])
-        writer.writerow(['Total Present Records:', total_present_all])
-        writer.writerow(['Total Absent Records:', total_absent_all])
-        total_records = total_present_all + total_absent_all
-        if total_records > 0:
-            overall_percentage = round((total_present_all / total_records) * 100, 2)
-            writer.writerow(['Overall Attendance %:', f'{overall_percentage}%'])
-        writer.writerow([])
-        
-        # Write detailed attendance records
-        writer.writerow(['=== DETAILED ATTENDANCE RECORDS ==='])
-        writer.writerow(['Date', 'Period', 'Roll No', 'Student Name', 'Class', 'Status'])
-        
-        # Get all attendance records ordered by date and period
-        all_attendance = db.query(Attendance).order_by(
-            Attendance.date.desc(), 
-            Attendance.period
-        ).all()
-        
-        for record in all_attendance:
-            student = db.query(Student).filter_by(id=record.student_id).first()
-            if student:
-                # Handle date - might be string or date object
-                date_str = record.date if isinstance(record.date, str) else record.date.strftime('%Y-%m-%d')
-                
-                writer.writerow([
-                    date_str,
-                    str(record.period),
-                    student.roll_no,
-                    student.name,
-                    student.class_name or '-',
-                    record.status
-                ])
-        
-        print(f"📄 CSV content generated ({len(si.getvalue())} bytes)")
-        
+    
     except Exception as e:
         print(f"❌ ERROR in admin_download_comprehensive_report: {str(e)}")
         print(f"❌ Exception type: {type(e).__name__}")
         import traceback
         traceback.print_exc()
-        db.close()
         flash(f'Error generating report: {str(e)}', 'error')
         return redirect(url_for('admin_analytics'))
     
-    db.close()
-    print("✅ Database closed")
-    
-    # Create response
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = f"attachment; filename=admin_comprehensive_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    output.headers["Content-type"] = "text/csv"
+    # The summary sections are ready; the detailed records are streamed after them
+    print("✅ Streaming report...")
+    return csv_response(comprehensive_report_rows(students, teachers, periods_taken, dates_taken),
+                        f"admin_comprehensive_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+
+def comprehensive_report_rows(students, teachers, periods_taken, dates_taken):
+    """Rows of the comprehensive admin report; attendance records are read in batches"""
+    # Write system overview header
+    yield ['=== ATTENDAI SYSTEM - COMPREHENSIVE ANALYTICS REPORT ===']
+    yield ['Generated On:', datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+    yield []
+    
+    # Write teachers section
+    yield ['=== TEACHERS IN SYSTEM ===']
+    yield ['ID', 'Username', 'Full Name', 'Email', 'Department', 'Subject', 'Phone']
+    for teacher in teachers:
+        yield [
+            teacher.id,
+            teacher.username,
+            teacher.full_name or '-',
+            teacher.email or '-',
+            teacher.department or '-',
+            teacher.subject or '-',
+            teacher.phone or '-'
+        ]
+    yield []
+    
+    # Write periods overview
+    yield ['=== PERIODS TAKEN TILL NOW ===']
+    yield ['Total Unique Periods:', len(periods_taken)]
+    yield ['Periods:', ', '.join(periods_taken) if periods_taken else 'None']
+    yield ['Total Days Covered:', len(dates_taken)]
+    yield []
+    
+    # Write student-wise comprehensive data
+    yield ['=== STUDENT-WISE ATTENDANCE DETAILS ===']
+    yield [
+        'Roll No',
+        'Student Name',
+        'Class',
+        'Email',
+        'Face Enrolled',
+        'Total Classes Held',
+        'Present Count',
+        'Absent Count',
+        'Attendance %'
+    ]
+    
+    total_students = 0
+    total_present_all = 0
+    total_absent_all = 0
     
-    print("✅ Response created, sending file...")
-    return output
+    for student in students:
+        total_students += 1
+        
+        present_count = int(student.present)
+        absent_count = int(student.absent)
+        total_classes = present_count + absent_count
+        
+        # Calculate percentage
+        if total_classes > 0:
+            attendance_percentage = round((present_count / total_classes) * 100, 2)
+        else:
+            attendance_percentage = 0.0
+        
+        total_present_all += present_count
+        total_absent_all += absent_count
+        
+        # Enrollment status
+        enrollment_status = 'Yes' if student.enrolled else 'No'
+        
+        yield [
+            student.roll_no,
+            student.name,
+            student.class_name or '-',
+            student.email or '-',
+            enrollment_status,
+            total_classes,
+            present_count,
+            absent_count,
+            f'{attendance_percentage}%'
+        ]
+    
+    yield []
+    
+    # Write summary statistics
+    yield ['=== OVERALL SYSTEM STATISTICS ===']
+    yield ['Total Students:', total_students]
+    yield ['Total Teachers:', len(teachers)]
+    yield ['Total Periods Taken:', len(periods_taken)]
+    yield ['Total Days Covered:', len(dates_taken)]
+    yield ['Total Present Records:', total_present_all]
+    yield ['Total Absent Records:', total_absent_all]
+    total_records = total_present_all + total_absent_all
+    if total_records > 0:
+        overall_percentage = round((total_present_all / total_records) * 100, 2)
+        yield ['Overall Attendance %:', f'{overall_percentage}%']
+    yield []
+    
+    # Write detailed attendance records
+    yield ['=== DETAILED ATTENDANCE RECORDS ===']
+    yield ['Date', 'Period', 'Roll No', 'Student Name', 'Class', 'Status']
+    
+    db = db_session()
+    # All attendance records with their student's columns, ordered by date and period
+    for date_value, period, status, roll_no, name, class_name in analytics.attendance_export_rows(db, YIELD_PER):
+        # Handle date - might be string or date object
+        date_str = date_value if isinstance(date_value, str) else date_value.strftime('%Y-%m-%d')
+        
+        yield [
+            date_str,
+            str(period),
+            roll_no,
+            name,
+            class_name or '-',
+            status
+        ]
 
 #########################
 # STUDENT ROUTES
@@ -1234,17 +1114,15 @@ def student_login():
         roll_no = request.form.get('roll_no')
         password = request.form.get('password')
         
-        db = SessionLocal()
+        db = db_session()
         user = db.query(User).filter(User.username == roll_no, User.role == 'student').first()
         
         if user and check_password_hash(user.password_hash, password):
             login_user(user)
             flash('Login successful! Welcome back.', 'success')
-            db.close()
             return redirect(url_for('student_dashboard'))
         else:
             flash('Invalid roll number or password!', 'error')
-            db.close()
     
     return render_template('student_login.html')
 
@@ -1255,7 +1133,7 @@ def student_dashboard():
         flash('Access denied! Students only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     student = db.query(Student).get(current_user.student_id)
     
     # Get attendance records for this student
@@ -1295,8 +1173,8 @@ def student_dashboard():
     # Create attendance lookup: {period: status} for today
     today_attendance = {}
     for record in attendance_records:
-        if record.date == today_date:
-            # period is already an integer in the database
+        if record.date == today.date():
+            # period is an integer column
             today_attendance[record.period] = record.status
     
     # Calculate attendance statistics
@@ -1316,44 +1194,12 @@ def student_dashboard():
     # Calculate overall attendance percentage based on unique days
     attendance_percentage = round((days_present / unique_dates * 100), 1) if unique_dates > 0 else 0.0
     
-    # Load student data before closing session to avoid DetachedInstanceError
-    student_data = {
-        'id': student.id,
-        'name': student.name,
-        'roll_no': student.roll_no,
-        'class_name': student.class_name,
-        'email': student.email,
-        'profile_photo': student.profile_photo,
-        'encodings_path': student.encodings_path
-    }
-    
-    # Convert timetable entries to dict to avoid DetachedInstanceError
-    timetable_dict = {}
-    for day, periods in timetable_grid.items():
-        timetable_dict[day] = {}
-        for period, entry in periods.items():
-            timetable_dict[day][period] = {
-                'subject': entry.subject,
-                'start_time': entry.start_time,
-                'end_time': entry.end_time,
-                'day_of_week': entry.day_of_week,
-                'period': entry.period
-            }
-    
-    # Convert attendance records to list of dicts
-    attendance_list = [{
-        'date': r.date,
-        'period': r.period,
-        'status': r.status
-    } for r in attendance_records]
-    
-    db.close()
-    
+    # The request's session stays open while the template renders, so ORM objects are passed as they are
     return render_template('student_dashboard.html', 
                          user=current_user, 
-                         student=student_data,
-                         attendance_records=attendance_list,
-                         timetable_grid=timetable_dict,
+                         student=student,
+                         attendance_records=attendance_records,
+                         timetable_grid=timetable_grid,
                          days_order=days_order,
                          sorted_periods=sorted_periods,
                          today_day=today_day,
@@ -1392,11 +1238,11 @@ def change_password():
             return render_template('change_password.html')
         
         # Update password
-        db = SessionLocal()
+        db = db_session()
         user = db.query(User).get(current_user.id)
         user.password_hash = generate_password_hash(new_password)
         db.commit()
-        db.close()
+        user_cache.invalidate(user.id)
         
         flash('Password changed successfully!', 'success')
         return redirect(url_for('student_dashboard'))
@@ -1411,7 +1257,7 @@ def student_profile():
         flash('Access denied! Students only.', 'error')
         return redirect(url_for('login'))
     
-    db = SessionLocal()
+    db = db_session()
     student = db.query(Student).get(current_user.student_id)
     
     if request.method == 'POST':
@@ -1434,6 +1280,7 @@ def student_profile():
                 user = db.query(User).get(current_user.id)
                 user.password_hash = generate_password_hash(new_password)
                 db.commit()
+                user_cache.invalidate(user.id)
                 flash('Password changed successfully!', 'success')
         
         elif action == 'upload_photo':
@@ -1446,7 +1293,6 @@ def student_profile():
                 elif file:
                     # Save profile photo
                     import os
-                    from werkzeug.utils import secure_filename
                     
                     # Create uploads directory if not exists
                     upload_folder = os.path.join('static', 'uploads', 'profiles')
@@ -1477,22 +1323,9 @@ def student_profile():
     total_records = len(attendance_records)
     attendance_percentage = round((days_present / unique_dates * 100), 1) if unique_dates > 0 else 0.0
     
-    # Load student data before closing session to avoid DetachedInstanceError
-    student_data = {
-        'id': student.id,
-        'name': student.name,
-        'roll_no': student.roll_no,
-        'class_name': student.class_name,
-        'email': student.email,
-        'profile_photo': student.profile_photo,
-        'encodings_path': student.encodings_path
-    }
-    
-    db.close()
-    
     return render_template('student_profile.html',
                          user=current_user,
-                         student=student_data,
+                         student=student,
                          total_records=total_records,
                          present_count=days_present,
                          absent_count=days_absent,
@@ -1506,7 +1339,7 @@ def setup_demo():
     Teacher: username='teacher1', password='teacher123'
     Student: username='student1', password='student123'
     """
-    db = SessionLocal()
+    db = db_session()
     
     try:
         # Create demo teacher if doesn't exist
@@ -1559,47 +1392,41 @@ def setup_demo():
     except Exception as e:
         db.rollback()
         return f"<h2>❌ Error setting up demo: {str(e)}</h2>"
-    finally:
-        db.close()
 
 # Database check route
 @app.route('/check_db')
 def check_db():
     """Check database status and show table info"""
-    db = SessionLocal()
-    
-    try:
-        users_count = db.query(User).count()
-        students_count = db.query(Student).count()
-        timetable_count = db.query(Timetable).count()
-        attendance_count = db.query(Attendance).count()
-        
-        return f"""
-        <h2>📊 Database Status</h2>
-        <ul>
-            <li><strong>Users:</strong> {users_count}</li>
-            <li><strong>Students:</strong> {students_count}</li>
-            <li><strong>Timetable Entries:</strong> {timetable_count}</li>
-            <li><strong>Attendance Records:</strong> {attendance_count}</li>
-        </ul>
-        <p><a href="/setup_demo">Setup Demo Data</a></p>
-        <p><a href="/login">Go to Login</a></p>
-        """
-    finally:
-        db.close()
+    db = db_session()
+    
+    users_count = db.query(User).count()
+    students_count = db.query(Student).count()
+    timetable_count = db.query(Timetable).count()
+    attendance_count = db.query(Attendance).count()
+    
+    return f"""
+    <h2>📊 Database Status</h2>
+    <ul>
+        <li><strong>Users:</strong> {users_count}</li>
+        <li><strong>Students:</strong> {students_count}</li>
+        <li><strong>Timetable Entries:</strong> {timetable_count}</li>
+        <li><strong>Attendance Records:</strong> {attendance_count}</li>
+    </ul>
+    <p><a href="/setup_demo">Setup Demo Data</a></p>
+    <p><a href="/login">Go to Login</a></p>
+    """
 
 #########################
 # ATTENDANCE ROUTES
 #########################
 
-# Global variable for current attendance session
-attendance_session = {
-    'active': False,
-    'class_name': None,
-    'period': None,
-    'date': None,
-    'marked_students': set()
-}
+# Running attendance sessions, one per teacher (see attendance_sessions.py)
+attendance_sessions = SessionManager()
+
+def current_attendance_session():
+    """The logged-in teacher's session, optionally selected by a session_id parameter"""
+    session_id = request.args.get('session_id') or request.headers.get('X-Attendance-Session')
+    return attendance_sessions.lookup(current_user.id, session_id)
 
 @app.route('/attendance/mark')
 @login_required
@@ -1609,20 +1436,17 @@ def mark_attendance():
         flash('Access denied. Teachers only.', 'danger')
         return redirect(url_for('index'))
     
-    db = SessionLocal()
-    try:
-        # Get unique class names from students
-        classes = db.query(Student.class_name).distinct().all()
-        classes = [c[0] for c in classes if c[0]]
-        
-        # Count enrolled students (with face encodings)
-        enrolled_count = db.query(Student).filter(Student.encodings_path.isnot(None)).count()
-        
-        return render_template('mark_attendance.html', 
-                             classes=classes,
-                             enrolled_count=enrolled_count)
-    finally:
-        db.close()
+    db = db_session()
+    # Get unique class names from students
+    classes = db.query(Student.class_name).distinct().all()
+    classes = [c[0] for c in classes if c[0]]
+    
+    # Count enrolled students (with face encodings)
+    enrolled_count = db.query(Student).filter(Student.encodings_path.isnot(None)).count()
+    
+    return render_template('mark_attendance.html', 
+                         classes=classes,
+                         enrolled_count=enrolled_count)
 
 @app.route('/attendance/start-session', methods=['POST'])
 @login_required
@@ -1638,29 +1462,239 @@ def start_attendance_session():
         
         if not class_name or not period:
             return jsonify({'error': 'Class and period are required'}), 400
+        try:
+            period = int(period)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Period must be a number'}), 400
+        
+        service = get_recognition_service()
+        if service is None:
+            return recognition_disabled_response()
         
         from datetime import date
         today = date.today().isoformat()
         
-        # Update global session
-        attendance_session['active'] = True
-        attendance_session['class_name'] = class_name
-        attendance_session['period'] = period
-        attendance_session['date'] = today
-        attendance_session['marked_students'] = set()
+        # Starting a session ends this teacher's previous one (other teachers are unaffected)
+        att_session = attendance_sessions.start(current_user.id, class_name, period, today)
+        
+        # Only this class's students are candidates during the session
+        att_session.gallery = service.get_class_gallery(class_name)
+        
+        # Streaming clients push frames here; only the latest one is recognized
+        session_stream(service, att_session)
         
         return jsonify({
             'success': True,
             'message': 'Attendance session started',
             'session': {
+                'id': att_session.id,
                 'class_name': class_name,
                 'period': period,
-                'date': today
+                'date': today,
+                'enrolled_in_class': len(att_session.gallery)
             }
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/attendance/recognition-health')
+@login_required
+def recognition_health():
+    """Recognition worker status: pool size, queue usage and per-worker statistics"""
+    if current_user.role not in ('teacher', 'admin'):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    service = get_recognition_service()
+    if service is None:
+        return jsonify({'mode': 'disabled'})
+    return jsonify(service.health())
+
+def read_frame_bytes(service):
+    """
+    Encoded frame bytes from a recognition request. Accepted bodies:
+    - raw image/jpeg (or any image/*) body - used as-is, no base64 or copies
+    - multipart/form-data with the frame in an 'image' file field
+    - JSON {"image": "data:image/jpeg;base64,..."} (older clients)
+    """
+    if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+        return request.get_data(cache=False)
+    
+    if 'image' in request.files:
+        return request.files['image'].read()
+    
+    data = request.get_json(silent=True) or {}
+    image_data = data.get('image')
+    return service.decode_base64(image_data) if image_data else None
+
+def recognize_and_mark(service, att_session, image_bytes):
+    """
+    Recognize every face in an encoded frame and mark the session's students present.
+    Shared by the request/response endpoint and the streaming processor.
+    Attendance rows are queued on the session's write-behind buffer, not committed here.
+    
+    Returns:
+        payload: Result dict (same shape as the recognize-frame JSON response)
+        status: HTTP status code for the payload
+    """
+    # Import face recognition functions
+    from face_utils import match_embeddings_batch
+    from recognition_pool import RecognitionBusy
+    
+    print("🧠 Extracting face embeddings...")
+    # Decode and embed the frame (on a worker process when the pool is enabled)
+    try:
+        embeddings_list, frame_shape = service.embed_frame(image_bytes)
+    except RecognitionBusy:
+        print("⚠️ Recognition workers busy - frame rejected")
+        return {'error': 'Recognition busy, retry shortly', 'busy': True}, 503
+    
+    if frame_shape is None:
+        print("❌ Invalid image - could not decode")
+        return {'error': 'Invalid image'}, 400
+    
+    print(f"✅ Image decoded: {frame_shape}")
+    
+    att_session.count_frame(len(embeddings_list))
+    
+    if not embeddings_list or len(embeddings_list) == 0:
+        print("⚠️ No face detected in frame")
+        return {'recognized': False, 'faces_detected': 0, 'results': [], 'message': 'No face detected'}, 200
+    
+    print(f"✅ Embeddings extracted: {len(embeddings_list)} face(s)")
+    
+    # Match every face in the frame against the class's students in one pass
+    if att_session.gallery is None:
+        # Session started by another worker process
+        att_session.gallery = service.get_class_gallery(att_session.class_name)
+    class_gallery = att_session.gallery
+    print(f"🔍 Matching against {len(class_gallery)} students of class {att_session.class_name}...")
+    matches = match_embeddings_batch(embeddings_list, class_gallery, threshold=0.60)
+    matched = {int(student_id): confidence for student_id, confidence in matches if student_id is not None}
+    
+    # Second pass: are the unmatched faces students of another class?
+    other_class = {}
+    unmatched = [emb for emb, (student_id, _) in zip(embeddings_list, matches) if student_id is None]
+    if CROSS_CLASS_CHECK and unmatched:
+        for student_id, confidence in match_embeddings_batch(unmatched, service.get_gallery(), threshold=0.60):
+            if student_id is not None and student_id not in class_gallery:
+                other_class[int(student_id)] = confidence
+    
+    if not matched and not other_class:
+        print("⚠️ No match found")
+        return {'recognized': False, 'faces_detected': len(embeddings_list), 'results': [], 'message': 'Face not recognized'}, 200
+    
+    print(f"✅ Matches found: {matched}, other class: {other_class}")
+    
+    # Names of recognized students, cached on the session after the first lookup
+    student_infos = session_student_infos(att_session, list(matched) + list(other_class))
+    
+    # Students seen for the first time in this session (by any worker)
+    newly_seen = attendance_sessions.mark(att_session, [sid for sid in matched if sid in student_infos])
+    
+    # Only first sightings touch the database: existing records of this period
+    # decide between "marked", "updated from absent" and "already present"
+    existing_status = {}
+    if newly_seen:
+        db = SessionLocal()
+        try:
+            existing_status = dict(db.query(Attendance.student_id, Attendance.status).filter(
+                Attendance.student_id.in_(newly_seen),
+                Attendance.date == as_date(att_session.date),
+                Attendance.period == att_session.period
+            ).all())
+        finally:
+            db.close()
+    
+    results = []
+    for student_id, confidence in other_class.items():
+        student_info = student_infos.get(student_id)
+        if student_info:
+            results.append({
+                'student': student_info,
+                'other_class': True,
+                'confidence': float(confidence),
+                'message': f"{student_info['name']} belongs to class {student_info['class_name']} - not marked"
+            })
+    
+    to_write = []
+    for student_id, confidence in matched.items():
+        student_info = student_infos.get(student_id)
+        if not student_info:
+            continue
+        name = student_info['name']
+        
+        # Check if already marked in this session
+        if student_id not in newly_seen:
+            results.append({
+                'student': student_info,
+                'already_marked': True,
+                'message': f'{name} already marked in this session'
+            })
+            continue
+        
+        status = existing_status.get(student_id)
+        if status is not None and status.lower() != 'absent':
+            # Already marked present - don't overwrite
+            results.append({
+                'student': student_info,
+                'already_marked': True,
+                'message': f'{name} is already marked PRESENT for this period'
+            })
+            continue
+        
+        # New record, or overwrite of an ABSENT one - written by the session's buffer
+        to_write.append(student_id)
+        if status is not None:
+            results.append({
+                'student': student_info,
+                'updated': True,
+                'confidence': float(confidence),
+                'message': f'Attendance updated from ABSENT to PRESENT for {name}'
+            })
+        else:
+            results.append({
+                'student': student_info,
+                'newly_marked': True,
+                'confidence': float(confidence),
+                'message': f'Attendance marked for {name}'
+            })
+    
+    if to_write:
+        att_session.write_buffer().add(to_write)
+    
+    if not results:
+        return {'recognized': False, 'faces_detected': len(embeddings_list), 'results': [], 'message': 'Student not found in database'}, 200
+    
+    return {
+        'recognized': any(not r.get('other_class') for r in results),
+        'faces_detected': len(embeddings_list),
+        'results': results,
+        'message': '; '.join(r['message'] for r in results),
+        'writes': att_session.write_state()
+    }, 200
+
+def session_student_infos(att_session, student_ids):
+    """
+    Student info dicts for API results; students missing from the session's
+    cache are loaded in one query.
+    """
+    with att_session.lock:
+        missing = [sid for sid in student_ids if sid not in att_session.students]
+    if missing:
+        db = SessionLocal()
+        try:
+            loaded = {
+                s.id: {'id': s.id, 'name': s.name, 'roll_no': s.roll_no, 'class_name': s.class_name}
+                for s in db.query(Student).filter(Student.id.in_(missing)).all()
+            }
+        finally:
+            db.close()
+        with att_session.lock:
+            att_session.students.update(loaded)
+    
+    with att_session.lock:
+        return {sid: att_session.students[sid] for sid in student_ids if sid in att_session.students}
+
 @app.route('/attendance/recognize-frame', methods=['POST'])
 @login_required
 def recognize_frame():
@@ -1671,152 +1705,96 @@ def recognize_frame():
         print("❌ Access denied - not a teacher")
         return jsonify({'error': 'Access denied'}), 403
     
-    if not attendance_session['active']:
+    att_session = current_attendance_session()
+    if att_session is None:
         print("❌ No active session")
         return jsonify({'error': 'No active session'}), 400
     
-    print(f"✅ Session active: Class={attendance_session['class_name']}, Period={attendance_session['period']}")
-    print(f"📊 ENROLLED students: {len(ENROLLED)}")
+    service = get_recognition_service()
+    if service is None:
+        return recognition_disabled_response()
+    
+    print(f"✅ Session active: Class={att_session.class_name}, Period={att_session.period}")
     
     try:
-        data = request.json
-        image_data = data.get('image')
+        image_bytes = read_frame_bytes(service)
         
-        if not image_data:
+        if not image_bytes:
             print("❌ No image data provided")
             return jsonify({'error': 'No image provided'}), 400
         
-        print("📸 Decoding image...")
-        # Decode base64 image
-        image_data = image_data.split(',')[1] if ',' in image_data else image_data
-        image_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            print("❌ Invalid image - could not decode")
-            return jsonify({'error': 'Invalid image'}), 400
-        
-        print(f"✅ Image decoded: {frame.shape}")
-        
-        # Import face recognition functions
-        from face_utils import get_embeddings_from_image_bgr, match_embedding_to_db
-        
-        print("🧠 Extracting face embeddings...")
-        # Extract embeddings from frame
-        embeddings_list, faces = get_embeddings_from_image_bgr(frame)
-        
-        if not embeddings_list or len(embeddings_list) == 0:
-            print("⚠️ No face detected in frame")
-            return jsonify({'recognized': False, 'message': 'No face detected'})
-        
-        # Use the first detected face
-        embedding = embeddings_list[0]
-        print(f"✅ Embeddings extracted: shape={embedding.shape}")
-        
-        # Match against enrolled students
-        print(f"🔍 Matching against {len(ENROLLED)} enrolled students...")
-        matched_id, confidence = match_embedding_to_db(embedding, ENROLLED, threshold=0.60)
-        
-        if matched_id is None:
-            print("⚠️ No match found")
-            return jsonify({'recognized': False, 'message': 'Face not recognized'})
-        
-        print(f"✅ Match found! Student ID: {matched_id}, Confidence: {confidence}")
-        
-        # Check if already marked in this session
-        if matched_id in attendance_session['marked_students']:
-            return jsonify({
-                'recognized': True,
-                'already_marked': True,
-                'message': 'Student already marked in this session'
-            })
-        
-        # Get student info and mark attendance
-        db = SessionLocal()
-        try:
-            student = db.query(Student).filter(Student.id == matched_id).first()
-            
-            if not student:
-                return jsonify({'recognized': False, 'message': 'Student not found in database'})
-            
-            # Check if already marked today for this period
-            from datetime import date
-            today = date.today().isoformat()
-            
-            existing = db.query(Attendance).filter(
-                Attendance.student_id == matched_id,
-                Attendance.date == today,
-                Attendance.period == attendance_session['period']
-            ).first()
-            
-            if existing:
-                # Only allow overwrite if currently marked as absent
-                if existing.status.lower() == 'absent':
-                    existing.status = 'present'
-                    db.commit()
-                    attendance_session['marked_students'].add(matched_id)
-                    return jsonify({
-                        'recognized': True,
-                        'updated': True,
-                        'student': {
-                            'id': student.id,
-                            'name': student.name,
-                            'roll_no': student.roll_no,
-                            'class_name': student.class_name
-                        },
-                        'message': f'Attendance updated from ABSENT to PRESENT for {student.name}'
-                    })
-                else:
-                    # Already marked present - don't overwrite
-                    attendance_session['marked_students'].add(matched_id)
-                    return jsonify({
-                        'recognized': True,
-                        'already_marked': True,
-                        'student': {
-                            'id': student.id,
-                            'name': student.name,
-                            'roll_no': student.roll_no,
-                            'class_name': student.class_name
-                        },
-                        'message': f'{student.name} is already marked PRESENT for this period'
-                    })
-            
-            # Mark attendance
-            attendance = Attendance(
-                student_id=matched_id,
-                date=today,
-                period=attendance_session['period'],
-                status='present'
-            )
-            db.add(attendance)
-            db.commit()
-            
-            # Add to session marked students
-            attendance_session['marked_students'].add(matched_id)
-            
-            return jsonify({
-                'recognized': True,
-                'newly_marked': True,
-                'student': {
-                    'id': student.id,
-                    'name': student.name,
-                    'roll_no': student.roll_no,
-                    'class_name': student.class_name
-                },
-                'confidence': float(confidence),
-                'message': f'Attendance marked for {student.name}'
-            })
-            
-        finally:
-            db.close()
-            
+        payload, status = recognize_and_mark(service, att_session, image_bytes)
+        response = jsonify(payload)
+        if payload.get('busy'):
+            response.headers['Retry-After'] = '1'
+        return response, status
+    
     except Exception as e:
         print(f"Error in recognize_frame: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def process_stream_frame(service, att_session, image_bytes):
+    """FrameStream callback: recognize a pushed frame and return the event to broadcast"""
+    if attendance_sessions.get(att_session.id) is None:
+        return None
+    payload, status = recognize_and_mark(service, att_session, image_bytes)
+    payload['status'] = status
+    return payload
+
+def session_stream(service, att_session):
+    """The session's FrameStream in this process (created here if another worker started the session)"""
+    with att_session.lock:
+        if att_session.stream is None:
+            att_session.stream = FrameStream(
+                lambda frame: process_stream_frame(service, att_session, frame),
+                name=f'{att_session.class_name}-{att_session.period}'
+            )
+        return att_session.stream
+
+@app.route('/attendance/stream/frame', methods=['POST'])
+@login_required
+def push_stream_frame():
+    """Push a frame to the session's stream; results arrive on /attendance/stream/events"""
+    if current_user.role != 'teacher':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    att_session = current_attendance_session()
+    if att_session is None:
+        return jsonify({'error': 'No active session'}), 400
+    
+    service = get_recognition_service()
+    if service is None:
+        return recognition_disabled_response()
+    
+    stream = session_stream(service, att_session)
+    image_bytes = read_frame_bytes(service)
+    if not image_bytes:
+        return jsonify({'error': 'No image provided'}), 400
+    
+    if not stream.push(image_bytes):
+        return jsonify({'error': 'No active session'}), 400
+    return jsonify({'accepted': True, **stream.stats()}), 202
+
+@app.route('/attendance/stream/events')
+@login_required
+def stream_events():
+    """Server-Sent Events: recognition results of the active session as they happen"""
+    if current_user.role != 'teacher':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    att_session = current_attendance_session()
+    service = get_recognition_service()
+    if att_session is None or service is None:
+        # 204 tells EventSource not to reconnect
+        return '', 204
+    
+    return Response(session_stream(service, att_session).subscribe(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/attendance/stop-session', methods=['POST'])
 @login_required
 def stop_attendance_session():
@@ -1825,67 +1803,57 @@ def stop_attendance_session():
         return jsonify({'error': 'Access denied'}), 403
     
     try:
-        if not attendance_session['active']:
+        att_session = current_attendance_session()
+        if att_session is None:
             return jsonify({'error': 'No active session'}), 400
         
-        db = SessionLocal()
-        try:
-            # Get all students in the class
-            class_name = attendance_session['class_name']
-            period = attendance_session['period']
-            date_today = attendance_session['date']
-            
-            # Get all enrolled students in this class
-            students_in_class = db.query(Student).filter(
-                Student.class_name == class_name,
-                Student.encodings_path.isnot(None)  # Only enrolled students
-            ).all()
-            
-            marked_present_count = len(attendance_session['marked_students'])
-            marked_absent_count = 0
-            
-            # Mark absent for students who were not detected
-            for student in students_in_class:
-                if student.id not in attendance_session['marked_students']:
-                    # Check if already has a record for today's period
-                    existing = db.query(Attendance).filter(
-                        Attendance.student_id == student.id,
-                        Attendance.date == date_today,
-                        Attendance.period == period
-                    ).first()
-                    
-                    if not existing:
-                        # Create new absent record
-                        attendance = Attendance(
-                            student_id=student.id,
-                            date=date_today,
-                            period=period,
-                            status='absent'
-                        )
-                        db.add(attendance)
-                        marked_absent_count += 1
-                    # If existing and was already marked absent, keep it
-            
-            db.commit()
-            
-            # Reset session
-            marked_count = marked_present_count
-            attendance_session['active'] = False
-            attendance_session['class_name'] = None
-            attendance_session['period'] = None
-            attendance_session['date'] = None
-            attendance_session['marked_students'] = set()
-            
-            return jsonify({
-                'success': True,
-                'message': f'Session ended. {marked_present_count} present, {marked_absent_count} marked absent.',
+        # No more frames are recognized for this session after this point;
+        # this also flushes the session's pending attendance writes
+        marked_students = attendance_sessions.end(att_session, close_stream=False)
+        write_state = att_session.write_state()
+        
+        db = db_session()
+        class_name = att_session.class_name
+        period = att_session.period
+        date_today = att_session.date
+        
+        marked_present_count = len(marked_students)
+        
+        # Mark absent for enrolled students who were not detected, in one statement
+        marked_absent_count = insert_absentees(db, class_name, date_today, period, marked_students)
+        
+        db.commit()
+        
+        # What is actually stored for this period now that every write is flushed
+        confirmed_present = db.query(Attendance).join(Student).filter(
+            Student.class_name == class_name,
+            Attendance.date == as_date(date_today),
+            Attendance.period == period,
+            func.lower(Attendance.status) == 'present'
+        ).count()
+        
+        # End the streaming clients' event streams
+        if att_session.stream is not None:
+            att_session.stream.close({
                 'marked_present': marked_present_count,
                 'marked_absent': marked_absent_count,
-                'total_marked': marked_present_count + marked_absent_count
+                'confirmed_present': confirmed_present
             })
-        finally:
-            db.close()
-            
+        
+        response = {
+            'success': True,
+            'message': f'Session ended. {marked_present_count} present, {marked_absent_count} marked absent.',
+            'marked_present': marked_present_count,
+            'marked_absent': marked_absent_count,
+            'total_marked': marked_present_count + marked_absent_count,
+            'confirmed_present': confirmed_present,
+            'writes': write_state,
+            'session': att_session.to_dict()
+        }
+        if write_state['pending']:
+            response['warning'] = f"{write_state['pending']} attendance record(s) could not be saved"
+        return jsonify(response)
+    
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1893,10 +1861,13 @@ if __name__ == '__main__':
     print("=" * 50)
     print("🚀 Starting Attendance System")
     print("=" * 50)
-    print("📍 Database initialized at: database.db")
+    print(f"📍 Database initialized at: {engine.url.render_as_string(hide_password=True)}")
     
     # Initialize face recognition
-    init_face_recognition()
+    if RECOGNITION_ENABLED:
+        get_recognition_service().init_face_recognition()
+    else:
+        print("ℹ️ Face recognition disabled (ATTENDANCE_RECOGNITION=0) - reports-only mode")
     
     print("🌐 Server running at: http://localhost:5000")
     print("=" * 50)
@@ -0,0 +1,139 @@
+# attendance_rollups.py
+"""
+Attendance Rollup Tables
+- Present/absent counters per student, per period and per date
+  (attendance_*_totals tables in models.py); class totals are the sum of
+  their students' rows. Statuses are compared case-insensitively; a record
+  with any other status (neither 'present' nor 'absent') is in neither count
+- Kept up to date by SQLite triggers on every INSERT, UPDATE and DELETE of
+  attendance rows, whichever code path writes them
+- rebuild_rollups() recomputes everything from the attendance table
+
+Usage:
+    python attendance_rollups.py            # install triggers, rebuild if out of date
+    python attendance_rollups.py --rebuild  # recompute all counters
+    python attendance_rollups.py --check    # compare counters with the attendance table
+"""
+
+import argparse
+from sqlalchemy import text
+from models import Base, engine, AttendanceStudentTotal, AttendancePeriodTotal, AttendanceDateTotal
+
+# rollup table -> its key column in the attendance table
+ROLLUPS = {
+    'attendance_student_totals': 'student_id',
+    'attendance_period_totals': 'period',
+    'attendance_date_totals': 'date'
+}
+
+PRESENT = "(lower({row}.status) IS 'present')"  # 0/1, never NULL
+ABSENT = "(lower({row}.status) IS 'absent')"
+COUNTED = "lower(status) IN ('present', 'absent')"
+
+TRIGGERS = ['attendance_rollup_insert', 'attendance_rollup_delete', 'attendance_rollup_update']
+
+def _add_row_sql(table, key, row):
+    """Count one attendance row (NEW or OLD) into a rollup"""
+    present, absent = PRESENT.format(row=row), ABSENT.format(row=row)
+    return (
+        f"INSERT INTO {table} ({key}, present, absent) "
+        f"VALUES ({row}.{key}, {present}, {absent}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET "
+        f"present = present + excluded.present, absent = absent + excluded.absent;"
+    )
+
+def _remove_row_sql(table, key, row):
+    """Take one attendance row back out of a rollup"""
+    present, absent = PRESENT.format(row=row), ABSENT.format(row=row)
+    return (
+        f"UPDATE {table} SET present = present - {present}, absent = absent - {absent} "
+        f"WHERE {key} = {row}.{key};"
+    )
+
+def trigger_statements():
+    """CREATE TRIGGER statements that keep every rollup in step with the attendance table"""
+    added = '\n'.join(_add_row_sql(table, key, 'NEW') for table, key in ROLLUPS.items())
+    removed = '\n'.join(_remove_row_sql(table, key, 'OLD') for table, key in ROLLUPS.items())
+    insert, delete, update = TRIGGERS
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {insert} AFTER INSERT ON attendance "
+        f"BEGIN\n{added}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {delete} AFTER DELETE ON attendance "
+        f"BEGIN\n{removed}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {update} "
+        f"AFTER UPDATE OF student_id, date, period, status ON attendance "
+        f"BEGIN\n{removed}\n{added}\nEND"
+    ]
+
+def rebuild_rollups(conn):
+    """Recompute every rollup from the attendance table"""
+    for table, key in ROLLUPS.items():
+        conn.execute(text(f"DELETE FROM {table}"))
+        conn.execute(text(
+            f"INSERT INTO {table} ({key}, present, absent) "
+            f"SELECT {key}, "
+            f"SUM(lower(status) IS 'present'), SUM(lower(status) IS 'absent') "
+            f"FROM attendance GROUP BY {key}"
+        ))
+
+def rollups_match(conn):
+    """True when every rollup holds as many records as the attendance table has present/absent rows"""
+    total = conn.execute(text(f"SELECT COUNT(*) FROM attendance WHERE {COUNTED}")).scalar()
+    for table in ROLLUPS:
+        counted = conn.execute(text(f"SELECT COALESCE(SUM(present + absent), 0) FROM {table}")).scalar()
+        if counted != total:
+            return False
+    return True
+
+def install_rollups(bind=engine):
+    """
+    Create the rollup tables and triggers, and rebuild the counters when they
+    do not match the attendance table (first install, or rows written while
+    the triggers were missing - e.g. after fix_duplicates.py recreated the table).
+    
+    Returns:
+        installed: False on databases other than SQLite (analytics.py then aggregates the attendance table)
+    """
+    if bind.dialect.name != 'sqlite':
+        return False
+    
+    Base.metadata.create_all(bind, tables=[
+        AttendanceStudentTotal.__table__, AttendancePeriodTotal.__table__, AttendanceDateTotal.__table__
+    ])
+    with bind.begin() as conn:
+        for trigger, statement in zip(TRIGGERS, trigger_statements()):
+            # SQLite stores the statement without IF NOT EXISTS; a different one is an older definition
+            installed = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+                                     {'name': trigger}).scalar()
+            if installed is not None and installed != statement.replace(" IF NOT EXISTS", "", 1):
+                conn.execute(text(f"DROP TRIGGER {trigger}"))
+            conn.execute(text(statement))
+        if not rollups_match(conn):
+            print("🔄 Rebuilding attendance rollups...")
+            rebuild_rollups(conn)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='Recompute all counters')
+    parser.add_argument('--check', action='store_true', help='Only compare counters with the attendance table')
+    args = parser.parse_args()
+    
+    if args.check:
+        with engine.connect() as conn:
+            ok = rollups_match(conn)
+        print("✅ Rollups match the attendance table" if ok else "❌ Rollups are out of date - run with --rebuild")
+        raise SystemExit(0 if ok else 1)
+    
+    if not install_rollups():
+        raise SystemExit(f"❌ Rollup triggers are only available on SQLite (engine: {engine.dialect.name})")
+    if args.rebuild:
+        with engine.begin() as conn:
+            rebuild_rollups(conn)
+    
+    with engine.connect() as conn:
+        counts = {table: conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() for table in ROLLUPS}
+    print("✅ Rollups ready: " + ', '.join(f"{table} {rows} rows" for table, rows in counts.items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# attendance_sessions.py
+"""
+Attendance Session Manager
+- Any number of concurrent attendance sessions, keyed by session ID
+- At most one active session per teacher (starting a new one replaces it)
+- Per-session state: class gallery, marked students, frame/face counters
+  and the write-behind buffer of attendance records (attendance_writer.py)
+- "memory" backend for a single process, "database" backend (live_sessions
+  tables) so several worker processes can serve the same session
+"""
+
+import os
+import threading
+import time
+import uuid
+from models import SessionLocal, LiveSession, LiveSessionMark, dialect_insert
+from attendance_writer import AttendanceWriteBuffer
+
+# "memory" or "database" (needed when running several worker processes)
+SESSION_BACKEND = os.environ.get('ATTENDANCE_SESSION_BACKEND', 'memory')
+
+class AttendanceSession:
+    """State of one running attendance session"""
+    
+    def __init__(self, session_id, teacher_id, class_name, period, date, started_at=None, marked_students=None):
+        self.id = session_id
+        self.teacher_id = teacher_id
+        self.class_name = class_name
+        self.period = period
+        self.date = date
+        self.started_at = started_at or time.time()
+        self.marked_students = set(marked_students or ())
+        
+        # Process-local state
+        self.gallery = None  # FaceGallery of the class's enrolled students
+        self.stream = None   # FrameStream for streaming clients
+        self.writer = None   # AttendanceWriteBuffer, created on the first recognition
+        self.students = {}   # student id -> info dict, loaded on first recognition
+        self.frames = 0
+        self.faces = 0
+        self.lock = threading.RLock()
+    
+    def count_frame(self, faces):
+        """Count one processed frame and the faces found in it"""
+        with self.lock:
+            self.frames += 1
+            self.faces += faces
+    
+    def write_buffer(self):
+        """The session's write-behind buffer in this process"""
+        with self.lock:
+            if self.writer is None:
+                self.writer = AttendanceWriteBuffer(self.date, self.period)
+            return self.writer
+    
+    def write_state(self):
+        """Pending/durable counts of this process's attendance writes"""
+        if self.writer is None:
+            return {'pending': 0, 'durable': 0, 'flushes': 0, 'failed_flushes': 0}
+        return self.writer.state()
+    
+    def to_dict(self):
+        """Summary for API responses"""
+        return {
+            'id': self.id,
+            'class_name': self.class_name,
+            'period': self.period,
+            'date': self.date,
+            'marked': len(self.marked_students),
+            'frames': self.frames,
+            'faces': self.faces,
+            'writes': self.write_state()
+        }
+
+class SessionManager:
+    """Thread-safe registry of running attendance sessions"""
+    
+    def __init__(self, backend=SESSION_BACKEND):
+        if backend not in ('memory', 'database'):
+            raise ValueError(f"Unknown session backend: {backend}")
+        self.backend = backend
+        self._lock = threading.RLock()  # re-entered by start(), which holds it across the replace
+        self._sessions = {}  # session id -> AttendanceSession
+    
+    def start(self, teacher_id, class_name, period, date):
+        """
+        Start a session for a teacher. The teacher's previous session, if any,
+        is ended first; the whole replace holds the manager lock, so concurrent
+        starts by one teacher leave exactly one session.
+        
+        Returns:
+            session: The new AttendanceSession
+        """
+        with self._lock:
+            replaced = self.for_teacher(teacher_id)
+            if replaced is not None:
+                self.end(replaced)
+            
+            session = AttendanceSession(uuid.uuid4().hex, teacher_id, class_name, period, date)
+            if self.backend == 'database':
+                db = SessionLocal()
+                try:
+                    db.add(LiveSession(
+                        id=session.id,
+                        teacher_id=teacher_id,
+                        class_name=class_name,
+                        period=str(period),
+                        date=date,
+                        started_at=session.started_at
+                    ))
+                    db.commit()
+                finally:
+                    db.close()
+            
+            self._sessions[session.id] = session
+            return session
+    
+    def get(self, session_id):
+        """Session by ID (loaded from the database backend if another process started it)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None or self.backend != 'database':
+            return session
+        
+        db = SessionLocal()
+        try:
+            row = db.query(LiveSession).filter_by(id=session_id).first()
+            if row is None:
+                return None
+            marked = [m.student_id for m in db.query(LiveSessionMark).filter_by(session_id=session_id)]
+            session = AttendanceSession(row.id, row.teacher_id, row.class_name, int(row.period), row.date,
+                                        started_at=row.started_at, marked_students=marked)
+        finally:
+            db.close()
+        
+        with self._lock:
+            return self._sessions.setdefault(session.id, session)
+    
+    def for_teacher(self, teacher_id):
+        """The teacher's active session, or None"""
+        with self._lock:
+            for session in self._sessions.values():
+                if session.teacher_id == teacher_id:
+                    return session
+        if self.backend != 'database':
+            return None
+        
+        db = SessionLocal()
+        try:
+            row = db.query(LiveSession.id).filter_by(teacher_id=teacher_id).first()
+        finally:
+            db.close()
+        return self.get(row[0]) if row else None
+    
+    def lookup(self, teacher_id, session_id=None):
+        """Session for a request: by ID if given (must belong to the teacher), else the teacher's session"""
+        if session_id:
+            session = self.get(session_id)
+            if session is None or session.teacher_id != teacher_id:
+                return None
+            if self.backend == 'database' and not self._is_live(session_id):
+                self._forget(session)
+                return None
+            return session
+        
+        session = self.for_teacher(teacher_id)
+        if session is not None and self.backend == 'database' and not self._is_live(session.id):
+            # Ended by another process
+            self._forget(session)
+            return self.for_teacher(teacher_id)
+        return session
+    
+    def active(self):
+        """Sessions known to this process"""
+        with self._lock:
+            return list(self._sessions.values())
+    
+    def mark(self, session, student_ids):
+        """
+        Record students as present in a session.
+        
+        Returns:
+            newly_marked: The subset of student_ids not marked before (by any process)
+        """
+        student_ids = set(student_ids)
+        if self.backend == 'database':
+            newly_marked = set()
+            db = SessionLocal()
+            try:
+                for student_id in student_ids:
+                    result = db.execute(
+                        dialect_insert(LiveSessionMark.__table__)
+                        .values(session_id=session.id, student_id=student_id)
+                        .on_conflict_do_nothing()
+                    )
+                    if result.rowcount:
+                        newly_marked.add(student_id)
+                db.commit()
+            finally:
+                db.close()
+        else:
+            with session.lock:
+                newly_marked = student_ids - session.marked_students
+                session.marked_students |= student_ids
+            return newly_marked
+        
+        with session.lock:
+            session.marked_students |= student_ids
+        return newly_marked
+    
+    def end(self, session, close_stream=True):
+        """
+        End a session everywhere. Pending attendance writes are flushed before
+        this returns. With close_stream=False the caller closes session.stream
+        itself (e.g. with a final summary event).
+        
+        Returns:
+            marked_students: Final set of students marked present
+        """
+        marked = set(session.marked_students)
+        if self.backend == 'database':
+            db = SessionLocal()
+            try:
+                marked |= {m.student_id for m in db.query(LiveSessionMark).filter_by(session_id=session.id)}
+                db.query(LiveSessionMark).filter_by(session_id=session.id).delete()
+                db.query(LiveSession).filter_by(id=session.id).delete()
+                db.commit()
+            finally:
+                db.close()
+        
+        self._forget(session, close_stream)
+        return marked
+    
+    def _is_live(self, session_id):
+        db = SessionLocal()
+        try:
+            return db.query(LiveSession.id).filter_by(id=session_id).first() is not None
+        finally:
+            db.close()
+    
+    def _forget(self, session, close_stream=True):
+        with self._lock:
+            self._sessions.pop(session.id, None)
+        if session.writer is not None:
+            session.writer.close()
+        if close_stream and session.stream is not None:
+            session.stream.close({'marked_present': len(session.marked_students)})
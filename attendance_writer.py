@@ -0,0 +1,159 @@
+# attendance_writer.py
+"""
+Write-Behind Attendance Persistence
+- Recognitions during a live session are queued in memory, not committed one by one
+- A background thread flushes the queue as one batched upsert every
+  FLUSH_INTERVAL_MS, or sooner once FLUSH_MAX_EVENTS are waiting
+- Absentees are inserted in one INSERT ... SELECT when the session ends
+- Both rely on the UNIQUE(student_id, date, period) key of the attendance table
+"""
+
+import threading
+from sqlalchemy import func, select, literal
+from models import SessionLocal, Attendance, Student, dialect_insert, as_date
+
+FLUSH_INTERVAL_MS = 500  # Longest time a recognition waits before it is written
+FLUSH_MAX_EVENTS = 50    # Flush early once this many students are waiting
+
+def upsert_present(db, student_ids, date, period):
+    """
+    Mark students present for (date, period) in one statement: new rows are
+    inserted, existing 'absent' rows are switched to 'present', 'present' rows are kept.
+    """
+    table = Attendance.__table__
+    date, period = as_date(date), int(period)
+    stmt = dialect_insert(table).values([
+        {'student_id': student_id, 'date': date, 'period': period, 'status': 'present'}
+        for student_id in student_ids
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['student_id', 'date', 'period'],
+        set_={'status': stmt.excluded.status},
+        where=func.lower(table.c.status) == 'absent'
+    )
+    db.execute(stmt)
+
+def insert_absentees(db, class_name, date, period, present_ids=()):
+    """
+    Mark every enrolled student of a class absent for (date, period) unless
+    they were seen (present_ids) or already have a record for that period.
+    
+    Returns:
+        inserted: Number of absent rows created
+    """
+    table = Attendance.__table__
+    date, period = as_date(date), int(period)
+    enrolled = select(
+        Student.id,
+        literal(date, Attendance.date.type),
+        literal(period, Attendance.period.type),
+        literal('absent', Attendance.status.type)
+    ).where(
+        Student.class_name == class_name,
+        Student.encodings_path.isnot(None)  # Only enrolled students
+    )
+    if present_ids:
+        enrolled = enrolled.where(Student.id.notin_(list(present_ids)))
+    
+    # Students that already have a record for the period hit the unique key and are skipped
+    stmt = dialect_insert(table).from_select(['student_id', 'date', 'period', 'status'], enrolled)
+    stmt = stmt.on_conflict_do_nothing(index_elements=['student_id', 'date', 'period'])
+    return db.execute(stmt).rowcount
+
+class AttendanceWriteBuffer:
+    """
+    Pending 'present' marks of one session.
+    
+    Args:
+        date, period: The session's attendance slot
+        flush_interval_ms, max_events: Flush triggers
+    """
+    
+    def __init__(self, date, period, flush_interval_ms=FLUSH_INTERVAL_MS, max_events=FLUSH_MAX_EVENTS):
+        self.date = date
+        self.period = period
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._pending = set()
+        self._durable = set()
+        self._closed = False
+        
+        self.flushes = 0
+        self.failed_flushes = 0
+        
+        self._thread = threading.Thread(target=self._run, name=f'attendance-writer-{period}', daemon=True)
+        self._thread.start()
+    
+    def add(self, student_ids):
+        """Queue students to be marked present (already written or queued ones are ignored)"""
+        with self._cond:
+            self._pending |= set(student_ids) - self._durable
+            closed = self._closed
+            if len(self._pending) >= self.max_events:
+                self._cond.notify()
+        if closed:
+            # A frame finished after the session ended: nobody else will flush it
+            self.flush()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._pending) >= self.max_events,
+                                    timeout=self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+    
+    def flush(self):
+        """
+        Write everything pending in one transaction.
+        
+        Returns:
+            written: Number of students written (0 if nothing was pending or the write failed)
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, set()
+            if not batch:
+                return 0
+            
+            db = SessionLocal()
+            try:
+                upsert_present(db, sorted(batch), self.date, self.period)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.failed_flushes += 1
+                print(f"❌ Attendance flush failed ({len(batch)} students), will retry: {e}")
+                with self._cond:
+                    self._pending |= batch
+                return 0
+            finally:
+                db.close()
+            
+            with self._cond:
+                self._durable |= batch
+            self.flushes += 1
+            return len(batch)
+    
+    def close(self):
+        """Stop the background thread and write whatever is still pending"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+        return self.state()
+    
+    def state(self):
+        """Counts of pending and durably written students"""
+        with self._cond:
+            return {
+                'pending': len(self._pending),
+                'durable': len(self._durable),
+                'flushes': self.flushes,
+                'failed_flushes': self.failed_flushes
+            }
@@ -0,0 +1,128 @@
+"""
+Benchmark the analytics page statistics: Python loops vs SQL aggregation
+
+Builds a throwaway SQLite database (students x days x periods attendance
+rows) and times the statistics behind reports_analytics/admin_analytics:
+    legacy     load every Student and Attendance object, rescan the records per student
+    sql        analytics.overview() with GROUP BY over the attendance table
+    rollups    analytics.overview() reading the trigger-maintained rollup tables
+
+The legacy loop is O(students x records); above --legacy-max-records it is
+timed on a sample of students and extrapolated.
+
+Usage:
+    python bench_analytics.py                          # 10k students x 200 days
+    python bench_analytics.py --students 1000 --days 50 --periods 2
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import analytics
+from attendance_rollups import install_rollups
+from models import Base, Student, Attendance
+
+def build_database(path, students, days, periods):
+    engine = create_engine(f'sqlite:///{path}', future=True)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    
+    conn = sqlite3.connect(path)
+    rng = random.Random(0)
+    conn.executemany(
+        "INSERT INTO students (id, name, roll_no, class_name, encodings_path) VALUES (?, ?, ?, ?, ?)",
+        ((i, f'Student {i}', f'R{i:05d}', f'Class {i % 40}', 'embeddings.npy' if i % 10 else None)
+         for i in range(1, students + 1))
+    )
+    start = date(2024, 1, 1)
+    for day in range(days):
+        day_str = (start + timedelta(days=day)).isoformat()
+        conn.executemany(
+            "INSERT INTO attendance (student_id, date, period, status) VALUES (?, ?, ?, ?)",
+            ((i, day_str, period, 'present' if rng.random() < 0.85 else 'absent')
+             for i in range(1, students + 1) for period in range(1, periods + 1))
+        )
+    conn.commit()
+    conn.close()
+    return create_engine(f'sqlite:///{path}', future=True)
+
+def legacy_stats(db, sample=None):
+    """The per-student loops the analytics pages used to run (statistics only)"""
+    students = db.query(Student).all()
+    attendance_records = db.query(Attendance).all()
+    
+    for student in students[:sample]:
+        student_records = [r for r in attendance_records if r.student_id == student.id]
+        present_count = len([r for r in student_records if r.status.lower() == 'present'])
+    for student in students[:sample]:
+        student_records = [r for r in attendance_records if r.student_id == student.id]
+        present_count = len([r for r in student_records if r.status.lower() == 'present'])
+    return len(students), len(attendance_records)
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=200)
+    parser.add_argument('--periods', type=int, default=1)
+    parser.add_argument('--legacy-max-records', type=int, default=20000,
+                        help='Above this many records the legacy loop runs on a student sample')
+    parser.add_argument('--legacy-sample', type=int, default=20)
+    args = parser.parse_args()
+    
+    records = args.students * args.days * args.periods
+    print("=" * 66)
+    print("ANALYTICS AGGREGATION BENCHMARK")
+    print("=" * 66)
+    print(f"📊 {args.students:,} students x {args.days} days x {args.periods} period(s) = {records:,} records")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_start = time.perf_counter()
+        engine = build_database(path, args.students, args.days, args.periods)
+        print(f"🔨 Database built in {time.perf_counter() - build_start:.1f}s")
+        
+        rollup_start = time.perf_counter()
+        install_rollups(engine)
+        print(f"🔄 Rollups built in {time.perf_counter() - rollup_start:.1f}s")
+        
+        Session = sessionmaker(bind=engine)
+        results = []
+        
+        db = Session()
+        if records <= args.legacy_max_records:
+            results.append(('legacy', timed(lambda: legacy_stats(db)), ''))
+        else:
+            # Loading is paid once, the rescans once per student: time a sample and scale the scans
+            load = timed(lambda: legacy_stats(db, sample=0))
+            db.close()
+            db = Session()
+            sampled = timed(lambda: legacy_stats(db, sample=args.legacy_sample)) - load
+            estimate = load + sampled / args.legacy_sample * args.students
+            results.append(('legacy', estimate, f'(estimated from {args.legacy_sample} students)'))
+        db.close()
+        
+        for name, source in (('sql', analytics.ATTENDANCE), ('rollups', analytics.ROLLUPS)):
+            db = Session()
+            results.append((name, timed(lambda: analytics.overview(db, source)), ''))
+            db.close()
+        engine.dispose()
+    
+    legacy_seconds = results[0][1]
+    print(f"\n{'Method':<10} {'Seconds':>12} {'Speed-up':>10}")
+    print("-" * 66)
+    for name, seconds, note in results:
+        print(f"{name:<10} {seconds:>12.3f} {legacy_seconds / seconds:>9.0f}x {note}")
+    print("=" * 66)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark ANN indexes against exact matching (recall vs latency)
+
+Usage:
+    python bench_ann_index.py                      # synthetic gallery
+    python bench_ann_index.py --encodings          # gallery from encodings/*.npy
+    python bench_ann_index.py --students 20000 --dim 2622
+"""
+import argparse
+import time
+import numpy as np
+from face_utils import FaceGallery, load_all_enrollments, match_embedding_to_db
+from face_index import IVFIndex, HNSWIndex, hnswlib
+
+def synthetic_enrollments(num_students, samples, dim, seed=0):
+    """Clustered random embeddings: one center per student plus per-sample noise"""
+    rng = np.random.default_rng(seed)
+    enrolled = {}
+    for i in range(num_students):
+        center = rng.normal(size=dim)
+        embs = center + 0.5 * rng.normal(size=(samples, dim))
+        enrolled[str(i)] = (embs / np.linalg.norm(embs, axis=1, keepdims=True)).astype(np.float32)
+    return enrolled
+
+def make_queries(gallery, num_queries, seed=1):
+    """Noisy copies of stored samples (genuine faces) plus some unknown faces"""
+    rng = np.random.default_rng(seed)
+    dim = gallery.matrix.shape[1]
+    rows = rng.choice(gallery.num_samples, num_queries, replace=True)
+    queries = gallery.matrix[rows] + 0.05 * rng.normal(size=(num_queries, dim)).astype(np.float32)
+    unknown = rng.normal(size=(num_queries // 10, dim)).astype(np.float32)
+    return np.vstack([queries, unknown])
+
+def run(gallery, queries, threshold):
+    """Match every query one at a time"""
+    start = time.perf_counter()
+    results = [match_embedding_to_db(q, gallery, threshold=threshold) for q in queries]
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+    return results, elapsed
+
+def recall(results, exact):
+    """Fraction of queries where the index made the same decision as exact search"""
+    return sum(1 for r, e in zip(results, exact) if r[0] == e[0]) / len(exact)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--encodings', action='store_true', help='use encodings/*.npy instead of synthetic data')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--samples', type=int, default=15)
+    parser.add_argument('--dim', type=int, default=512)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--threshold', type=float, default=0.60)
+    args = parser.parse_args()
+    
+    print("=" * 66)
+    print("ANN INDEX BENCHMARK")
+    print("=" * 66)
+    
+    if args.encodings:
+        enrolled = load_all_enrollments()
+    else:
+        enrolled = synthetic_enrollments(args.students, args.samples, args.dim)
+    
+    gallery = FaceGallery.from_enrolled(enrolled)
+    queries = make_queries(gallery, args.queries)
+    print(f"📊 Gallery: {len(gallery)} students, {gallery.num_samples} samples, dim {gallery.matrix.shape[1]}")
+    print(f"📊 Queries: {len(queries)}, threshold {args.threshold}")
+    
+    # Reference: exact match_embedding_to_db over the dense gallery
+    start = time.perf_counter()
+    exact = [match_embedding_to_db(q, gallery, threshold=args.threshold) for q in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    
+    print(f"\n{'Index':<16} {'Params':<20} {'Build s':>8} {'ms/query':>10} {'Recall':>8}")
+    print("-" * 66)
+    print(f"{'Exact':<16} {'-':<20} {'-':>8} {exact_ms:>10.3f} {1.0:>8.3f}")
+    
+    base_nlist = max(1, int(np.sqrt(gallery.num_samples)))
+    for nlist in (base_nlist, base_nlist * 4):
+        start = time.perf_counter()
+        index = IVFIndex(gallery, nlist=nlist)
+        build_s = time.perf_counter() - start
+        for nprobe in (1, 2, 4, 8, 16, 32):
+            if nprobe > nlist:
+                continue
+            index.nprobe = nprobe
+            gallery.set_index(index)
+            results, ms = run(gallery, queries, args.threshold)
+            print(f"{'IVF':<16} {f'nlist={nlist} nprobe={nprobe}':<20} {build_s:>8.2f} {ms:>10.3f} {recall(results, exact):>8.3f}")
+    
+    if hnswlib is not None:
+        for ef in (50, 100, 200, 400):
+            start = time.perf_counter()
+            index = HNSWIndex(gallery, ef=ef)
+            build_s = time.perf_counter() - start
+            gallery.set_index(index)
+            results, ms = run(gallery, queries, args.threshold)
+            print(f"{'HNSW':<16} {f'ef={ef}':<20} {build_s:>8.2f} {ms:>10.3f} {recall(results, exact):>8.3f}")
+    else:
+        print("ℹ️ hnswlib not installed - skipping HNSW")
+    
+    gallery.set_index(None)
+    print("=" * 66)
+
+if __name__ == '__main__':
+    main()
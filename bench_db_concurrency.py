@@ -0,0 +1,126 @@
+"""
+Benchmark analytics reads while recognition writes are in flight
+
+Builds a throwaway SQLite database, then for each engine profile runs
+reader threads (analytics.overview + student dashboard queries, like the
+analytics pages and dashboards) next to writer threads (upsert_present
+batches, like the attendance write buffer) for a fixed time:
+    default    create_engine() defaults (rollback journal, synchronous=FULL, no busy timeout)
+    tuned      models.make_engine() (WAL, synchronous=NORMAL, mmap, cache, busy timeout, sized pool)
+
+Reports reads/s, read latency p50/p95, written rows/s and 'database is
+locked' errors per profile.
+
+Usage:
+    python bench_db_concurrency.py                          # 2k students x 60 days, 10s per profile
+    python bench_db_concurrency.py --readers 8 --writers 2 --seconds 20
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+import analytics
+from attendance_rollups import install_rollups
+from attendance_writer import upsert_present
+from bench_analytics import build_database
+from models import Attendance, make_engine
+
+BATCH = 20  # students per write, about one flush of the write buffer
+
+def reader(Session, students, stop, results, rng):
+    while not stop.is_set():
+        db = Session()
+        start = time.perf_counter()
+        try:
+            analytics.overview(db)
+            db.execute(select(Attendance.date, Attendance.period, Attendance.status)
+                       .where(Attendance.student_id == rng.randint(1, students))
+                       .order_by(Attendance.date.desc())).all()
+            results['latencies'].append(time.perf_counter() - start)
+        except OperationalError:
+            results['read_errors'] += 1
+        finally:
+            db.close()
+
+def writer(Session, students, stop, results, rng, day):
+    period = 1
+    while not stop.is_set():
+        db = Session()
+        try:
+            ids = rng.sample(range(1, students + 1), BATCH)
+            upsert_present(db, ids, day, period)
+            db.commit()
+            results['written'] += BATCH
+        except OperationalError:
+            db.rollback()
+            results['write_errors'] += 1
+        finally:
+            db.close()
+        period = period % 8 + 1
+
+def run(engine, args):
+    Session = sessionmaker(bind=engine)
+    results = {'latencies': [], 'read_errors': 0, 'written': 0, 'write_errors': 0}
+    stop = threading.Event()
+    day = date(2024, 1, 1) + timedelta(days=args.days)  # a new day, like a live session
+    threads = [threading.Thread(target=reader, args=(Session, args.students, stop, results, random.Random(i)))
+               for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(Session, args.students, stop, results, random.Random(100 + i), day))
+                for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--periods', type=int, default=1)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    
+    print("=" * 78)
+    print("DATABASE CONCURRENCY BENCHMARK")
+    print("=" * 78)
+    print(f"📊 {args.students:,} students x {args.days} days x {args.periods} period(s), "
+          f"{args.readers} readers + {args.writers} writers for {args.seconds:g}s per profile")
+    
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('default', 'tuned'):
+            path = os.path.join(tmp, f'{name}.db')
+            install_rollups(build_database(path, args.students, args.days, args.periods))
+            if name == 'default':
+                engine = create_engine(f'sqlite:///{path}', future=True)
+            else:
+                engine = make_engine(f'sqlite:///{path}')
+            print(f"⏱️ Running {name}...")
+            results.append((name, run(engine, args)))
+    
+    print(f"\n{'Profile':<10} {'Reads/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'Rows/s':>9} {'Locked (r/w)':>14}")
+    print("-" * 78)
+    for name, result in results:
+        latencies = sorted(result['latencies'])
+        p50 = statistics.median(latencies) * 1000 if latencies else float('nan')
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else float('nan')
+        locked = f"{result['read_errors']}/{result['write_errors']}"
+        print(f"{name:<10} {len(latencies) / args.seconds:>9.1f} {p50:>9.1f} {p95:>9.1f} "
+              f"{result['written'] / args.seconds:>9.0f} {locked:>14}")
+    print("=" * 78)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark frame upload formats for /attendance/recognize-frame
+
+Compares, per frame:
+    json      {"image": "data:image/jpeg;base64,..."} - JSON parse, split, b64decode, imdecode
+    raw       image/jpeg request body - imdecode straight from the body bytes
+    multipart image file field in multipart/form-data
+
+Usage:
+    python bench_frame_upload.py                    # synthetic 640x480 frame
+    python bench_frame_upload.py --image face.jpg --runs 500
+"""
+import argparse
+import base64
+import json
+import time
+import cv2
+import numpy as np
+from flask import Flask, request
+
+def make_frame(path, width, height):
+    if path:
+        frame = cv2.imread(path)
+        if frame is None:
+            raise SystemExit(f"❌ Could not read {path}")
+        return frame
+    
+    # Smooth gradient plus noise compresses roughly like a webcam frame
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    return np.clip(base + rng.normal(0, 8, base.shape), 0, 255).astype(np.uint8)
+
+def decode_json(data):
+    image_data = data['image']
+    image_data = image_data.split(',')[1] if ',' in image_data else image_data
+    return cv2.imdecode(np.frombuffer(base64.b64decode(image_data), np.uint8), cv2.IMREAD_COLOR)
+
+def decode_raw(body):
+    return cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+
+def timed(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='JPEG/PNG to use instead of a synthetic frame')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+    
+    frame = make_frame(args.image, args.width, args.height)
+    jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, args.quality])[1].tobytes()
+    json_body = json.dumps({'image': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()}).encode()
+    
+    print("=" * 66)
+    print("FRAME UPLOAD BENCHMARK")
+    print("=" * 66)
+    print(f"📊 Frame {frame.shape[1]}x{frame.shape[0]}, JPEG quality {args.quality}, {args.runs} runs")
+    
+    # Request parsing as Flask does it, plus the decode
+    app = Flask(__name__)
+    boundary = 'frameboundary'
+    multipart_body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="frame.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + jpeg + f'\r\n--{boundary}--\r\n'.encode()
+    
+    def through_flask(body, content_type, read):
+        def run():
+            with app.test_request_context('/', method='POST', data=body, content_type=content_type):
+                return read()
+        return run
+    
+    paths = [
+        ('json', json_body,
+         lambda: decode_json(json.loads(json_body)),
+         through_flask(json_body, 'application/json',
+                       lambda: decode_json(request.get_json()))),
+        ('raw', jpeg,
+         lambda: decode_raw(jpeg),
+         through_flask(jpeg, 'image/jpeg',
+                       lambda: decode_raw(request.get_data(cache=False)))),
+        ('multipart', multipart_body,
+         lambda: decode_raw(jpeg),
+         through_flask(multipart_body, f'multipart/form-data; boundary={boundary}',
+                       lambda: decode_raw(request.files['image'].read()))),
+    ]
+    
+    print(f"\n{'Format':<10} {'Bytes/frame':>12} {'vs raw':>8} {'Decode ms':>10} {'Request+decode ms':>18}")
+    print("-" * 66)
+    for name, body, decode, request_decode in paths:
+        decode_ms = timed(decode, args.runs)
+        request_ms = timed(request_decode, args.runs)
+        print(f"{name:<10} {len(body):>12,} {len(body) / len(jpeg):>7.2f}x {decode_ms:>10.3f} {request_ms:>18.3f}")
+    
+    print("=" * 66)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark process start-up cost with and without the face recognition stack
+
+Each mode runs in a fresh interpreter, against a temporary copy of database.db
+(importing app creates tables and rollup triggers, which would modify the real file):
+    reports      ATTENDANCE_RECOGNITION=0, import app
+    recognition  import app, then load the recognition service and DeepFace
+    warm         as recognition, plus model build and warm-up inference
+
+Usage:
+    python bench_import_time.py
+    python bench_import_time.py --runs 5 --warm
+"""
+import argparse
+import json
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Peak memory: max RSS where the resource module exists (Unix), else psutil's
+# peak working set (Windows), else tracemalloc's peak of Python allocations only
+# (started only in that case, since tracing slows the imports being timed)
+CHILD = r'''
+import json, sys, time
+try:
+    import resource
+except ImportError:
+    resource = None
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+        import tracemalloc
+        tracemalloc.start()
+start = time.perf_counter()
+import app
+if sys.argv[1] != "reports":
+    service = app.get_recognition_service()
+    import face_utils
+    from deepface import DeepFace
+    if sys.argv[1] == "warm":
+        face_utils.warm_up_model()
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("numpy", "cv2", "deepface", "tensorflow") if m in sys.modules]
+if resource is not None:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    measure = "max RSS"
+elif psutil is not None:
+    info = psutil.Process().memory_info()
+    peak, measure = getattr(info, "peak_wset", info.rss), "peak working set"
+else:
+    peak, measure = tracemalloc.get_traced_memory()[1], "tracemalloc peak (Python objects only)"
+print(json.dumps({"seconds": elapsed, "peak_mb": peak / 1024 / 1024, "measure": measure, "loaded": heavy}))
+'''
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def run_mode(mode):
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'database.db')
+        if os.path.exists(os.path.join(HERE, 'database.db')):
+            shutil.copy(os.path.join(HERE, 'database.db'), database)
+        
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+        if mode == "reports":
+            env['ATTENDANCE_RECOGNITION'] = '0'
+        result = subprocess.run([sys.executable, '-c', CHILD, mode], env=env, capture_output=True, text=True, cwd=HERE)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--warm', action='store_true', help='also measure model build + warm-up')
+    args = parser.parse_args()
+    
+    modes = ['reports', 'recognition'] + (['warm'] if args.warm else [])
+    
+    print("=" * 66)
+    print("IMPORT TIME BENCHMARK")
+    print("=" * 66)
+    print(f"\n{'Mode':<14} {'Median s':>9} {'Peak MB':>11}  Loaded")
+    print("-" * 66)
+    
+    measures = set()
+    for mode in modes:
+        samples = [run_mode(mode) for _ in range(args.runs)]
+        failed = [s for s in samples if 'error' in s]
+        if failed:
+            print(f"{mode:<14} ❌ {failed[0]['error']}")
+            continue
+        
+        seconds = statistics.median(s['seconds'] for s in samples)
+        peak = max(s['peak_mb'] for s in samples)
+        measures.add(samples[0]['measure'])
+        print(f"{mode:<14} {seconds:>9.3f} {peak:>11.1f}  {', '.join(samples[0]['loaded']) or '-'}")
+    
+    print("=" * 66)
+    if measures:
+        print(f"Peak MB: {', '.join(sorted(measures))}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+Consolidated Face Embedding Store
+- One float32 matrix for all students in encodings/gallery.npy (memory-mappable)
+- An ID -> row segments index in encodings/gallery.json
+- Appends write only the new rows; deletes only touch the index until compaction
+"""
+
+import io
+import json
+import os
+import threading
+import weakref
+import numpy as np
+
+STORE_FILENAME = "gallery.npy"
+INDEX_FILENAME = "gallery.json"
+MIGRATED_FOLDER = "migrated"  # where the old per-student .npy files are moved
+
+# Writers in this process take turns; the store assumes a single writing process
+_write_lock = threading.Lock()
+
+# Long-lived readers memory-mapping a store file in this process (store path -> WeakSet).
+# Writers call their release_mapping() before changing the file, so the mapping never
+# sees a truncated or replaced file (SIGBUS on POSIX, a failed replace on Windows)
+_mapped_readers = {}
+
+def _npy_header(num_rows, dim):
+    """Serialized .npy header for a (num_rows, dim) float32 matrix"""
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buf, {
+        'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+        'fortran_order': False,
+        'shape': (num_rows, dim)
+    })
+    return buf.getvalue()
+
+class EmbeddingStore:
+    """
+    Append-friendly store of all enrolled face embeddings.
+    
+    Index format (gallery.json):
+        {"dim": 2622, "rows": 30, "students": {"5": [[0, 15]], "6": [[15, 15]]}}
+    where each student maps to a list of [offset, count] row segments.
+    """
+    
+    def __init__(self, encodings_folder='encodings'):
+        self.folder = encodings_folder
+        self.store_path = os.path.join(encodings_folder, STORE_FILENAME)
+        self.index_path = os.path.join(encodings_folder, INDEX_FILENAME)
+    
+    def exists(self):
+        return os.path.exists(self.store_path) and os.path.exists(self.index_path)
+    
+    def read_index(self):
+        if not os.path.exists(self.index_path):
+            return {'dim': 0, 'rows': 0, 'students': {}}
+        with open(self.index_path) as f:
+            return json.load(f)
+    
+    def _write_index(self, index):
+        # Write to a temp file and swap, so readers never see a half-written index
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+    
+    def load(self, mmap=True):
+        """
+        Open the store.
+        
+        Returns:
+            matrix: (rows, dim) float32 array, memory-mapped read-only when mmap=True
+            index: Parsed gallery.json
+        """
+        index = self.read_index()
+        if not os.path.exists(self.store_path) or index['rows'] == 0:
+            return np.zeros((0, index.get('dim', 0)), dtype=np.float32), index
+        
+        matrix = np.load(self.store_path, mmap_mode='r' if mmap else None)
+        
+        # Rows past index['rows'] belong to an append that never finished
+        return matrix[:index['rows']], index
+    
+    def load_mapped(self, build):
+        """
+        Memory-map the store for a reader that outlives this call.
+        
+        Args:
+            build: Called with (matrix, index) as load(mmap=True) returns them; must
+                return an object with a release_mapping() method that copies whatever
+                it keeps of the matrix into memory
+        
+        Returns:
+            reader: What build returned, released before the next write to the file
+        """
+        with _write_lock:
+            reader = build(*self.load(mmap=True))
+            _mapped_readers.setdefault(os.path.abspath(self.store_path), weakref.WeakSet()).add(reader)
+        return reader
+    
+    def _release_mapped_readers(self):
+        """Make the readers of load_mapped() copy their rows; called under _write_lock before a write"""
+        readers = _mapped_readers.pop(os.path.abspath(self.store_path), None)
+        for reader in list(readers or ()):
+            reader.release_mapping()
+    
+    def as_dict(self, mmap=True):
+        """{student_id: embeddings} - views into the store for single-segment students"""
+        matrix, index = self.load(mmap=mmap)
+        enrolled = {}
+        for student_id, segments in index['students'].items():
+            blocks = [matrix[offset:offset + count] for offset, count in segments]
+            enrolled[student_id] = blocks[0] if len(blocks) == 1 else np.vstack(blocks)
+        return enrolled
+    
+    def is_compact(self, index=None):
+        """True when students occupy consecutive single segments covering every row"""
+        index = index or self.read_index()
+        row = 0
+        for segments in index['students'].values():
+            if len(segments) != 1 or segments[0][0] != row:
+                return False
+            row += segments[0][1]
+        return row == index['rows']
+    
+    def append(self, student_id, embeddings):
+        """Append L2-normalized embeddings for a student (1D or 2D array)"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings.shape) == 1:
+            embeddings = embeddings.reshape(1, -1)
+        embeddings = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+        
+        with _write_lock:
+            self._release_mapped_readers()
+            os.makedirs(self.folder, exist_ok=True)
+            index = self.read_index()
+            
+            if index['rows'] == 0 or not os.path.exists(self.store_path):
+                index = {'dim': embeddings.shape[1], 'rows': 0, 'students': {}}
+                with open(self.store_path, 'wb') as f:
+                    f.write(_npy_header(0, embeddings.shape[1]))
+            elif embeddings.shape[1] != index['dim']:
+                raise ValueError(f"Embedding size {embeddings.shape[1]} does not match store ({index['dim']})")
+            
+            offset = index['rows']
+            new_rows = offset + len(embeddings)
+            
+            with open(self.store_path, 'r+b') as f:
+                np.lib.format.read_magic(f)
+                np.lib.format.read_array_header_1_0(f)
+                data_start = f.tell()
+                header = _npy_header(new_rows, index['dim'])
+                
+                if len(header) != data_start:
+                    # Header grew past its padding - rewrite the file once
+                    f.close()
+                    self._rewrite(index, extra=(student_id, embeddings))
+                    return
+                
+                # Write the new rows after the last indexed row, then the new shape
+                f.seek(data_start + offset * index['dim'] * 4)
+                f.write(embeddings.tobytes())
+                f.truncate()
+                f.seek(0)
+                f.write(header)
+            
+            index['rows'] = new_rows
+            index['students'].setdefault(str(student_id), []).append([offset, len(embeddings)])
+            self._write_index(index)
+    
+    def remove(self, student_id):
+        """Forget a student's rows. Space is reclaimed by compact()."""
+        with _write_lock:
+            index = self.read_index()
+            if index['students'].pop(str(student_id), None) is None:
+                return False
+            self._write_index(index)
+            
+            live_rows = sum(count for segments in index['students'].values() for _, count in segments)
+            needs_compaction = live_rows < index['rows'] // 2
+        
+        if needs_compaction:
+            self.compact()
+        return True
+    
+    def compact(self):
+        """Rewrite the store with one consecutive segment per student and no dead rows"""
+        with _write_lock:
+            self._rewrite(self.read_index())
+    
+    def _rewrite(self, index, extra=None):
+        """Write a compact copy of the store (plus optional extra rows) and swap it in"""
+        self._release_mapped_readers()
+        new_index = self._write_compact(self.store_path + '.tmp', index, extra)
+        
+        # The memory map of the old file is released by now: Windows can't replace a mapped file
+        os.replace(self.store_path + '.tmp', self.store_path)
+        self._write_index(new_index)
+    
+    def _write_compact(self, tmp_path, index, extra):
+        """Compact copy of the store in tmp_path; returns its index (the old file's map dies with this call)"""
+        has_rows = index['rows'] > 0 and os.path.exists(self.store_path)
+        matrix = np.load(self.store_path, mmap_mode='r') if has_rows else None
+        
+        blocks = {}
+        for student_id, segments in index['students'].items():
+            blocks[student_id] = [matrix[offset:offset + count] for offset, count in segments]
+        if extra is not None:
+            blocks.setdefault(str(extra[0]), []).append(extra[1])
+        
+        total = sum(len(b) for parts in blocks.values() for b in parts)
+        dim = index['dim']
+        new_index = {'dim': dim, 'rows': total, 'students': {}}
+        
+        with open(tmp_path, 'wb') as f:
+            f.write(_npy_header(total, dim))
+            row = 0
+            for student_id, parts in blocks.items():
+                start = row
+                for part in parts:
+                    f.write(np.ascontiguousarray(part, dtype=np.float32).tobytes())
+                    row += len(part)
+                new_index['students'][student_id] = [[start, row - start]]
+        return new_index
+    
+    def legacy_files(self):
+        """Per-student <id>.npy files of older versions that were not migrated yet"""
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(f for f in os.listdir(self.folder) if f.endswith('.npy') and f != STORE_FILENAME)
+    
+    def legacy_embeddings(self):
+        """{student_id: L2-normalized embeddings} read from the legacy files (nothing is moved)"""
+        enrolled = {}
+        for filename in self.legacy_files():
+            embeddings = np.load(os.path.join(self.folder, filename)).astype(np.float32)
+            if len(embeddings.shape) == 1:
+                embeddings = embeddings.reshape(1, -1)
+            enrolled[os.path.splitext(filename)[0]] = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+        return enrolled
+    
+    def migrate_from_files(self):
+        """
+        One-shot migration from per-student encodings/<id>.npy files.
+        Migrated files are moved to encodings/migrated/. Returns the number of students migrated.
+        Run explicitly (app startup or `python embedding_store.py --migrate`), never from a loader.
+        """
+        migrated = 0
+        for filename in self.legacy_files():
+            student_id = os.path.splitext(filename)[0]
+            filepath = os.path.join(self.folder, filename)
+            try:
+                self.append(student_id, np.load(filepath))
+            except Exception as e:
+                print(f"❌ Error migrating embeddings for {student_id}: {str(e)}")
+                continue
+            
+            os.makedirs(os.path.join(self.folder, MIGRATED_FOLDER), exist_ok=True)
+            os.replace(filepath, os.path.join(self.folder, MIGRATED_FOLDER, filename))
+            migrated += 1
+        
+        if migrated:
+            self.compact()
+            print(f"✅ Migrated {migrated} per-student embedding files into {self.store_path}")
+        return migrated
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Consolidated face embedding store')
+    parser.add_argument('--folder', default='encodings')
+    parser.add_argument('--migrate', action='store_true', help='Move per-student <id>.npy files into the store')
+    parser.add_argument('--compact', action='store_true', help='Rewrite the store without dead rows')
+    args = parser.parse_args()
+    
+    store = EmbeddingStore(args.folder)
+    if args.migrate:
+        print(f"✅ {store.migrate_from_files()} student(s) migrated")
+    if args.compact:
+        store.compact()
+    index = store.read_index()
+    print(f"📦 {store.store_path}: {len(index['students'])} students, {index['rows']} rows, "
+          f"{len(store.legacy_files())} unmigrated legacy file(s)")
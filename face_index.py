@@ -0,0 +1,166 @@
+"""
+Approximate Nearest-Neighbour Indexes for Large Face Galleries
+- IVFIndex: inverted-file index (spherical k-means coarse quantizer) in pure NumPy
+- HNSWIndex: HNSW graph through the optional hnswlib package
+- build_index: pick an index for a FaceGallery, or None to keep exact search
+"""
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency
+    hnswlib = None
+
+# Index configuration
+ANN_BACKEND = "ivf"        # "ivf", "hnsw" or "exact"
+ANN_MIN_SAMPLES = 50000    # Below this many stored samples a dense scan is fast enough
+IVF_NLIST = None           # Number of inverted lists (None = about sqrt(num_samples))
+IVF_NPROBE = 8             # Lists searched per query
+HNSW_M = 16                # Graph degree
+HNSW_EF = 200              # Search breadth (also number of rows returned per query)
+
+def _reduce_to_students(rows, scores, row_owner, num_students):
+    """
+    Max score per student from a set of candidate gallery rows.
+    Students that were not reached by the search get -inf.
+    """
+    out = np.full(num_students, -np.inf, dtype=np.float32)
+    if len(rows) == 0:
+        return out
+    
+    order = np.argsort(rows, kind='stable')
+    owners = row_owner[rows[order]]
+    scores = scores[order]
+    
+    # Gallery rows are grouped by student, so sorted rows give sorted owners
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+    out[owners[starts]] = np.maximum.reduceat(scores, starts)
+    return out
+
+class IVFIndex:
+    """
+    Inverted-file index over the rows of a FaceGallery.
+    
+    Rows are clustered with spherical k-means; a query only scores the rows
+    in the nprobe lists whose centroids are closest to it.
+    """
+    
+    def __init__(self, gallery, nlist=IVF_NLIST, nprobe=IVF_NPROBE, n_iter=10, seed=0):
+        self.gallery = gallery
+        num_samples = gallery.num_samples
+        
+        if nlist is None:
+            nlist = int(np.sqrt(num_samples))
+        self.nlist = max(1, min(nlist, num_samples))
+        self.nprobe = min(nprobe, self.nlist)
+        
+        self.centroids = self._train(gallery.matrix, n_iter, seed)
+        assignments = self._assign(gallery.matrix)
+        
+        # Row ids of each list, kept sorted so candidates stay grouped by student
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(self.nlist + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.nlist)]
+    
+    def _train(self, matrix, n_iter, seed):
+        rng = np.random.default_rng(seed)
+        
+        # k-means on a sample is enough for a coarse quantizer
+        sample_size = min(len(matrix), self.nlist * 64)
+        sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.nlist, replace=False)].copy()
+        
+        for _ in range(n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            
+            # Sum the members of every non-empty cluster in one reduceat
+            order = np.argsort(labels, kind='stable')
+            counts = np.bincount(labels, minlength=self.nlist)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            nonempty = counts > 0
+            centroids[nonempty] = np.add.reduceat(sample[order], starts[nonempty], axis=0)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-10
+        
+        return centroids.astype(np.float32)
+    
+    def _assign(self, matrix, chunk=8192):
+        labels = np.empty(len(matrix), dtype=np.int64)
+        for start in range(0, len(matrix), chunk):
+            labels[start:start + chunk] = np.argmax(matrix[start:start + chunk] @ self.centroids.T, axis=1)
+        return labels
+    
+    def insert_rows(self, at, vectors):
+        """Gallery inserted len(vectors) rows at row `at`: shift ids and file the new rows"""
+        count = len(vectors)
+        for lst in self.lists:
+            lst[lst >= at] += count
+        
+        labels = np.argmax(vectors @ self.centroids.T, axis=1)
+        for row, label in zip(range(at, at + count), labels):
+            lst = self.lists[label]
+            self.lists[label] = np.insert(lst, np.searchsorted(lst, row), row)
+    
+    def remove_rows(self, start, stop):
+        """Gallery deleted rows [start, stop): drop them and shift the ids after them"""
+        for i, lst in enumerate(self.lists):
+            lst = lst[(lst < start) | (lst >= stop)]
+            lst[lst >= stop] -= stop - start
+            self.lists[i] = lst
+    
+    def student_scores_batch(self, query_embs):
+        """(num_faces, num_students) best scores; unreached students are -inf"""
+        matrix = self.gallery.matrix
+        probes = np.argsort(-(query_embs @ self.centroids.T), axis=1)[:, :self.nprobe]
+        
+        out = np.empty((len(query_embs), len(self.gallery)), dtype=np.float32)
+        for i, query in enumerate(query_embs):
+            rows = np.concatenate([self.lists[c] for c in probes[i]])
+            out[i] = _reduce_to_students(rows, matrix[rows] @ query, self.gallery.row_owner, len(self.gallery))
+        return out
+
+class HNSWIndex:
+    """HNSW graph over the rows of a FaceGallery (requires hnswlib)"""
+    
+    def __init__(self, gallery, m=HNSW_M, ef=HNSW_EF, ef_construction=200):
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed")
+        
+        self.gallery = gallery
+        self.ef = min(ef, gallery.num_samples)
+        
+        self.graph = hnswlib.Index(space='ip', dim=gallery.matrix.shape[1])
+        self.graph.init_index(max_elements=gallery.num_samples, ef_construction=ef_construction, M=m)
+        self.graph.add_items(gallery.matrix, np.arange(gallery.num_samples))
+        self.graph.set_ef(self.ef)
+    
+    def student_scores_batch(self, query_embs):
+        """(num_faces, num_students) best scores; unreached students are -inf"""
+        labels, distances = self.graph.knn_query(query_embs, k=self.ef)
+        
+        out = np.empty((len(query_embs), len(self.gallery)), dtype=np.float32)
+        for i in range(len(query_embs)):
+            rows = labels[i].astype(np.int64)
+            # hnswlib 'ip' distance is 1 - dot product
+            out[i] = _reduce_to_students(rows, 1.0 - distances[i], self.gallery.row_owner, len(self.gallery))
+        return out
+
+def build_index(gallery, backend=ANN_BACKEND, min_samples=ANN_MIN_SAMPLES, **params):
+    """
+    Build an ANN index for a gallery.
+    
+    Returns:
+        index: IVFIndex / HNSWIndex, or None when exact search should be used
+               (small gallery or backend "exact"). "hnsw" falls back to IVF
+               when hnswlib is not installed.
+    """
+    if backend == "exact" or gallery.num_samples < max(min_samples, 1):
+        return None
+    
+    if backend == "hnsw":
+        if hnswlib is not None:
+            return HNSWIndex(gallery, **params)
+        print("⚠️ hnswlib not installed - falling back to IVF index")
+        return IVFIndex(gallery)
+    
+    return IVFIndex(gallery, **params)
@@ -8,13 +8,155 @@ Face Recognition Utilities using DeepFace
 
 import numpy as np
 import os
-import cv2
-from deepface import DeepFace
+import threading
+import time
 from numpy.linalg import norm
+from embedding_store import EmbeddingStore
+
+# OpenCV and DeepFace (which pulls in TensorFlow) are imported inside the functions
+# that need them, so gallery matching and store updates stay cheap to import
 
 # Model configuration - using VGG-Face for embeddings
 MODEL_NAME = "VGG-Face"  # Fast and accurate, can also use "Facenet", "Facenet512", "ArcFace"
 DETECTOR_BACKEND = "opencv"  # Fast detector, can use "retinaface" for better accuracy
+EMBEDDING_BATCH_SIZE = 32  # Face crops per model call when embedding many images
+
+# Frame preprocessing
+MAX_DETECTION_SIDE = 640  # Detect faces on a copy downscaled to this longest side (None = full size)
+DECODE_REDUCTION = 1      # 2 or 4 decodes frames at 1/2 or 1/4 size (cv2.IMREAD_REDUCED_COLOR_*)
+
+# Persistent embedding model, built once per process (see warm_up_model)
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Shared embedding model handle; built on first use if warm_up_model() was not called"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from deepface import DeepFace
+                _model = DeepFace.build_model(MODEL_NAME)
+    return _model
+
+def warm_up_model():
+    """
+    Build the embedding model and face detector and run one inference through
+    both, so the first real request does not pay load or graph-compile costs.
+    
+    Returns:
+        seconds: Time spent building and warming up
+    """
+    from deepface.commons import functions
+    from deepface.detectors import FaceDetector
+    
+    start = time.perf_counter()
+    model = get_model()
+    FaceDetector.build_model(DETECTOR_BACKEND)
+    
+    # One pass through detector + model on a blank frame
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    face_objs = _extract_faces(blank, enforce_detection=False)
+    batch = functions.normalize_input(img=np.vstack([f[0] for f in face_objs]), normalization="base")
+    model.predict(batch, verbose=0)
+    
+    return time.perf_counter() - start
+
+def decode_frame(image_bytes):
+    """Decode JPEG/PNG bytes into a BGR frame (None if invalid), honouring DECODE_REDUCTION"""
+    import cv2
+    
+    flags = {
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4
+    }.get(DECODE_REDUCTION, cv2.IMREAD_COLOR)
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flags)
+
+def detection_scale(shape, max_side=MAX_DETECTION_SIDE):
+    """Factor (<= 1) that brings a frame's longest side down to max_side"""
+    if not max_side:
+        return 1.0
+    return min(1.0, max_side / max(shape[0], shape[1]))
+
+def map_box_to_frame(region, scale, shape):
+    """
+    Map an [x, y, w, h] box found on the downscaled frame back to the
+    full-size frame, clipped to its bounds.
+    """
+    x, y, w, h = (int(round(v / scale)) for v in region)
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(shape[1], x + w), min(shape[0], y + h)
+    return [x0, y0, max(0, x1 - x0), max(0, y1 - y0)]
+
+def _extract_faces(bgr_image, enforce_detection=False):
+    """Detect, align and crop faces: list of [pixels (1, h, w, 3), region, confidence]"""
+    import cv2
+    from deepface.commons import functions
+    
+    # Convert BGR to RGB (DeepFace expects RGB)
+    rgb_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
+    target_size = functions.find_target_size(model_name=MODEL_NAME)
+    
+    # Downscaled detection is implemented for the opencv detector, whose
+    # eye-based alignment can be re-run on the full resolution crop
+    scale = detection_scale(rgb_image.shape, MAX_DETECTION_SIDE)
+    if scale >= 1.0 or DETECTOR_BACKEND != "opencv":
+        return functions.extract_faces(
+            img=rgb_image,
+            target_size=target_size,
+            detector_backend=DETECTOR_BACKEND,
+            grayscale=False,
+            enforce_detection=enforce_detection,
+            align=True
+        )
+    
+    from deepface.detectors import FaceDetector, OpenCvWrapper
+    
+    # Detect on the small frame, then crop each face from the full frame
+    detector = FaceDetector.build_model(DETECTOR_BACKEND)
+    small = cv2.resize(rgb_image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    detections = FaceDetector.detect_faces(detector, DETECTOR_BACKEND, small, align=False)
+    
+    face_objs = []
+    for _, region, confidence in detections:
+        x, y, w, h = map_box_to_frame(region, scale, rgb_image.shape)
+        if w == 0 or h == 0:
+            continue
+        
+        face = OpenCvWrapper.align_face(detector["eye_detector"], rgb_image[y:y + h, x:x + w])
+        
+        # "skip" only resizes, pads and scales the already cropped face
+        face_pixels, _, _ = functions.extract_faces(
+            img=face,
+            target_size=target_size,
+            detector_backend="skip",
+            grayscale=False,
+            enforce_detection=False,
+            align=False
+        )[0]
+        face_objs.append([face_pixels, {"x": x, "y": y, "w": w, "h": h}, confidence])
+    
+    if face_objs:
+        return face_objs
+    if enforce_detection:
+        raise ValueError("Face could not be detected.")
+    
+    # Same as DeepFace without a detection: use the whole frame
+    return functions.extract_faces(
+        img=rgb_image,
+        target_size=target_size,
+        detector_backend="skip",
+        grayscale=False,
+        enforce_detection=False,
+        align=False
+    )
+
+def _embed_crops(crops):
+    """Embed stacked face crops with the shared model: (n, h, w, 3) -> (n, dim), L2-normalized"""
+    from deepface.commons import functions
+    
+    batch = functions.normalize_input(img=np.vstack(crops), normalization="base")
+    return _normalize_rows(get_model().predict(batch, batch_size=EMBEDDING_BATCH_SIZE, verbose=0))
 
 def get_embeddings_from_image_bgr(bgr_image, enforce_detection=False):
     """
@@ -30,34 +172,18 @@ def get_embeddings_from_image_bgr(bgr_image, enforce_detection=False):
         faces: List of face detection information (coordinates, etc.)
     """
     try:
-        # Convert BGR to RGB (DeepFace expects RGB)
-        rgb_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
+        # Detect faces, then embed all of them in one model call
+        face_objs = _extract_faces(bgr_image, enforce_detection=enforce_detection)
+        if not face_objs:
+            return [], []
         
-        # Extract embeddings using DeepFace
-        # This will detect faces and generate embeddings
-        result = DeepFace.represent(
-            img_path=rgb_image,
-            model_name=MODEL_NAME,
-            detector_backend=DETECTOR_BACKEND,
-            enforce_detection=enforce_detection
-        )
+        embeddings = list(_embed_crops([face_pixels for face_pixels, _, _ in face_objs]))
         
-        embeddings = []
         faces = []
-        
-        # DeepFace returns a list of dictionaries (one per face)
-        for face_data in result:
-            # Get embedding vector
-            embedding = np.array(face_data['embedding'], dtype=np.float32)
-            
-            # Normalize embedding (L2 normalization)
-            embedding = embedding / (np.linalg.norm(embedding) + 1e-10)
-            
-            embeddings.append(embedding)
-            
+        for (_, region, _), embedding in zip(face_objs, embeddings):
             # Get face region if available
             face_info = {
-                'facial_area': face_data.get('facial_area', {}),
+                'facial_area': region,
                 'embedding': embedding
             }
             faces.append(face_info)
@@ -68,111 +194,447 @@ def get_embeddings_from_image_bgr(bgr_image, enforce_detection=False):
         print(f"Face detection error: {str(e)}")
         return [], []
 
+def get_embeddings_batch_from_images_bgr(bgr_images, enforce_detection=False):
+    """
+    Extract face embeddings from many BGR images with a single batched model pass.
+    Faces are detected and cropped per image, then all crops are embedded together.
+    
+    Args:
+        bgr_images: List of BGR images (None entries are skipped)
+        enforce_detection: Same meaning as in get_embeddings_from_image_bgr
+    
+    Returns:
+        embeddings_per_image: One list of embedding vectors per input image
+    """
+    # Detect and crop every face first
+    crops = []
+    owners = []
+    for idx, bgr_image in enumerate(bgr_images):
+        if bgr_image is None:
+            continue
+        try:
+            face_objs = _extract_faces(bgr_image, enforce_detection=enforce_detection)
+        except Exception as e:
+            print(f"Face detection error in image {idx}: {str(e)}")
+            continue
+        
+        for face_pixels, _, _ in face_objs:
+            crops.append(face_pixels)
+            owners.append(idx)
+    
+    embeddings_per_image = [[] for _ in bgr_images]
+    if not crops:
+        return embeddings_per_image
+    
+    # Embed all crops together: (num_faces, h, w, 3) -> (num_faces, embedding_dim)
+    for idx, embedding in zip(owners, _embed_crops(crops)):
+        embeddings_per_image[idx].append(embedding)
+    
+    return embeddings_per_image
+
 def cosine_similarity(a, b):
     """Calculate cosine similarity between two vectors"""
     return np.dot(a, b) / (norm(a) * norm(b) + 1e-10)
 
-def match_embedding_to_db(query_emb, enrolled_dict, threshold=0.40):
+def _normalize_rows(embeddings):
+    """2D float32 copy of embeddings with L2-normalized rows"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if len(embeddings.shape) == 1:
+        embeddings = embeddings.reshape(1, -1)
+    return embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+
+class FaceGallery:
+    """
+    All enrolled face embeddings packed into one matrix for fast matching.
+    
+    Attributes:
+        matrix: Contiguous float32 array of shape (num_samples, embedding_dim), rows L2-normalized
+        student_ids: List of student IDs in gallery order
+        offsets: Start row of each student's samples (a student's rows are contiguous)
+        row_owner: Index into student_ids for every row of the matrix
+        index: Optional ANN index (see face_index.py); None means exact dense search
+        version: Incremented on every in-place update (add/append/remove)
+    """
+    
+    def __init__(self, matrix=None, student_ids=None, offsets=None):
+        if matrix is None or len(matrix) == 0:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+            student_ids = []
+            offsets = np.zeros(0, dtype=np.int64)
+        
+        # Guards in-place updates against concurrent matching
+        self._lock = threading.RLock()
+        self.index = None
+        self.version = 0
+        self._set_layout(matrix, student_ids, offsets)
+    
+    def _set_layout(self, matrix, student_ids, offsets):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.student_ids = list(student_ids)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._positions = {student_id: idx for idx, student_id in enumerate(self.student_ids)}
+        
+        # Row -> student index, e.g. offsets [0, 3] over 5 rows gives [0, 0, 0, 1, 1]
+        counts = np.diff(np.append(self.offsets, len(self.matrix)))
+        self.row_owner = np.repeat(np.arange(len(self.student_ids)), counts)
+    
+    @classmethod
+    def from_enrolled(cls, enrolled_dict):
+        """
+        Build a gallery from a {student_id: embeddings_array} dictionary
+        (the format returned by load_all_enrollments).
+        """
+        blocks = []
+        student_ids = []
+        offsets = []
+        row = 0
+        
+        for student_id, embeddings in enrolled_dict.items():
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            if len(embeddings.shape) == 1:
+                embeddings = embeddings.reshape(1, -1)
+            if len(embeddings) == 0:
+                continue
+            
+            student_ids.append(student_id)
+            offsets.append(row)
+            blocks.append(embeddings)
+            row += len(embeddings)
+        
+        if not blocks:
+            return cls()
+        
+        # Pre-normalize once so matching is a plain dot product
+        matrix = _normalize_rows(np.vstack(blocks))
+        
+        return cls(matrix, student_ids, offsets)
+    
+    @classmethod
+    def from_store(cls, store):
+        """
+        Build a gallery from the consolidated embedding store (read-only).
+        A compact store is matched straight from its memory map, so startup
+        reads no rows; the first write to the store file in this process copies
+        the matrix into memory (see release_mapping).
+        """
+        def build(matrix, index):
+            if not store.is_compact(index):
+                # Segments scattered by appends/deletes: gather them per student (in memory)
+                return cls.from_enrolled(store.as_dict(mmap=False))
+            if len(matrix) == 0:
+                return cls()
+            
+            student_ids = list(index['students'].keys())
+            offsets = [index['students'][student_id][0][0] for student_id in student_ids]
+            return cls(matrix, student_ids, offsets)
+        
+        return store.load_mapped(build)
+    
+    def release_mapping(self):
+        """Copy a memory-mapped matrix into memory, so the store file can be written"""
+        with self._lock:
+            base = self.matrix
+            while base is not None and not isinstance(base, np.memmap):
+                base = getattr(base, 'base', None)
+            if base is not None:
+                self.matrix = np.array(self.matrix)
+    
+    def __len__(self):
+        return len(self.student_ids)
+    
+    def __contains__(self, student_id):
+        return student_id in self._positions
+    
+    @property
+    def num_samples(self):
+        return len(self.matrix)
+    
+    def _rows_of(self, idx):
+        """(start, stop) rows of the student at position idx"""
+        start = int(self.offsets[idx])
+        stop = int(self.offsets[idx + 1]) if idx + 1 < len(self.offsets) else len(self.matrix)
+        return start, stop
+    
+    def subset(self, student_ids):
+        """
+        New gallery with only the given students (e.g. one class).
+        Unknown IDs are ignored; the subset always uses exact search.
+        """
+        blocks = []
+        kept_ids = []
+        offsets = []
+        row = 0
+        
+        with self._lock:
+            for student_id in student_ids:
+                idx = self._positions.get(student_id)
+                if idx is None:
+                    continue
+                start, stop = self._rows_of(idx)
+                blocks.append(self.matrix[start:stop])
+                kept_ids.append(student_id)
+                offsets.append(row)
+                row += stop - start
+        
+        if not blocks:
+            return FaceGallery()
+        
+        # Rows are already normalized, so no need to go through from_enrolled
+        return FaceGallery(np.vstack(blocks), kept_ids, offsets)
+    
+    def add_student(self, student_id, embeddings):
+        """Add a student at the end of the gallery (replaces any existing samples)"""
+        embeddings = _normalize_rows(embeddings)
+        
+        with self._lock:
+            self.remove_student(student_id)
+            
+            at = len(self.matrix)
+            matrix = embeddings if at == 0 else np.vstack([self.matrix, embeddings])
+            self._set_layout(matrix, self.student_ids + [student_id], np.append(self.offsets, at))
+            self._update_index('insert_rows', at, embeddings)
+            self.version += 1
+    
+    def append_samples(self, student_id, embeddings):
+        """Append samples to a student's block of rows (adds the student if new)"""
+        with self._lock:
+            idx = self._positions.get(student_id)
+            if idx is None:
+                self.add_student(student_id, embeddings)
+                return
+            
+            embeddings = _normalize_rows(embeddings)
+            _, at = self._rows_of(idx)
+            
+            offsets = self.offsets.copy()
+            offsets[idx + 1:] += len(embeddings)
+            self._set_layout(np.insert(self.matrix, at, embeddings, axis=0), self.student_ids, offsets)
+            self._update_index('insert_rows', at, embeddings)
+            self.version += 1
+    
+    def remove_student(self, student_id):
+        """Remove a student and all their samples. Returns False if not in the gallery."""
+        with self._lock:
+            idx = self._positions.get(student_id)
+            if idx is None:
+                return False
+            
+            start, stop = self._rows_of(idx)
+            student_ids = self.student_ids[:idx] + self.student_ids[idx + 1:]
+            offsets = np.delete(self.offsets, idx)
+            offsets[idx:] -= stop - start
+            
+            if len(student_ids) == 0:
+                self._set_layout(np.zeros((0, 0), dtype=np.float32), [], offsets)
+            else:
+                self._set_layout(np.delete(self.matrix, np.s_[start:stop], axis=0), student_ids, offsets)
+            self._update_index('remove_rows', start, stop)
+            self.version += 1
+            return True
+    
+    def _update_index(self, method, *args):
+        """Keep the ANN index in step with row changes, or fall back to exact search"""
+        if self.index is None:
+            return
+        if len(self.matrix) > 0 and hasattr(self.index, method):
+            getattr(self.index, method)(*args)
+        else:
+            print(f"⚠️ {type(self.index).__name__} can't be updated in place - using exact search until rebuilt")
+            self.index = None
+    
+    def set_index(self, index):
+        """Route matching through an ANN index, or None for exact search"""
+        self.index = index
+    
+    def student_scores(self, query_emb):
+        """
+        Best similarity of the query against each student's samples.
+        
+        Returns:
+            scores: 1D array aligned with student_ids
+        """
+        if self.index is not None:
+            return self.student_scores_batch(query_emb)[0]
+        
+        query_emb = np.asarray(query_emb, dtype=np.float32).reshape(-1)
+        query_emb = query_emb / (np.linalg.norm(query_emb) + 1e-10)
+        
+        # One matrix-vector product over every stored sample
+        sample_scores = self.matrix @ query_emb
+        
+        # Max over each student's contiguous block of rows
+        return np.maximum.reduceat(sample_scores, self.offsets)
+    
+    def match(self, query_emb, threshold=0.40):
+        """Same contract as match_embedding_to_db: (best_id or None, best_score)"""
+        with self._lock:
+            if len(self.student_ids) == 0:
+                return None, -1.0
+            
+            scores = self.student_scores(query_emb)
+            best = int(np.argmax(scores))
+            best_score = float(scores[best])
+            
+            # An ANN index may not reach any student
+            if not np.isfinite(best_score):
+                return None, -1.0
+            
+            if best_score >= threshold:
+                return self.student_ids[best], best_score
+            
+            return None, best_score
+    
+    def student_scores_batch(self, query_embs):
+        """
+        Best similarity of every query face against each student.
+        
+        Args:
+            query_embs: (num_faces, embedding_dim) array
+        
+        Returns:
+            scores: (num_faces, num_students) array
+        """
+        query_embs = np.asarray(query_embs, dtype=np.float32)
+        if len(query_embs.shape) == 1:
+            query_embs = query_embs.reshape(1, -1)
+        query_embs = query_embs / (np.linalg.norm(query_embs, axis=1, keepdims=True) + 1e-10)
+        
+        if self.index is not None:
+            return self.index.student_scores_batch(query_embs)
+        
+        # One GEMM for all faces in the frame: (k x d) @ (d x n) -> (k x n)
+        sample_scores = query_embs @ self.matrix.T
+        
+        return np.maximum.reduceat(sample_scores, self.offsets, axis=1)
+    
+    def match_batch(self, query_embs, threshold=0.40):
+        """
+        Match several faces at once with one-to-one assignment, so two faces
+        in the same frame can never claim the same student.
+        
+        Returns:
+            matches: List of (student_id or None, score), one per query face
+        """
+        num_faces = len(query_embs)
+        
+        with self._lock:
+            if len(self.student_ids) == 0:
+                return [(None, -1.0)] * num_faces
+            
+            scores = self.student_scores_batch(query_embs)
+            student_ids = self.student_ids
+        
+        best_scores = np.nan_to_num(scores.max(axis=1), neginf=-1.0)
+        matches = [(None, float(best_scores[i])) for i in range(num_faces)]
+        
+        # Greedy assignment: repeatedly take the highest remaining (face, student) pair
+        remaining = scores.copy()
+        for _ in range(min(remaining.shape)):
+            face_idx, student_idx = np.unravel_index(np.argmax(remaining), remaining.shape)
+            score = float(remaining[face_idx, student_idx])
+            if score < threshold:
+                break
+            
+            matches[face_idx] = (student_ids[student_idx], score)
+            remaining[face_idx, :] = -np.inf
+            remaining[:, student_idx] = -np.inf
+        
+        return matches
+
+def match_embedding_to_db(query_emb, enrolled, threshold=0.40):
     """
     Match a query embedding against enrolled student embeddings.
     
     Args:
         query_emb: Query face embedding (numpy array, 1D)
-        enrolled_dict: Dictionary of {student_id: embeddings_array (2D numpy array)}
+        enrolled: FaceGallery, or dictionary of {student_id: embeddings_array (2D numpy array)}
         threshold: Minimum similarity score (0.35-0.45 recommended for VGG-Face)
     
     Returns:
         best_student_id: ID of matched student (or None)
         best_score: Similarity score
     """
-    best_id = None
-    best_score = -1.0
+    if not isinstance(enrolled, FaceGallery):
+        enrolled = FaceGallery.from_enrolled(enrolled)
     
-    # Ensure query is 1D
-    if len(query_emb.shape) > 1:
-        query_emb = query_emb.flatten()
+    return enrolled.match(query_emb, threshold=threshold)
+
+def match_embeddings_batch(query_embs, enrolled, threshold=0.40):
+    """
+    Match all faces detected in one frame against enrolled students.
     
-    for student_id, embeddings in enrolled_dict.items():
-        # embeddings is a 2D array: shape (num_samples, embedding_dim)
-        # We need to compare query against each sample
-        if len(embeddings.shape) == 1:
-            # Single embedding, reshape to 2D
-            embeddings = embeddings.reshape(1, -1)
-        
-        for enrolled_emb in embeddings:
-            # Calculate cosine similarity
-            score = float(cosine_similarity(query_emb, enrolled_emb))
-            
-            if score > best_score:
-                best_score = score
-                best_id = student_id
+    Args:
+        query_embs: List of embeddings or (num_faces, embedding_dim) array,
+                    e.g. the embeddings returned by get_embeddings_from_image_bgr
+        enrolled: FaceGallery, or dictionary of {student_id: embeddings_array}
+        threshold: Minimum similarity score
     
-    if best_score >= threshold:
-        return best_id, best_score
+    Returns:
+        matches: List of (student_id or None, score), one per face.
+                 Each student is assigned to at most one face.
+    """
+    if not isinstance(enrolled, FaceGallery):
+        enrolled = FaceGallery.from_enrolled(enrolled)
+    
+    if len(query_embs) == 0:
+        return []
     
-    return None, best_score
+    return enrolled.match_batch(np.vstack(query_embs), threshold=threshold)
 
 def load_all_enrollments(encodings_folder='encodings'):
     """
-    Load all student face embeddings from the encodings folder.
+    Load all student face embeddings from the consolidated store in the encodings folder.
+    Per-student <id>.npy files from older versions that were not migrated yet
+    (see EmbeddingStore.migrate_from_files) are read as well; nothing is written.
     
     Returns:
-        enrolled: Dictionary of {student_id: numpy_array_of_embeddings}
+        enrolled: Dictionary of {student_id: numpy_array_of_embeddings} (in memory, already normalized)
     """
-    enrolled = {}
-    
     if not os.path.exists(encodings_folder):
-        os.makedirs(encodings_folder)
-        return enrolled
+        return {}
     
-    for filename in os.listdir(encodings_folder):
-        if filename.endswith('.npy'):
-            student_id = os.path.splitext(filename)[0]
-            filepath = os.path.join(encodings_folder, filename)
-            
-            try:
-                # Load embeddings array
-                embeddings = np.load(filepath)
-                
-                # Ensure normalized
-                norms = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10
-                embeddings = embeddings / norms
-                
-                enrolled[student_id] = embeddings
-                print(f"✅ Loaded {len(embeddings)} embeddings for student {student_id}")
-            except Exception as e:
-                print(f"❌ Error loading embeddings for {student_id}: {str(e)}")
+    store = EmbeddingStore(encodings_folder)
+    enrolled = store.legacy_embeddings()
+    # Copied: callers keep the dict, which has no release_mapping() for writers to call
+    enrolled.update(store.as_dict(mmap=False))
+    print(f"✅ Loaded embeddings for {len(enrolled)} students from {store.store_path}")
     
     return enrolled
 
+def load_gallery(encodings_folder='encodings'):
+    """
+    Load all enrolled embeddings as a FaceGallery (read-only, see load_all_enrollments).
+    """
+    store = EmbeddingStore(encodings_folder)
+    if store.legacy_files():
+        return FaceGallery.from_enrolled(load_all_enrollments(encodings_folder))
+    return FaceGallery.from_store(store)
+
 def append_embedding_for_student(student_id, new_emb, encodings_folder='encodings'):
     """
-    Add a new face embedding for a student.
+    Add new face embedding(s) for a student.
     
     Args:
         student_id: Student ID
-        new_emb: New embedding vector (numpy array)
-        encodings_folder: Folder to store embeddings
+        new_emb: New embedding vector, or 2D array of several embeddings
+        encodings_folder: Folder holding the embedding store
     """
-    if not os.path.exists(encodings_folder):
-        os.makedirs(encodings_folder)
-    
-    filepath = os.path.join(encodings_folder, f"{student_id}.npy")
-    
-    # Ensure embedding is 2D array
-    if len(new_emb.shape) == 1:
-        new_emb = new_emb.reshape(1, -1)
+    store = EmbeddingStore(encodings_folder)
+    store.append(student_id, new_emb)
+    print(f"✅ Saved {1 if len(new_emb.shape) == 1 else len(new_emb)} embedding(s) for student {student_id}")
+
+def remove_student_embeddings(student_id, encodings_folder='encodings'):
+    """
+    Delete all stored embeddings of a student (store entry and any legacy <id>.npy file).
+    """
+    removed = EmbeddingStore(encodings_folder).remove(student_id)
     
-    if os.path.exists(filepath):
-        # Append to existing embeddings
-        existing_embs = np.load(filepath)
-        updated_embs = np.vstack([existing_embs, new_emb])
-    else:
-        # Create new file
-        updated_embs = new_emb
+    legacy_path = os.path.join(encodings_folder, f"{student_id}.npy")
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+        removed = True
     
-    np.save(filepath, updated_embs)
-    print(f"✅ Saved embedding for student {student_id} ({len(updated_embs)} total)")
+    return removed
 
 def detect_faces_in_image(bgr_image):
     """
@@ -183,6 +645,8 @@ def detect_faces_in_image(bgr_image):
         faces: List of face regions with coordinates
     """
     try:
+        import cv2
+        from deepface import DeepFace
         rgb_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
         
         result = DeepFace.extract_faces(
@@ -218,6 +682,8 @@ def test_face_detection():
     print("=" * 50)
     
     try:
+        from deepface import DeepFace
+        
         # Test with a simple image
         test_img = np.zeros((480, 640, 3), dtype=np.uint8)
         result = DeepFace.represent(
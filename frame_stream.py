@@ -0,0 +1,136 @@
+# frame_stream.py
+"""
+Streaming Recognition for Attendance Sessions
+- Clients push frames into a single "latest frame" slot; an unprocessed
+  frame is replaced (dropped) when a newer one arrives
+- One background thread per session recognizes the latest frame
+- Results are fanned out to Server-Sent Events subscribers
+"""
+
+import json
+import queue
+import threading
+import time
+
+SUBSCRIBER_QUEUE_SIZE = 20  # Events buffered per SSE client before old ones are dropped
+HEARTBEAT_SECONDS = 15      # Comment line sent to idle SSE clients to keep proxies from closing them
+
+class FrameStream:
+    """
+    Latest-frame slot + background processor for one attendance session.
+    
+    Args:
+        process: Callable(frame_bytes) -> event dict (runs on the worker thread)
+        name: Label used in log lines
+    """
+    
+    def __init__(self, process, name='session'):
+        self.process = process
+        self.name = name
+        
+        self._cond = threading.Condition()
+        self._frame = None
+        self._closed = False
+        self._subscribers = []
+        
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        
+        self._thread = threading.Thread(target=self._run, name=f'frame-stream-{name}', daemon=True)
+        self._thread.start()
+    
+    def push(self, frame_bytes):
+        """Store a frame for recognition; returns False when the stream is closed"""
+        with self._cond:
+            if self._closed:
+                return False
+            if self._frame is not None:
+                # The processor never got to the previous frame - it is stale now
+                self.dropped += 1
+            self._frame = frame_bytes
+            self.received += 1
+            self._cond.notify()
+        return True
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._frame is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                frame, self._frame = self._frame, None
+            
+            start = time.perf_counter()
+            try:
+                event = self.process(frame)
+            except Exception as e:
+                print(f"❌ Stream {self.name}: recognition failed: {e}")
+                event = {'error': str(e)}
+            
+            self.processed += 1
+            if event is not None:
+                event['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                event['dropped_frames'] = self.dropped
+                self.publish('recognition', event)
+    
+    def publish(self, event_type, data):
+        """Send an event to every subscriber, dropping its oldest event if it lags behind"""
+        message = (event_type, data)
+        with self._cond:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(message)
+    
+    def subscribe(self):
+        """Generator of SSE-formatted messages until the stream closes"""
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._cond:
+            if self._closed:
+                yield 'event: end\ndata: {}\n\n'
+                return
+            self._subscribers.append(q)
+        
+        try:
+            yield 'retry: 2000\n\n'
+            while True:
+                try:
+                    event_type, data = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                
+                yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+                if event_type == 'end':
+                    return
+        finally:
+            with self._cond:
+                if q in self._subscribers:
+                    self._subscribers.remove(q)
+    
+    def stats(self):
+        """Frame counters for this stream"""
+        return {
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'subscribers': len(self._subscribers)
+        }
+    
+    def close(self, summary=None):
+        """Stop the processor and end every subscriber's stream"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._frame = None
+            self._cond.notify_all()
+        self.publish('end', summary or {})
@@ -0,0 +1,154 @@
+"""
+Migrate the attendance table to the current schema (models.Attendance)
+
+- date stored as a DATE ('YYYY-MM-DD'), period as an INTEGER
+- UNIQUE(student_id, date, period) plus indexes on (date, period) and (student_id, date)
+- Duplicate records are removed first (the earliest ID is kept, as fix_duplicates.py does)
+- The rollup triggers are recreated and the rollups rebuilt afterwards
+- A copy of the database is saved next to it before anything changes
+
+Usage:
+    python migrate_attendance.py                # migrate database.db (no-op when up to date)
+    python migrate_attendance.py --check-plans  # only print the query plans of the hot queries
+"""
+import argparse
+import sqlite3
+from datetime import datetime
+from sqlalchemy import text
+from attendance_rollups import install_rollups, rebuild_rollups
+from models import Attendance, make_engine
+
+DATABASE = 'database.db'
+
+# Queries the app runs most, with the index each one is expected to use
+HOT_QUERIES = {
+    'student dashboard': (
+        "SELECT id, date, period, status FROM attendance WHERE student_id = 1 ORDER BY date DESC"
+    ),
+    'session: records of seen students': (
+        "SELECT student_id, status FROM attendance "
+        "WHERE student_id IN (1, 2, 3) AND date = '2024-01-01' AND period = 1"
+    ),
+    'session: confirmed present count': (
+        "SELECT COUNT(*) FROM attendance JOIN students ON students.id = attendance.student_id "
+        "WHERE students.class_name = '10' AND attendance.date = '2024-01-01' AND attendance.period = 1 "
+        "AND lower(attendance.status) = 'present'"
+    ),
+    'records of a date range': (
+        "SELECT student_id, period, status FROM attendance WHERE date BETWEEN '2024-01-01' AND '2024-01-31'"
+    ),
+}
+
+def query_plans(conn):
+    """
+    EXPLAIN QUERY PLAN of every hot query.
+    
+    Returns:
+        plans: {name: (plan lines, uses_index)} - uses_index is False when
+        the attendance table is scanned instead of searched through an index
+    """
+    plans = {}
+    for name, sql in HOT_QUERIES.items():
+        lines = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        attendance_lines = [line for line in lines if ' attendance' in line]
+        uses_index = all(line.startswith('SEARCH') for line in attendance_lines)
+        plans[name] = (lines, uses_index)
+    return plans
+
+def print_plans(conn):
+    ok = True
+    for name, (lines, uses_index) in query_plans(conn).items():
+        print(f"{'✅' if uses_index else '❌'} {name}")
+        for line in lines:
+            print(f"     {line}")
+        ok = ok and uses_index
+    return ok
+
+def needs_migration(conn):
+    """True when the attendance table is missing a column type or an index of the model"""
+    columns = {row[1]: row[2].upper() for row in conn.execute(text("PRAGMA table_info(attendance)"))}
+    if columns.get('date') != 'DATE' or columns.get('period') != 'INTEGER':
+        return True
+    indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(attendance)"))}
+    return not {index.name for index in Attendance.__table__.indexes} <= indexes
+
+def migrate(conn):
+    """Rebuild the attendance table with the model's schema, keeping IDs"""
+    # Periods must be whole numbers ("Period 3" style values can't be converted safely)
+    bad = conn.execute(text(
+        "SELECT id, period FROM attendance WHERE CAST(CAST(period AS INTEGER) AS TEXT) != CAST(period AS TEXT)"
+    )).fetchall()
+    if bad:
+        raise SystemExit(f"❌ {len(bad)} records have a non-numeric period, e.g. {bad[:5]} - fix them and re-run")
+    
+    # Keep the earliest record of every (student, date, period)
+    removed = conn.execute(text("""
+        DELETE FROM attendance WHERE id NOT IN (
+            SELECT MIN(id) FROM attendance
+            GROUP BY student_id, substr(date, 1, 10), CAST(period AS INTEGER)
+        )
+    """)).rowcount
+    print(f"   ✓ Removed {removed} duplicate records")
+    
+    # Renaming takes the old triggers along; they are dropped with the old table
+    conn.execute(text("ALTER TABLE attendance RENAME TO attendance_old"))
+    for index in [row[1] for row in conn.execute(text("PRAGMA index_list(attendance_old)"))]:
+        if not index.startswith('sqlite_autoindex'):
+            conn.execute(text(f"DROP INDEX {index}"))
+    Attendance.__table__.create(conn)
+    copied = conn.execute(text("""
+        INSERT INTO attendance (id, student_id, date, period, status)
+        SELECT id, student_id, substr(date, 1, 10), CAST(period AS INTEGER), COALESCE(status, 'Present')
+        FROM attendance_old
+    """)).rowcount
+    conn.execute(text("DROP TABLE attendance_old"))
+    print(f"   ✓ Copied {copied} records into the new table")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=DATABASE)
+    parser.add_argument('--check-plans', action='store_true', help='Only print the query plans')
+    args = parser.parse_args()
+    
+    engine = make_engine(f'sqlite:///{args.database}')
+    
+    print("\n" + "="*70)
+    print("ATTENDANCE SCHEMA MIGRATION")
+    print("="*70)
+    
+    if not args.check_plans:
+        with engine.connect() as conn:
+            pending = needs_migration(conn)
+        if not pending:
+            print("\n✅ Attendance table is already up to date")
+        else:
+            backup = f"{args.database}.{datetime.now().strftime('%Y%m%d_%H%M%S')}.bak"
+            # Backup API rather than a file copy: in WAL mode recent commits may still be in database.db-wal
+            source, target = sqlite3.connect(args.database), sqlite3.connect(backup)
+            source.backup(target)
+            source.close()
+            target.close()
+            print(f"\n1. Backup saved to {backup}")
+            
+            print("\n2. Rebuilding attendance table...")
+            with engine.begin() as conn:
+                migrate(conn)
+            
+            print("\n3. Recreating rollup triggers...")
+            install_rollups(engine)
+            with engine.begin() as conn:
+                rebuild_rollups(conn)
+            print("   ✓ Rollups rebuilt")
+    
+    print("\nQuery plans:")
+    with engine.connect() as conn:
+        ok = print_plans(conn)
+    engine.dispose()
+    
+    print("\n" + "="*70)
+    print("✅ MIGRATION COMPLETE!" if ok else "⚠️ Some hot queries scan the attendance table")
+    print("="*70 + "\n")
+    raise SystemExit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+# recognition_pool.py
+"""
+Out-of-Process Face Recognition Workers
+- A ProcessPoolExecutor where every worker builds and warms its own model once
+- Frames travel to the workers still JPEG/PNG-encoded, embeddings come back
+- Bounded number of frames in flight: when full, callers get RecognitionBusy
+- Per-worker health statistics (frames, latency, last activity)
+"""
+
+import os
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Pool configuration (RECOGNITION_WORKERS=0 keeps recognition in the web process)
+RECOGNITION_WORKERS = int(os.environ.get('RECOGNITION_WORKERS', '0'))
+RECOGNITION_QUEUE_SIZE = int(os.environ.get('RECOGNITION_QUEUE_SIZE', '0'))  # 0 = 2 frames per worker
+RECOGNITION_TIMEOUT = 30  # Seconds a request waits for its frame
+RECOGNITION_START_TIMEOUT = 300  # Seconds start() waits for every worker to build and warm up its model
+
+class RecognitionBusy(Exception):
+    """Raised when the pool already has its maximum number of frames in flight"""
+
+# Set in each worker process by _init_worker
+_worker_warmup_seconds = None
+_start_barrier = None
+
+def warm_up_worker_model():
+    """Build the model and run one warm-up inference; returns the seconds it took"""
+    from face_utils import warm_up_model
+    return warm_up_model()
+
+def _init_worker(start_barrier, warm_up):
+    """Worker initializer: keep the pool's start barrier and warm up"""
+    global _worker_warmup_seconds, _start_barrier
+    _start_barrier = start_barrier
+    _worker_warmup_seconds = warm_up()
+
+def _worker_info(timeout):
+    """
+    Identify the worker that ran this task. Every worker waits at the barrier
+    until all of them hold one of these tasks, so each task of a round runs
+    in a different process.
+    """
+    _start_barrier.wait(timeout)
+    return os.getpid(), _worker_warmup_seconds
+
+def embed_encoded_frame(image_bytes):
+    """
+    Decode an encoded image and embed every face in it.
+    Runs inside a worker process, or in-process when the pool is disabled.
+    
+    Returns:
+        pid: Process that did the work
+        embeddings: List of L2-normalized embeddings ([] when no face found)
+        shape: Decoded frame shape, or None when the bytes are not an image
+    """
+    from face_utils import decode_frame, get_embeddings_from_image_bgr
+    
+    frame = decode_frame(image_bytes)
+    if frame is None:
+        return os.getpid(), [], None
+    
+    embeddings, _ = get_embeddings_from_image_bgr(frame)
+    return os.getpid(), embeddings, frame.shape
+
+class RecognitionPool:
+    """
+    Pool of warm recognition worker processes.
+    
+    Workers are started with the "spawn" method so none of them inherits
+    TensorFlow or OpenCV state from the web process.
+    
+    Args:
+        workers: Worker processes
+        queue_size: Frames in flight (running or queued) before embed() rejects
+        timeout: Seconds embed() waits for its frame
+        embed_fn: Picklable function run on the workers for each frame
+        warm_up: Picklable function each worker runs once at start-up
+    """
+    
+    def __init__(self, workers=RECOGNITION_WORKERS, queue_size=RECOGNITION_QUEUE_SIZE, timeout=RECOGNITION_TIMEOUT,
+                 embed_fn=embed_encoded_frame, warm_up=warm_up_worker_model):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or 2 * self.workers
+        self.timeout = timeout
+        self.embed_fn = embed_fn
+        self.warm_up = warm_up
+        
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._errors = 0
+        self._restarts = 0
+        self._stats = {}  # pid -> per-worker counters
+        self._executor = self._new_executor()
+    
+    def _new_executor(self):
+        context = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(context.Barrier(self.workers), self.warm_up)
+        )
+    
+    def start(self, timeout=RECOGNITION_START_TIMEOUT):
+        """
+        Start every worker now (instead of on first frame) and wait for the warm-up.
+        
+        One _worker_info task per worker; the tasks block each other at the
+        start barrier, so no worker can take two and each process reports.
+        
+        Returns:
+            workers: Number of distinct worker processes that reported
+        """
+        futures = [self._executor.submit(_worker_info, timeout) for _ in range(self.workers)]
+        for future in futures:
+            pid, warmup = future.result(timeout=timeout)
+            self._worker_stats(pid)['warmup_seconds'] = warmup
+        return len(self._stats)
+    
+    def _worker_stats(self, pid):
+        with self._lock:
+            return self._stats.setdefault(pid, {
+                'pid': pid,
+                'warmup_seconds': None,
+                'frames': 0,
+                'total_ms': 0.0,
+                'last_seen': None
+            })
+    
+    def embed(self, image_bytes):
+        """
+        Embed all faces of an encoded frame on a worker.
+        
+        Returns:
+            embeddings, shape: As embed_encoded_frame
+        
+        Raises:
+            RecognitionBusy: Queue full, try again later
+        
+        A frame holds its slot until the worker is done with it, also when
+        the caller stopped waiting (timeout), so a busy pool keeps rejecting.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise RecognitionBusy(f"{self.queue_size} frames already queued")
+        
+        with self._lock:
+            self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            executor, future = self._submit(image_bytes)
+        except Exception:
+            self._frame_done(None)
+            raise
+        future.add_done_callback(self._frame_done)
+        
+        try:
+            pid, embeddings, shape = future.result(timeout=self.timeout)
+            
+            stats = self._worker_stats(pid)
+            with self._lock:
+                stats['frames'] += 1
+                stats['total_ms'] += (time.perf_counter() - start) * 1000
+                stats['last_seen'] = time.time()
+            return embeddings, shape
+        except BrokenProcessPool:
+            # A worker died mid-frame; replace the pool so the next frame works
+            with self._lock:
+                self._errors += 1
+            self._restart(executor)
+            raise
+        except Exception:
+            # Timeouts and failures inside a worker (the worker itself is unknown here)
+            with self._lock:
+                self._errors += 1
+            raise
+    
+    def _submit(self, image_bytes):
+        """Queue a frame; returns (executor, future)"""
+        executor = self._executor
+        try:
+            return executor, executor.submit(self.embed_fn, image_bytes)
+        except BrokenProcessPool:
+            executor = self._restart(executor)
+            return executor, executor.submit(self.embed_fn, image_bytes)
+    
+    def _frame_done(self, future):
+        """Free the frame's slot once its worker finished (or the frame was never queued)"""
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+    
+    def _restart(self, broken):
+        """
+        Replace the broken executor, once: every frame that was in flight on it
+        fails and lands here, but only the first one restarts the pool.
+        
+        Returns:
+            executor: The current executor
+        """
+        with self._lock:
+            if self._executor is not broken:
+                return self._executor
+            self._restarts += 1
+            self._executor = self._new_executor()
+            self._stats.clear()
+            current = self._executor
+        broken.shutdown(wait=False, cancel_futures=True)
+        print("⚠️ Recognition worker died - pool restarted")
+        return current
+    
+    def health(self):
+        """Pool and per-worker statistics for the health endpoint"""
+        with self._lock:
+            workers = []
+            for stats in self._stats.values():
+                worker = dict(stats)
+                worker['avg_ms'] = round(stats['total_ms'] / stats['frames'], 1) if stats['frames'] else None
+                del worker['total_ms']
+                workers.append(worker)
+            
+            return {
+                'mode': 'process-pool',
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self._in_flight,
+                'rejected': self._rejected,
+                'errors': self._errors,
+                'restarts': self._restarts,
+                'worker_stats': workers
+            }
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
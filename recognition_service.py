@@ -0,0 +1,174 @@
+# recognition_service.py
+"""
+Face Recognition Service
+- Owns the in-memory face gallery and the per-class sub-galleries
+- Decodes camera frames for enrollment and attendance
+- Embeds attendance frames in-process or on the worker pool (recognition_pool.py)
+- Imported lazily by app.py: processes that never recognize faces never load
+  OpenCV, DeepFace or TensorFlow
+"""
+
+import base64
+import threading
+import numpy as np
+from models import SessionLocal, Student
+from embedding_store import STORE_FILENAME
+from recognition_pool import RECOGNITION_WORKERS, RecognitionPool, embed_encoded_frame
+
+# All face embeddings live in one consolidated store (see embedding_store.py)
+EMBEDDING_STORE_PATH = f"encodings/{STORE_FILENAME}"
+
+# Global face gallery of enrolled students (FaceGallery once loaded)
+ENROLLED = {}
+
+# Per-class sub-galleries used by attendance sessions, built on demand
+CLASS_GALLERIES = {}
+
+# Worker processes that run detection + embedding (None = run in this process)
+_pool = None
+_pool_lock = threading.Lock()
+
+def init_face_recognition():
+    """Build the recognition model and load all face encodings at application startup"""
+    try:
+        if RECOGNITION_WORKERS > 0:
+            started = get_pool().start()
+            print(f"✅ Started {started} recognition worker process(es)")
+        else:
+            from face_utils import warm_up_model
+            seconds = warm_up_model()
+            print(f"✅ Face recognition model warmed up in {seconds:.2f}s")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not warm up face recognition model: {e}")
+    
+    # One-time move of per-student <id>.npy files into the store (loaders only read)
+    try:
+        from embedding_store import EmbeddingStore
+        EmbeddingStore('encodings').migrate_from_files()
+    except Exception as e:
+        print(f"⚠️ Warning: Could not migrate face encodings: {e}")
+    
+    load_face_gallery()
+
+def get_pool():
+    """The recognition worker pool, created on first use (None when RECOGNITION_WORKERS=0)"""
+    global _pool
+    if RECOGNITION_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = RecognitionPool()
+    return _pool
+
+def embed_frame(image_bytes):
+    """
+    Embed every face of an encoded (JPEG/PNG) frame, on a worker process when
+    the pool is enabled.
+    
+    Returns:
+        embeddings: List of L2-normalized embeddings
+        shape: Decoded frame shape, or None when the bytes are not an image
+    
+    Raises:
+        RecognitionBusy: All worker slots are taken
+    """
+    pool = get_pool()
+    if pool is not None:
+        return pool.embed(image_bytes)
+    
+    _, embeddings, shape = embed_encoded_frame(image_bytes)
+    return embeddings, shape
+
+def health():
+    """Recognition health: worker pool statistics, or in-process mode"""
+    gallery = ENROLLED
+    status = get_pool().health() if RECOGNITION_WORKERS > 0 else {'mode': 'in-process'}
+    status['enrolled_students'] = len(gallery)
+    return status
+
+def load_face_gallery():
+    """Load all face encodings into the in-memory gallery"""
+    global ENROLLED
+    try:
+        from face_utils import load_gallery
+        from face_index import build_index
+        ENROLLED = load_gallery()
+        ENROLLED.set_index(build_index(ENROLLED))
+        CLASS_GALLERIES.clear()
+        print(f"✅ Loaded {len(ENROLLED)} enrolled students ({ENROLLED.num_samples} samples) for face recognition")
+        if ENROLLED.index is not None:
+            print(f"✅ Using {type(ENROLLED.index).__name__} for face matching")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not load face encodings: {e}")
+        ENROLLED = {}
+
+def get_gallery():
+    """Gallery of all enrolled students, loaded from the store on first use"""
+    from face_utils import FaceGallery
+    if not isinstance(ENROLLED, FaceGallery):
+        load_face_gallery()
+    return ENROLLED
+
+def update_gallery(student_id, embeddings=None):
+    """
+    Apply an enrollment (new samples) or a deletion (embeddings=None) to the
+    in-memory gallery, without rescanning the encodings folder
+    """
+    from face_utils import FaceGallery
+    if not isinstance(ENROLLED, FaceGallery):
+        # Gallery not loaded yet - get_gallery() will read the updated store
+        return
+    
+    if embeddings is None:
+        ENROLLED.remove_student(str(student_id))
+    else:
+        ENROLLED.append_samples(str(student_id), embeddings)
+    
+    # Class galleries are cheap slices of ENROLLED, rebuild them on next use
+    CLASS_GALLERIES.clear()
+
+def get_class_gallery(class_name):
+    """Face gallery with only the enrolled students of one class (cached per class)"""
+    if class_name not in CLASS_GALLERIES:
+        from face_utils import FaceGallery
+        gallery = get_gallery()
+        if not isinstance(gallery, FaceGallery):
+            gallery = FaceGallery.from_enrolled(gallery)
+        
+        db = SessionLocal()
+        try:
+            student_ids = [str(row[0]) for row in db.query(Student.id).filter(
+                Student.class_name == class_name,
+                Student.encodings_path.isnot(None)
+            ).all()]
+        finally:
+            db.close()
+        
+        CLASS_GALLERIES[class_name] = gallery.subset(student_ids)
+        print(f"✅ Built gallery for class {class_name}: {len(CLASS_GALLERIES[class_name])} students")
+    
+    return CLASS_GALLERIES[class_name]
+
+def decode_base64(image_data):
+    """Raw image bytes from a base64 string (optionally a data: URL)"""
+    image_data = image_data.split(',')[1] if ',' in image_data else image_data
+    return base64.b64decode(image_data)
+
+def decode_image(image_data, save_path=None):
+    """
+    Decode a base64 image (optionally a data: URL) into a BGR frame.
+    
+    Args:
+        image_data: Base64 string from the browser
+        save_path: Also write the decoded frame here (optional)
+    
+    Returns:
+        frame: BGR image, or None if the data is not a valid image
+    """
+    import cv2
+    
+    frame = cv2.imdecode(np.frombuffer(decode_base64(image_data), np.uint8), cv2.IMREAD_COLOR)
+    
+    if frame is not None and save_path:
+        cv2.imwrite(save_path, frame)
+    return frame
@@ -0,0 +1,387 @@
+# student_import.py
+"""
+Bulk Student Import from CSV/Excel
+- Reads a CSV or XLSX sheet of students (name, roll number, class, email)
+- Checks every roll number against the students and users tables in one query
+- Creates Student + User (login = roll number, password = roll number) pairs in
+  batched transactions; password hashes are computed on a thread pool
+- Optionally enrolls faces from a photo folder: <roll_no>/*.jpg or <roll_no>*.jpg,
+  embedded with the batched pipeline of face_utils.py and saved in one store
+  update per student
+- Used by the /students/import endpoint in app.py and as a command line tool
+
+Usage:
+    python student_import.py students.xlsx
+    python student_import.py students.csv --photos dataset/   # also enroll faces
+    python student_import.py students.csv --dry-run           # only validate
+"""
+
+import argparse
+import csv
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, insert, update, union
+from werkzeug.security import generate_password_hash
+from models import SessionLocal, Student, User
+
+BATCH_SIZE = 500           # Student + User pairs per transaction
+HASH_WORKERS = min(8, os.cpu_count() or 1)  # pbkdf2 releases the GIL, so threads hash in parallel
+PHOTO_BATCH_IMAGES = 64    # Photos decoded and embedded per model pass
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+PHOTOS_ZIP_MAX_FILES = 20000            # Members allowed in an uploaded photos ZIP
+PHOTOS_ZIP_MAX_BYTES = 2 * 1024 ** 3    # Total uncompressed size allowed (2 GB)
+ENCODINGS_FOLDER = 'encodings'
+
+# Accepted spellings of the sheet's column headers
+COLUMN_ALIASES = {
+    'name': 'name', 'student_name': 'name', 'full_name': 'name',
+    'roll_no': 'roll_no', 'roll_number': 'roll_no', 'roll': 'roll_no', 'rollno': 'roll_no',
+    'class_name': 'class_name', 'class': 'class_name',
+    'email': 'email', 'e_mail': 'email', 'email_address': 'email'
+}
+
+def _column(header):
+    key = str(header or '').strip().lower().replace('.', '').replace('-', '_').replace(' ', '_')
+    return COLUMN_ALIASES.get(key)
+
+def _cell(value):
+    """Sheet value as a stripped string (None when empty); 101.0 from Excel becomes '101'"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+def read_rows(source, filename=None):
+    """
+    Rows of a CSV or XLSX sheet as dicts with name, roll_no, class_name, email.
+    
+    Args:
+        source: File path or binary file object
+        filename: Name used to pick the format when source is a file object
+    
+    Returns:
+        rows: List of (line number, row dict) - line numbers as shown in the sheet
+    """
+    filename = filename or source
+    workbook = None
+    if str(filename).lower().endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+        # read_only streams the sheet instead of building every cell object
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        records = workbook.worksheets[0].iter_rows(values_only=True)
+    else:
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                data = f.read()
+        else:
+            data = source.read()
+        records = csv.reader(io.StringIO(data.decode('utf-8-sig')))
+    
+    header = next(records, None) or []
+    columns = [_column(h) for h in header]
+    missing = {'name', 'roll_no'} - set(columns)
+    if missing:
+        if workbook is not None:
+            workbook.close()
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))} (found: {', '.join(str(h) for h in header)})")
+    
+    rows = []
+    for line, record in enumerate(records, start=2):
+        row = {key: None for key in ('name', 'roll_no', 'class_name', 'email')}
+        for column, value in zip(columns, record):
+            if column:
+                row[column] = _cell(value)
+        if any(row.values()):
+            rows.append((line, row))
+    if workbook is not None:
+        workbook.close()
+    return rows
+
+def validate_rows(db, rows):
+    """
+    Split rows into importable ones and errors. Roll numbers are checked
+    against existing students and usernames in one query.
+    
+    Returns:
+        valid: List of row dicts
+        errors: List of {'line', 'roll_no', 'error'}
+    """
+    errors = []
+    candidates = []
+    seen = set()
+    for line, row in rows:
+        if not row['name'] or not row['roll_no']:
+            errors.append({'line': line, 'roll_no': row['roll_no'], 'error': 'Name and Roll Number are required'})
+        elif row['roll_no'] in seen:
+            errors.append({'line': line, 'roll_no': row['roll_no'], 'error': 'Roll Number repeated in the file'})
+        else:
+            seen.add(row['roll_no'])
+            candidates.append((line, row))
+    
+    existing = set()
+    if seen:
+        # Student logins use the roll number as username, so both must be free
+        existing = set(db.execute(union(
+            select(Student.roll_no).where(Student.roll_no.in_(seen)),
+            select(User.username).where(User.username.in_(seen))
+        )).scalars())
+    
+    valid = []
+    for line, row in candidates:
+        if row['roll_no'] in existing:
+            errors.append({'line': line, 'roll_no': row['roll_no'], 'error': 'Roll Number already exists'})
+        else:
+            valid.append(row)
+    errors.sort(key=lambda e: e['line'])
+    return valid, errors
+
+def insert_students(db, rows, batch_size=BATCH_SIZE, hash_workers=HASH_WORKERS, progress=None):
+    """
+    Create a Student and a student User for every row, one transaction per batch.
+    A batch that fails (e.g. a roll number registered meanwhile) is rolled back
+    and reported; the other batches are kept.
+    
+    Returns:
+        created: {roll_no: student_id}
+        errors: List of {'roll_no', 'error'} for rows of failed batches
+    """
+    created = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=hash_workers) as pool:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Default password = roll number, as in register_student
+            hashes = list(pool.map(generate_password_hash, [row['roll_no'] for row in batch]))
+            try:
+                ids = dict(db.execute(
+                    insert(Student).returning(Student.roll_no, Student.id),
+                    [{'name': r['name'], 'roll_no': r['roll_no'], 'class_name': r['class_name'], 'email': r['email']}
+                     for r in batch]
+                ).all())
+                db.execute(insert(User), [{
+                    'username': row['roll_no'],
+                    'password_hash': password_hash,
+                    'role': 'student',
+                    'student_id': ids[row['roll_no']],
+                    'email': row['email']
+                } for row, password_hash in zip(batch, hashes)])
+                db.commit()
+                created.update(ids)
+            except Exception as e:
+                db.rollback()
+                errors.extend({'roll_no': row['roll_no'], 'error': f"Batch not saved: {getattr(e, 'orig', e)}"} for row in batch)
+            if progress:
+                progress('students', min(start + batch_size, len(rows)), len(rows))
+    return created, errors
+
+def find_photos(photos_dir, roll_numbers):
+    """
+    Photo files per roll number: every image in photos_dir/<roll_no>/ and
+    images named <roll_no>.jpg / <roll_no>_2.jpg directly in photos_dir.
+    
+    A folder holding nothing but one subfolder (as ZIPs of a folder unpack) is
+    searched inside that subfolder.
+    
+    Returns:
+        photos: {roll_no: [paths]} (roll numbers without photos are left out)
+    """
+    entries = [e for e in os.listdir(photos_dir) if e != '__MACOSX']
+    if len(entries) == 1 and entries[0] not in roll_numbers and os.path.isdir(os.path.join(photos_dir, entries[0])):
+        return find_photos(os.path.join(photos_dir, entries[0]), roll_numbers)
+    
+    photos = {}
+    wanted = set(roll_numbers)
+    for entry in sorted(os.listdir(photos_dir)):
+        path = os.path.join(photos_dir, entry)
+        if os.path.isdir(path):
+            if entry in wanted:
+                files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(PHOTO_EXTENSIONS)]
+                photos.setdefault(entry, []).extend(files)
+        elif entry.lower().endswith(PHOTO_EXTENSIONS):
+            stem = os.path.splitext(entry)[0]
+            roll_no = stem if stem in wanted else stem.rsplit('_', 1)[0]
+            if roll_no in wanted:
+                photos.setdefault(roll_no, []).append(path)
+    return {roll_no: paths for roll_no, paths in photos.items() if paths}
+
+def extract_photos_zip(file, max_files=PHOTOS_ZIP_MAX_FILES, max_bytes=PHOTOS_ZIP_MAX_BYTES):
+    """
+    Unpack an uploaded ZIP of photos into a temporary folder (delete it when done).
+    
+    Raises:
+        ValueError: Not a ZIP file, or more members / uncompressed bytes than allowed
+                    (checked from the central directory before anything is written)
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise ValueError('Photos must be uploaded as a .zip file')
+    
+    with archive:
+        members = archive.infolist()
+        if len(members) > max_files:
+            raise ValueError(f'The photos ZIP has {len(members)} files (at most {max_files} allowed)')
+        # Extraction stops at each member's declared size (a larger stream fails its CRC check)
+        total = sum(member.file_size for member in members)
+        if total > max_bytes:
+            raise ValueError(f'The photos ZIP unpacks to {total / 1024 ** 2:.0f} MB '
+                             f'(at most {max_bytes / 1024 ** 2:.0f} MB allowed)')
+        
+        tmp_dir = tempfile.mkdtemp(prefix='student-photos-')
+        try:
+            archive.extractall(tmp_dir)  # member names with '..' or absolute paths are sanitized
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+    return tmp_dir
+
+def _read_image(path):
+    import cv2
+    return cv2.imread(path)
+
+def embed_photos(images):
+    """
+    Faces of each photo ([] when none is detected). Detection is enforced:
+    otherwise DeepFace returns the whole photo as a "face" when it finds none,
+    and that embedding would be enrolled.
+    """
+    from face_utils import get_embeddings_batch_from_images_bgr
+    return get_embeddings_batch_from_images_bgr(images, enforce_detection=True)
+
+def enroll_photos(db, created, photos_dir, encodings_folder=ENCODINGS_FOLDER, batch_images=PHOTO_BATCH_IMAGES,
+                  embed=None, read_image=_read_image, on_enrolled=None, progress=None):
+    """
+    Enroll the faces of newly created students from their photos.
+    
+    Args:
+        created: {roll_no: student_id} of the students to enroll
+        photos_dir: Folder laid out as described in find_photos()
+        embed: Callable(list of BGR images) -> embeddings per image (default: embed_photos)
+        on_enrolled: Callable(student_id, embeddings) after a student's samples are stored
+    
+    Returns:
+        summary: {'enrolled', 'photos', 'photos_without_face', 'students_without_face'}
+    """
+    import numpy as np
+    from embedding_store import EmbeddingStore, STORE_FILENAME
+    embed = embed or embed_photos
+    
+    photos = find_photos(photos_dir, created)
+    queue = [(roll_no, path) for roll_no, paths in photos.items() for path in paths]
+    store = EmbeddingStore(encodings_folder)
+    
+    samples = {}  # roll_no -> embeddings not stored yet
+    remaining = {roll_no: len(paths) for roll_no, paths in photos.items()}
+    enrolled = []
+    without_face = 0
+    
+    for start in range(0, len(queue), batch_images):
+        batch = queue[start:start + batch_images]
+        for (roll_no, _), embeddings in zip(batch, embed([read_image(path) for _, path in batch])):
+            if embeddings:
+                samples.setdefault(roll_no, []).extend(embeddings)
+            else:
+                without_face += 1
+            remaining[roll_no] -= 1
+            
+            # All of the student's photos are embedded - store them in one append
+            if remaining[roll_no] == 0 and roll_no in samples:
+                embeddings = np.vstack(samples.pop(roll_no))
+                store.append(created[roll_no], embeddings)
+                enrolled.append(roll_no)
+                if on_enrolled:
+                    on_enrolled(created[roll_no], embeddings)
+        if progress:
+            progress('photos', min(start + batch_images, len(queue)), len(queue))
+    
+    if enrolled:
+        db.execute(update(Student).where(Student.id.in_([created[roll_no] for roll_no in enrolled])).values(
+            encodings_path=f"{encodings_folder}/{STORE_FILENAME}"
+        ))
+        db.commit()
+    
+    return {
+        'enrolled': len(enrolled),
+        'photos': len(queue),
+        'photos_without_face': without_face,
+        'students_without_face': sorted(set(photos) - set(enrolled))
+    }
+
+def import_students(db, rows, photos_dir=None, batch_size=BATCH_SIZE, on_enrolled=None, progress=None):
+    """
+    Validate, create and optionally enroll students.
+    
+    Args:
+        rows: Output of read_rows()
+        photos_dir: Optional photo folder (see find_photos())
+        on_enrolled: Passed to enroll_photos()
+        progress: Callable(stage, done, total) with stage 'students' or 'photos'
+    
+    Returns:
+        result: {'rows', 'imported', 'errors', 'students', 'photos' (when photos_dir is given)}
+    """
+    valid, errors = validate_rows(db, rows)
+    created, failed = insert_students(db, valid, batch_size=batch_size, progress=progress)
+    result = {
+        'rows': len(rows),
+        'imported': len(created),
+        'errors': errors + failed,
+        'students': created
+    }
+    if photos_dir and created:
+        result['photos'] = enroll_photos(db, created, photos_dir, on_enrolled=on_enrolled, progress=progress)
+    return result
+
+def print_progress(stage, done, total):
+    end = '\n' if done == total else ''
+    print(f"\r   {stage}: {done}/{total}", end=end, flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sheet', help='CSV or XLSX file with name and roll number columns')
+    parser.add_argument('--photos', help='Folder of face photos per roll number')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='Only validate the sheet')
+    args = parser.parse_args()
+    
+    print("\n" + "="*70)
+    print("BULK STUDENT IMPORT")
+    print("="*70)
+    
+    rows = read_rows(args.sheet)
+    print(f"\n📄 {len(rows)} rows read from {args.sheet}")
+    
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        if args.dry_run:
+            valid, errors = validate_rows(db, rows)
+            result = {'rows': len(rows), 'imported': 0, 'errors': errors}
+            print(f"✅ {len(valid)} rows can be imported")
+        else:
+            result = import_students(db, rows, photos_dir=args.photos, batch_size=args.batch_size,
+                                     progress=print_progress)
+    finally:
+        db.close()
+    
+    for error in result['errors']:
+        print(f"   ❌ line {error.get('line', '-')}, roll {error['roll_no'] or '-'}: {error['error']}")
+    print(f"\n✅ {result['imported']} students imported, {len(result['errors'])} rows skipped "
+          f"in {time.perf_counter() - start:.1f}s")
+    if 'photos' in result:
+        photos = result['photos']
+        print(f"📸 {photos['enrolled']} students enrolled from {photos['photos']} photos "
+              f"({photos['photos_without_face']} without a detectable face)")
+    print("="*70 + "\n")
+    return 0 if not result['errors'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
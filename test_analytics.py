@@ -0,0 +1,92 @@
+"""
+Test the SQL analytics queries against a straightforward Python count
+"""
+import random
+from datetime import date
+from collections import defaultdict
+import analytics
+from attendance_rollups import install_rollups
+from models import Student, Attendance
+from testing_db import make_memory_db
+
+def make_db(with_rollups):
+    engine, Session = make_memory_db()
+    if with_rollups:
+        install_rollups(engine)
+    
+    db = Session()
+    rng = random.Random(0)
+    db.add_all([
+        Student(id=i, name=f's{i}', roll_no=f'R{i}', class_name=rng.choice(['9', '10', None]),
+                encodings_path='embeddings.npy' if i % 3 else None)
+        for i in range(1, 31)
+    ])
+    db.add_all([
+        Attendance(student_id=i, date=date(2024, 1, day), period=period,
+                   status=rng.choice(['present', 'Present', 'absent', 'Absent']))
+        for i in range(1, 26) for day in range(1, 6) for period in range(1, 4) if rng.random() < 0.8
+    ])
+    db.commit()
+    return db
+
+def expected_class_stats(db):
+    stats = defaultdict(lambda: {'students': 0, 'total_records': 0, 'present': 0, 'absent': 0})
+    records = db.query(Attendance).all()
+    for student in db.query(Student).all():
+        student_records = [r for r in records if r.student_id == student.id]
+        present = len([r for r in student_records if r.status.lower() == 'present'])
+        absent = len([r for r in student_records if r.status.lower() == 'absent'])
+        class_stats = stats[student.class_name or 'No Class']
+        class_stats['students'] += 1
+        class_stats['total_records'] += present + absent
+        class_stats['present'] += present
+        class_stats['absent'] += absent
+    return dict(stats)
+
+def test_class_stats_match_python_count():
+    for with_rollups in (False, True):
+        db = make_db(with_rollups)
+        assert analytics.rollups_installed(db) == with_rollups
+        before = analytics.class_stats(db)
+        assert before == expected_class_stats(db)
+        
+        # Records with another status are neither present nor absent
+        db.add(Attendance(student_id=1, date=date(2024, 2, 1), period=1, status='Excused'))
+        db.commit()
+        assert analytics.class_stats(db) == before == expected_class_stats(db)
+        db.close()
+
+def test_overview_totals_are_consistent():
+    db = make_db(with_rollups=True)
+    overview = analytics.overview(db)
+    
+    assert overview['total_students'] == 30
+    assert overview['enrolled_students'] == 20
+    assert overview['total_attendance_records'] == db.query(Attendance).count()
+    assert sum(s['total_records'] for s in overview['student_stats']) == overview['total_attendance_records']
+    assert sum(overview['class_present_data']) == overview['total_present']
+    assert sum(overview['period_present_data']) == overview['total_present']
+    
+    percentages = [s['percentage'] for s in overview['student_stats']]
+    assert percentages == sorted(percentages, reverse=True)
+    db.close()
+
+def test_export_rows_match_per_record_lookup():
+    db = make_db(with_rollups=False)
+    db.add(Attendance(student_id=999, date=date(2024, 1, 1), period=1, status='present'))  # deleted student
+    db.commit()
+    
+    expected = []
+    for record in db.query(Attendance).order_by(Attendance.date.desc(), Attendance.period, Attendance.id):
+        student = db.query(Student).filter_by(id=record.student_id).first()
+        if student:
+            expected.append((record.date, record.period, record.status, student.roll_no, student.name, student.class_name))
+    
+    assert [tuple(row) for row in analytics.attendance_export_rows(db, yield_per=7)] == expected
+    db.close()
+
+if __name__ == '__main__':
+    test_class_stats_match_python_count()
+    test_overview_totals_are_consistent()
+    test_export_rows_match_per_record_lookup()
+    print("✅ Analytics query tests passed")
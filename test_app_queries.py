@@ -0,0 +1,128 @@
+"""
+Test the number of SQL statements per page and the request-scoped session, against a throwaway database
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from werkzeug.security import generate_password_hash
+import models
+from models import Base, Student, User, make_engine
+
+def load_app(engine):
+    """
+    Import app with engine in place of database.db (app creates its tables
+    and rollup triggers at import) and recognition disabled.
+    """
+    original_engine = models.engine
+    original_recognition = os.environ.get('ATTENDANCE_RECOGNITION')
+    models.engine = engine
+    os.environ['ATTENDANCE_RECOGNITION'] = '0'
+    try:
+        import app
+    finally:
+        models.engine = original_engine
+        if original_recognition is None:
+            del os.environ['ATTENDANCE_RECOGNITION']
+        else:
+            os.environ['ATTENDANCE_RECOGNITION'] = original_recognition
+    return app
+
+def add_students(Session, first, last):
+    db = Session()
+    for i in range(first, last):
+        student = Student(name=f'Student {i}', roll_no=f'R{i}', class_name='10A')
+        db.add(student)
+        db.flush()
+        db.add(User(username=f'R{i}', password_hash='x', role='student', student_id=student.id))
+    db.commit()
+    db.close()
+
+def test_statements_per_page_and_session_teardown():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'app.db')}")
+        Base.metadata.create_all(engine)
+        models.SessionLocal.configure(bind=engine)
+        try:
+            app = load_app(engine)
+            Session = sessionmaker(bind=engine)
+            
+            db = Session()
+            db.add_all([
+                User(id=1, username='teacher', password_hash=generate_password_hash('x'), role='teacher'),
+                User(id=2, username='admin', password_hash=generate_password_hash('x'), role='admin')
+            ])
+            db.commit()
+            db.close()
+            
+            statements = []
+            
+            @event.listens_for(engine, 'before_cursor_execute')
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            
+            def page_statements(user_id, path):
+                app.user_cache.clear()
+                client = app.app.test_client()
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(user_id)
+                    session['_fresh'] = True
+                statements.clear()
+                response = client.get(path)
+                assert response.status_code == 200
+                
+                # The request's session was removed at teardown and its connection returned
+                assert not models.db_session.registry.has()
+                assert engine.pool.checkedout() == 0
+                return len(statements)
+            
+            add_students(Session, 0, 3)
+            few = {'/students/view': page_statements(1, '/students/view'),
+                   '/admin/users': page_statements(2, '/admin/users')}
+            
+            # load_user + students; load_user + teachers + students + their accounts (one selectin query)
+            assert few == {'/students/view': 2, '/admin/users': 4}
+            
+            # The count doesn't grow with the number of students
+            add_students(Session, 3, 40)
+            assert page_statements(1, '/students/view') == few['/students/view']
+            assert page_statements(2, '/admin/users') == few['/admin/users']
+            
+            event.remove(engine, 'before_cursor_execute', count)
+        finally:
+            models.SessionLocal.configure(bind=models.engine)
+            engine.dispose()
+
+def test_finished_import_jobs_expire():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'app.db')}")
+        try:
+            app = load_app(engine)
+            now = 1000000.0
+            app.import_jobs.update({
+                'running': {'status': 'running'},
+                'recent': {'status': 'done', 'finished_at': now - app.IMPORT_JOB_TTL + 1},
+                'old': {'status': 'error', 'finished_at': now - app.IMPORT_JOB_TTL - 1}
+            })
+            app.prune_import_jobs(now)
+            assert sorted(app.import_jobs) == ['recent', 'running']
+        finally:
+            app.import_jobs.clear()
+            engine.dispose()
+
+def test_reports_only_import_skips_numpy():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, ATTENDANCE_RECOGNITION='0', DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'app.db')}")
+        result = subprocess.run([sys.executable, '-c', "import sys, app; print('numpy' in sys.modules)"],
+                                cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().splitlines()[-1] == 'False'
+
+if __name__ == '__main__':
+    test_statements_per_page_and_session_teardown()
+    test_finished_import_jobs_expire()
+    test_reports_only_import_skips_numpy()
+    print("✅ App query tests passed")
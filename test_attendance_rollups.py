@@ -0,0 +1,104 @@
+"""
+Test that the attendance rollup triggers keep the counters in step with the attendance table
+"""
+from datetime import date
+from sqlalchemy import text
+import analytics
+from attendance_rollups import install_rollups, rebuild_rollups, rollups_match
+from attendance_writer import upsert_present, insert_absentees
+from models import Attendance, Student
+from testing_db import make_memory_db
+
+def read_counts(db, source):
+    by_student = {r.id: (r.present, r.absent) for r in analytics.student_rows(db, source) if r.present + r.absent}
+    return by_student, analytics.period_counts(db, source)
+
+def test_triggers_follow_every_write():
+    engine, Session = make_memory_db()
+    assert install_rollups(engine)
+    
+    db = Session()
+    db.add_all([
+        Student(id=i, name=f's{i}', roll_no=f'R{i}', class_name='10', encodings_path='embeddings.npy')
+        for i in range(1, 5)
+    ])
+    db.add(Attendance(student_id=1, date=date(2024, 1, 1), period=1, status='Present'))
+    db.commit()
+    
+    # Bulk paths used by live sessions
+    upsert_present(db, [2], '2024-01-01', '1')
+    insert_absentees(db, '10', '2024-01-01', '1', {1, 2})
+    db.commit()
+    upsert_present(db, [3], '2024-01-01', '1')  # absent -> present
+    db.commit()
+    
+    # ORM update and delete
+    record = db.query(Attendance).filter_by(student_id=4).one()
+    record.period = 2
+    db.commit()
+    db.query(Attendance).filter_by(student_id=1).delete()
+    db.commit()
+    
+    # Other statuses are in neither count, also when a record changes to or from one
+    db.add(Attendance(student_id=2, date=date(2024, 1, 2), period=2, status='Excused'))
+    db.add(Attendance(student_id=4, date=date(2024, 1, 2), period=1, status='Absent'))
+    db.commit()
+    db.query(Attendance).filter_by(student_id=4, period=1).one().status = 'Late'
+    db.commit()
+    
+    by_student, by_period = read_counts(db, analytics.ROLLUPS)
+    assert by_student == {2: (1, 0), 3: (1, 0), 4: (0, 1)}
+    assert by_period == {1: (2, 0), 2: (0, 1)}
+    assert read_counts(db, analytics.ATTENDANCE) == (by_student, by_period)
+    
+    with engine.begin() as conn:
+        assert rollups_match(conn)
+        before = conn.execute(text("SELECT * FROM attendance_date_totals")).fetchall()
+        rebuild_rollups(conn)
+        assert conn.execute(text("SELECT * FROM attendance_date_totals")).fetchall() == before
+    assert read_counts(db, analytics.ROLLUPS) == (by_student, by_period)
+    db.close()
+
+def test_install_rebuilds_stale_counters():
+    engine, Session = make_memory_db()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO students (id, name, roll_no) VALUES (1, 's1', 'R1')"))
+        conn.execute(text(
+            "INSERT INTO attendance (student_id, date, period, status) VALUES "
+            "(1, '2024-01-01', '1', 'present'), (1, '2024-01-02', '1', 'absent')"
+        ))
+    
+    # Rows written before the triggers existed are picked up on install
+    install_rollups(engine)
+    db = Session()
+    assert read_counts(db, analytics.ROLLUPS) == ({1: (1, 1)}, {1: (1, 1)})
+    db.close()
+    
+    # Triggers of an older definition (any non-present status counted as absent) are replaced
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER attendance_rollup_insert"))
+        conn.execute(text(
+            "CREATE TRIGGER attendance_rollup_insert AFTER INSERT ON attendance BEGIN "
+            "UPDATE attendance_student_totals SET absent = absent + 1 WHERE student_id = NEW.student_id; END"
+        ))
+        conn.execute(text("INSERT INTO attendance (student_id, date, period, status) VALUES (1, '2024-01-03', '1', 'late')"))
+        assert not rollups_match(conn)
+    install_rollups(engine)
+    db = Session()
+    assert read_counts(db, analytics.ROLLUPS) == ({1: (1, 1)}, {1: (1, 1)})
+    db.execute(text("INSERT INTO attendance (student_id, date, period, status) VALUES (1, '2024-01-04', '1', 'late')"))
+    db.commit()
+    assert read_counts(db, analytics.ROLLUPS) == ({1: (1, 1)}, {1: (1, 1)})
+    db.close()
+    
+    # Current triggers are left alone on the next start-up
+    with engine.connect() as conn:
+        schema_version = conn.execute(text("PRAGMA schema_version")).scalar()
+    install_rollups(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA schema_version")).scalar() == schema_version
+
+if __name__ == '__main__':
+    test_triggers_follow_every_write()
+    test_install_rebuilds_stale_counters()
+    print("✅ Attendance rollup tests passed")
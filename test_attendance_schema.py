@@ -0,0 +1,54 @@
+"""
+Test the attendance schema migration and the query plans of the hot queries
+"""
+from datetime import date
+from sqlalchemy import create_engine, text
+from migrate_attendance import migrate, needs_migration, query_plans
+from models import Base
+
+OLD_LAYOUT = """
+    CREATE TABLE attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        period TEXT NOT NULL,
+        status TEXT NOT NULL
+    )
+"""
+
+def test_hot_queries_use_indexes():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        assert not needs_migration(conn)
+        for name, (lines, uses_index) in query_plans(conn).items():
+            assert uses_index, (name, lines)
+
+def test_migrate_old_layout():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text(OLD_LAYOUT))
+        conn.execute(text(
+            "INSERT INTO attendance (student_id, date, period, status) VALUES "
+            "(1, '2024-01-01', '1', 'present'), (1, '2024-01-01', 1, 'absent'), "  # duplicate
+            "(2, '2024-01-01 09:00:00', '2', 'absent')"
+        ))
+        assert needs_migration(conn)
+    
+    Base.metadata.create_all(engine)  # the other tables, as the app creates them
+    with engine.begin() as conn:
+        migrate(conn)
+    
+    with engine.connect() as conn:
+        assert not needs_migration(conn)
+        rows = conn.execute(text("SELECT id, student_id, date, period, typeof(period), status FROM attendance ORDER BY id")).fetchall()
+    assert [tuple(r) for r in rows] == [
+        (1, 1, '2024-01-01', 1, 'integer', 'present'),
+        (3, 2, '2024-01-01', 2, 'integer', 'absent')
+    ]
+    assert date.fromisoformat(rows[1].date) == date(2024, 1, 1)
+
+if __name__ == '__main__':
+    test_hot_queries_use_indexes()
+    test_migrate_old_layout()
+    print("✅ Attendance schema tests passed")
@@ -0,0 +1,125 @@
+"""
+Test the attendance session manager (in-memory and database backends)
+"""
+import os
+import tempfile
+import threading
+from sqlalchemy.orm import sessionmaker
+import attendance_sessions
+from attendance_sessions import SessionManager
+from models import Base, LiveSession, make_engine
+
+def test_concurrent_teachers_are_isolated():
+    manager = SessionManager(backend='memory')
+    s1 = manager.start(1, '10', '4', '2024-01-01')
+    s2 = manager.start(2, '9', '1', '2024-01-01')
+    
+    assert s1.id != s2.id
+    assert manager.lookup(1) is s1 and manager.lookup(2) is s2
+    
+    # A teacher cannot reach another teacher's session by ID
+    assert manager.lookup(1, s2.id) is None
+    
+    assert manager.mark(s1, [5, 6]) == {5, 6}
+    assert manager.mark(s1, [6, 7]) == {7}
+    assert s2.marked_students == set()
+    
+    assert manager.end(s1) == {5, 6, 7}
+    assert manager.lookup(1) is None
+    assert manager.lookup(2) is s2
+
+def test_restart_replaces_teachers_session():
+    manager = SessionManager(backend='memory')
+    old = manager.start(1, '10', '4', '2024-01-01')
+    new = manager.start(1, '10', '5', '2024-01-01')
+    
+    assert manager.get(old.id) is None
+    assert manager.lookup(1) is new
+    assert len(manager.active()) == 1
+
+def test_mark_is_thread_safe():
+    manager = SessionManager(backend='memory')
+    session = manager.start(1, '10', '4', '2024-01-01')
+    newly_marked = []
+    
+    def worker():
+        newly_marked.extend(manager.mark(session, range(100)))
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    # Every student is reported as new exactly once
+    assert sorted(newly_marked) == list(range(100))
+
+def test_concurrent_starts_leave_one_session():
+    manager = SessionManager(backend='memory')
+    started = []
+    barrier = threading.Barrier(8)
+    
+    def worker(period):
+        barrier.wait()
+        started.append(manager.start(1, '10', str(period), '2024-01-01'))
+    
+    threads = [threading.Thread(target=worker, args=(p,)) for p in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    # Each start replaced the previous one; only the last survives
+    assert manager.active() == [manager.lookup(1)]
+    assert manager.lookup(1) is started[-1]
+
+def test_database_backend_shared_by_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'sessions.db')}")
+        Base.metadata.create_all(engine)
+        original = attendance_sessions.SessionLocal
+        attendance_sessions.SessionLocal = sessionmaker(bind=engine)
+        try:
+            # Two managers stand in for two worker processes
+            web1, web2 = SessionManager(backend='database'), SessionManager(backend='database')
+            session = web1.start(1, '10', 4, '2024-01-01')
+            
+            # The other process finds the session by ID and by teacher
+            other = web2.lookup(1, session.id)
+            assert other is not None and other is not session
+            assert (other.class_name, other.period) == ('10', 4)
+            assert web2.lookup(1) is other and web2.lookup(2, session.id) is None
+            
+            # Marks are shared: each student is new once across processes
+            assert web1.mark(session, [5, 6]) == {5, 6}
+            assert web2.mark(other, [6, 7]) == {7}
+            
+            # A restart in the other process ends the session for both
+            new = web2.start(1, '10', 5, '2024-01-01')
+            assert web1.lookup(1, session.id) is None
+            assert web1.lookup(1).id == new.id
+            
+            threads = [threading.Thread(target=web1.start, args=(1, '10', p, '2024-01-01')) for p in range(6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            db = attendance_sessions.SessionLocal()
+            try:
+                assert db.query(LiveSession).filter_by(teacher_id=1).count() == 1
+            finally:
+                db.close()
+            
+            assert web1.end(web1.lookup(1)) == set()
+            assert web1.lookup(1) is None and web2.lookup(1) is None
+        finally:
+            attendance_sessions.SessionLocal = original
+            engine.dispose()
+
+if __name__ == '__main__':
+    test_concurrent_teachers_are_isolated()
+    test_restart_replaces_teachers_session()
+    test_mark_is_thread_safe()
+    test_concurrent_starts_leave_one_session()
+    test_database_backend_shared_by_processes()
+    print("✅ Session manager tests passed")
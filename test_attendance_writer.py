@@ -0,0 +1,99 @@
+"""
+Test the write-behind attendance buffer against a throwaway in-memory database
+"""
+import time
+from datetime import date
+import attendance_writer
+from models import Attendance, Student
+from testing_db import make_memory_db
+
+def statuses(Session):
+    db = Session()
+    try:
+        return {a.student_id: a.status for a in db.query(Attendance).all()}
+    finally:
+        db.close()
+
+def test_upsert_only_upgrades_absent():
+    _, Session = make_memory_db()
+    db = Session()
+    db.add_all([
+        Attendance(student_id=1, date=date(2024, 1, 1), period=4, status='absent'),
+        Attendance(student_id=2, date=date(2024, 1, 1), period=4, status='present')
+    ])
+    db.commit()
+    
+    attendance_writer.upsert_present(db, [1, 2, 3], '2024-01-01', '4')
+    db.commit()
+    db.close()
+    
+    assert statuses(Session) == {1: 'present', 2: 'present', 3: 'present'}
+
+def test_insert_absentees_skips_seen_and_recorded():
+    _, Session = make_memory_db()
+    db = Session()
+    db.add_all([
+        Student(id=i, name=f's{i}', roll_no=f'R{i}', class_name='10', encodings_path='embeddings.npy')
+        for i in range(1, 6)
+    ])
+    db.add_all([
+        Student(id=6, name='not enrolled', roll_no='R6', class_name='10'),
+        Student(id=7, name='other class', roll_no='R7', class_name='9', encodings_path='embeddings.npy'),
+        Attendance(student_id=2, date=date(2024, 1, 1), period=4, status='present'),
+        Attendance(student_id=3, date=date(2024, 1, 1), period=4, status='absent')
+    ])
+    db.commit()
+    
+    # 1 was seen in the session, 2 and 3 already have records
+    assert attendance_writer.insert_absentees(db, '10', '2024-01-01', '4', {1}) == 2
+    db.commit()
+    assert attendance_writer.insert_absentees(db, '10', '2024-01-01', '4', {1}) == 0
+    db.commit()
+    db.close()
+    
+    assert statuses(Session) == {2: 'present', 3: 'absent', 4: 'absent', 5: 'absent'}
+
+def test_buffer_batches_and_flushes_on_close():
+    _, Session = make_memory_db()
+    original = attendance_writer.SessionLocal
+    attendance_writer.SessionLocal = Session
+    try:
+        # Interval long enough that only close() can flush
+        buffer = attendance_writer.AttendanceWriteBuffer('2024-01-01', '4', flush_interval_ms=60000)
+        buffer.add([1, 2])
+        buffer.add([2, 3])
+        assert buffer.state()['pending'] == 3
+        assert statuses(Session) == {}
+        
+        state = buffer.close()
+        assert state['pending'] == 0 and state['durable'] == 3 and state['flushes'] == 1
+        assert statuses(Session) == {1: 'present', 2: 'present', 3: 'present'}
+        
+        # Late recognitions after close are still written
+        buffer.add([4])
+        assert 4 in statuses(Session)
+    finally:
+        attendance_writer.SessionLocal = original
+
+def test_buffer_flushes_when_full():
+    _, Session = make_memory_db()
+    original = attendance_writer.SessionLocal
+    attendance_writer.SessionLocal = Session
+    try:
+        buffer = attendance_writer.AttendanceWriteBuffer('2024-01-01', '4', flush_interval_ms=60000, max_events=5)
+        buffer.add(range(5))
+        for _ in range(100):
+            if buffer.state()['durable'] == 5:
+                break
+            time.sleep(0.02)
+        assert len(statuses(Session)) == 5
+        buffer.close()
+    finally:
+        attendance_writer.SessionLocal = original
+
+if __name__ == '__main__':
+    test_upsert_only_upgrades_absent()
+    test_insert_absentees_skips_seen_and_recorded()
+    test_buffer_batches_and_flushes_on_close()
+    test_buffer_flushes_when_full()
+    print("✅ Attendance write buffer tests passed")
@@ -0,0 +1,36 @@
+"""
+Test the chunked CSV generator used by the report downloads
+"""
+import csv
+from io import StringIO
+from csv_stream import iter_csv
+
+def test_chunks_join_to_regular_csv():
+    rows = [['Roll Number', 'Student Name']] + [[f'R{i}', f'Name, "{i}"'] for i in range(1234)]
+    
+    expected = StringIO()
+    csv.writer(expected).writerows(rows)
+    
+    chunks = list(iter_csv(iter(rows), chunk_rows=500))
+    assert ''.join(chunks) == expected.getvalue()
+    
+    # Header alone first, then full chunks, then the remainder
+    assert chunks[0] == 'Roll Number,Student Name\r\n'
+    assert [c.count('\r\n') for c in chunks] == [1, 500, 500, 234]
+
+def test_generator_is_consumed_lazily():
+    consumed = []
+    
+    def rows():
+        for i in range(10):
+            consumed.append(i)
+            yield [i]
+    
+    stream = iter_csv(rows(), chunk_rows=5)
+    next(stream)
+    assert consumed == [0]
+
+if __name__ == '__main__':
+    test_chunks_join_to_regular_csv()
+    test_generator_is_consumed_lazily()
+    print("✅ CSV stream tests passed")
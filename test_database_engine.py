@@ -0,0 +1,36 @@
+"""
+Test the SQLite engine profile of models.make_engine
+"""
+import os
+import tempfile
+from sqlalchemy import text
+from models import make_engine, SQLITE_PRAGMAS
+
+def test_pragmas_applied_to_every_connection():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'test.db')}", pool_size=2, max_overflow=0)
+        connections = [engine.connect(), engine.connect()]
+        for conn in connections:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == SQLITE_PRAGMAS['busy_timeout']
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == SQLITE_PRAGMAS['cache_size']
+        for conn in connections:
+            conn.close()
+        assert engine.pool.size() == 2
+        engine.dispose()
+
+def test_in_memory_engine_shares_one_database():
+    engine = make_engine('sqlite://', pragmas={'busy_timeout': 1000})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1000
+    engine.dispose()
+
+if __name__ == '__main__':
+    test_pragmas_applied_to_every_connection()
+    test_in_memory_engine_shares_one_database()
+    print("✅ Database engine tests passed")
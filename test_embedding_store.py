@@ -0,0 +1,127 @@
+"""
+Test the consolidated embedding store: appends, migration, deletes and mmap loading
+"""
+import os
+import shutil
+import tempfile
+import numpy as np
+from embedding_store import EmbeddingStore, MIGRATED_FOLDER
+from face_utils import FaceGallery, load_all_enrollments, remove_student_embeddings
+
+def is_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+def normalized(rows, dim=64, seed=0):
+    embs = np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+    return embs / np.linalg.norm(embs, axis=1, keepdims=True)
+
+def test_append_and_load():
+    folder = tempfile.mkdtemp()
+    try:
+        store = EmbeddingStore(folder)
+        a, b = normalized(15, seed=1), normalized(15, seed=2)
+        
+        # One sample at a time, like a webcam enrollment
+        for emb in a:
+            store.append('5', emb)
+        store.append('6', b)
+        store.append('5', normalized(2, seed=3))
+        
+        matrix, index = store.load()
+        assert isinstance(matrix, np.memmap)
+        assert matrix.shape == (32, 64)
+        assert index['students']['5'] == [[i, 1] for i in range(15)] + [[30, 2]]
+        
+        enrolled = store.as_dict()
+        assert np.allclose(enrolled['5'][:15], a, atol=1e-6)
+        assert np.allclose(enrolled['6'], b, atol=1e-6)
+        
+        # Loading a gallery gathers the segments in memory and leaves the store as it is
+        gallery = FaceGallery.from_store(store)
+        assert not store.is_compact()
+        assert gallery.num_samples == 32
+        assert gallery.match(b[4], threshold=0.9)[0] == '6'
+    finally:
+        shutil.rmtree(folder)
+
+def test_header_growth_keeps_data():
+    folder = tempfile.mkdtemp()
+    try:
+        store = EmbeddingStore(folder)
+        data = normalized(1200, dim=8)
+        for start in range(0, 1200, 7):
+            store.append(str(start % 5), data[start:start + 7])
+        
+        matrix = np.load(store.store_path)
+        _, index = store.load()
+        assert len(matrix) == index['rows'] == 1200
+        assert np.allclose(np.sort(matrix, axis=0), np.sort(data, axis=0), atol=1e-6)
+    finally:
+        shutil.rmtree(folder)
+
+def test_append_while_gallery_alive():
+    folder = tempfile.mkdtemp()
+    try:
+        store = EmbeddingStore(folder)
+        a = normalized(10, dim=8, seed=1)
+        store.append('5', a)
+        gallery = FaceGallery.from_store(store)
+        other = FaceGallery.from_store(EmbeddingStore(folder))
+        assert is_mapped(gallery.matrix) and is_mapped(other.matrix)
+        
+        # The first write copies every live gallery of the file into memory
+        store.append('6', normalized(7, dim=8))
+        assert not is_mapped(gallery.matrix) and not is_mapped(other.matrix)
+        assert np.allclose(gallery.matrix, a, atol=1e-6)
+        
+        # In-place appends, a header rewrite (file replaced) and a compaction under a live gallery
+        for start in range(0, 1200, 7):
+            store.append('6', normalized(7, dim=8, seed=start))
+        store.remove('6')
+        assert store.load()[0].shape[0] == 10
+        
+        assert gallery.num_samples == 10
+        assert gallery.match(a[3], threshold=0.9)[0] == '5'
+    finally:
+        shutil.rmtree(folder)
+
+def test_migration_and_remove():
+    folder = tempfile.mkdtemp()
+    try:
+        np.save(os.path.join(folder, '5.npy'), normalized(15, seed=1) * 3)
+        np.save(os.path.join(folder, '6.npy'), normalized(15, seed=2))
+        
+        # Loading reads the legacy files without moving them
+        enrolled = load_all_enrollments(folder)
+        assert sorted(enrolled) == ['5', '6']
+        assert np.allclose(np.linalg.norm(enrolled['5'], axis=1), 1.0, atol=1e-5)
+        assert sorted(os.listdir(folder)) == ['5.npy', '6.npy']
+        
+        assert EmbeddingStore(folder).migrate_from_files() == 2
+        assert sorted(os.listdir(os.path.join(folder, MIGRATED_FOLDER))) == ['5.npy', '6.npy']
+        assert np.allclose(load_all_enrollments(folder)['5'], enrolled['5'], atol=1e-6)
+        
+        # A second run doesn't migrate anything again
+        assert EmbeddingStore(folder).migrate_from_files() == 0
+        
+        assert remove_student_embeddings('5', folder)
+        assert not remove_student_embeddings('5', folder)
+        assert sorted(load_all_enrollments(folder)) == ['6']
+        
+        # Removing most rows triggers compaction
+        store = EmbeddingStore(folder)
+        store.remove('6')
+        assert store.load()[0].shape[0] == 0
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    test_append_and_load()
+    test_header_growth_keeps_data()
+    test_append_while_gallery_alive()
+    test_migration_and_remove()
+    print("✅ Embedding store tests passed")
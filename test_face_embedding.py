@@ -0,0 +1,115 @@
+"""
+Test batched face embedding with a stub model and detector (no DeepFace/TensorFlow needed)
+"""
+import sys
+import types
+import threading
+import contextlib
+import numpy as np
+import face_utils
+
+class StubModel:
+    """Records every predict() call; the embedding of a crop is its first 8 pixel values"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def predict(self, batch, batch_size=None, verbose=0):
+        self.calls.append(batch.shape)
+        return batch.reshape(len(batch), -1)[:, :8] + 1.0
+
+def stub_extract_faces(bgr_image, enforce_detection=False):
+    """The image's first pixel value is its number of faces (negative raises)"""
+    count = int(bgr_image[0, 0, 0])
+    if count < 0:
+        raise ValueError("Face could not be detected.")
+    return [[np.full((1, 4, 4, 3), count * 10 + i, dtype=np.float32), {'x': i, 'y': 0, 'w': 4, 'h': 4}, 0.9]
+            for i in range(count)]
+
+def image(faces):
+    return np.full((4, 4, 3), faces, dtype=np.int8)
+
+@contextlib.contextmanager
+def stub_deepface(model):
+    """Swap DeepFace and the face detector for stubs; yields the list of model builds"""
+    builds = []
+    
+    def build_model(name):
+        builds.append(name)
+        return model
+    
+    deepface = types.ModuleType('deepface')
+    deepface.DeepFace = types.SimpleNamespace(build_model=build_model)
+    commons = types.ModuleType('deepface.commons')
+    commons.functions = types.SimpleNamespace(normalize_input=lambda img, normalization="base": img)
+    detectors = types.ModuleType('deepface.detectors')
+    detectors.FaceDetector = types.SimpleNamespace(build_model=lambda backend: None)
+    modules = {'deepface': deepface, 'deepface.commons': commons, 'deepface.detectors': detectors}
+    
+    saved_modules = {name: sys.modules.get(name) for name in modules}
+    saved_extract = face_utils._extract_faces
+    sys.modules.update(modules)
+    face_utils._extract_faces = stub_extract_faces
+    face_utils._model = None
+    try:
+        yield builds
+    finally:
+        for name, module in saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        face_utils._extract_faces = saved_extract
+        face_utils._model = None
+
+def test_one_predict_per_batch():
+    model = StubModel()
+    with stub_deepface(model):
+        images = [image(2), None, image(0), image(1), image(-1)]
+        embeddings = face_utils.get_embeddings_batch_from_images_bgr(images)
+        
+        # All 3 crops of all images go through the model together
+        assert model.calls == [(3, 4, 4, 3)]
+        assert [len(embs) for embs in embeddings] == [2, 0, 0, 1, 0]
+        assert np.allclose([np.linalg.norm(e) for e in embeddings[0] + embeddings[3]], 1.0)
+        assert np.allclose(embeddings[0][1], face_utils._normalize_rows(np.full((1, 8), 22.0))[0])
+        
+        # Every face of a single image is embedded in one call as well
+        embs, faces = face_utils.get_embeddings_from_image_bgr(image(3))
+        assert model.calls[1:] == [(3, 4, 4, 3)]
+        assert len(embs) == 3 and [f['facial_area']['x'] for f in faces] == [0, 1, 2]
+        
+        # No face at all: no model call
+        assert face_utils.get_embeddings_batch_from_images_bgr([image(0), None]) == [[], []]
+        assert len(model.calls) == 2
+
+def test_model_built_once():
+    model = StubModel()
+    with stub_deepface(model) as builds:
+        # Warm-up builds the model and runs one inference on a blank frame,
+        # which DeepFace's detector returns whole when it finds no face
+        face_utils._extract_faces = lambda bgr_image, enforce_detection=False: [
+            [np.zeros((1, 4, 4, 3), dtype=np.float32), {'x': 0, 'y': 0, 'w': 640, 'h': 480}, 0]
+        ]
+        assert face_utils.warm_up_model() >= 0
+        face_utils._extract_faces = stub_extract_faces
+        assert builds == [face_utils.MODEL_NAME] and len(model.calls) == 1
+        
+        for _ in range(3):
+            face_utils.get_embeddings_batch_from_images_bgr([image(1), image(2)])
+            face_utils.get_embeddings_from_image_bgr(image(1))
+        assert len(model.calls) == 1 + 6
+        
+        # Concurrent first use without a warm-up still builds a single model
+        face_utils._model = None
+        threads = [threading.Thread(target=face_utils.get_model) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(builds) == 2 and face_utils.get_model() is model
+
+if __name__ == '__main__':
+    test_one_predict_per_batch()
+    test_model_built_once()
+    print("✅ Face embedding tests passed")
@@ -0,0 +1,134 @@
+"""
+Test the vectorized FaceGallery matcher against the original per-sample loop
+"""
+import numpy as np
+from face_utils import FaceGallery, match_embedding_to_db, match_embeddings_batch, cosine_similarity
+
+def loop_match(query_emb, enrolled_dict, threshold):
+    """Reference implementation: compare the query with every sample one by one"""
+    best_id = None
+    best_score = -1.0
+    for student_id, embeddings in enrolled_dict.items():
+        for enrolled_emb in embeddings.reshape(-1, embeddings.shape[-1]):
+            score = float(cosine_similarity(query_emb, enrolled_emb))
+            if score > best_score:
+                best_score = score
+                best_id = student_id
+    if best_score >= threshold:
+        return best_id, best_score
+    return None, best_score
+
+def make_enrolled(num_students=50, samples=15, dim=128, seed=0):
+    rng = np.random.default_rng(seed)
+    enrolled = {}
+    for i in range(num_students):
+        center = rng.normal(size=dim)
+        embs = center + 0.3 * rng.normal(size=(samples, dim))
+        enrolled[str(i)] = (embs / np.linalg.norm(embs, axis=1, keepdims=True)).astype(np.float32)
+    return enrolled
+
+def test_gallery_matches_loop():
+    enrolled = make_enrolled()
+    gallery = FaceGallery.from_enrolled(enrolled)
+    rng = np.random.default_rng(1)
+    
+    assert len(gallery) == 50
+    assert gallery.num_samples == 50 * 15
+    assert gallery.matrix.dtype == np.float32
+    
+    for _ in range(20):
+        student_id = str(rng.integers(50))
+        query = enrolled[student_id][0] + 0.1 * rng.normal(size=128)
+        
+        expected_id, expected_score = loop_match(query, enrolled, threshold=0.6)
+        got_id, got_score = gallery.match(query, threshold=0.6)
+        
+        assert got_id == expected_id
+        assert abs(got_score - expected_score) < 1e-4
+
+def test_threshold_and_dict_input():
+    enrolled = make_enrolled(num_students=5)
+    query = np.random.default_rng(2).normal(size=128)
+    
+    matched_id, score = match_embedding_to_db(query, enrolled, threshold=0.99)
+    assert matched_id is None
+    assert score < 0.99
+
+def test_batch_matches_single_and_is_one_to_one():
+    enrolled = make_enrolled()
+    gallery = FaceGallery.from_enrolled(enrolled)
+    rng = np.random.default_rng(3)
+    
+    # Three different students in the same frame
+    faces = [enrolled[s][1] + 0.1 * rng.normal(size=128) for s in ('4', '17', '33')]
+    matches = match_embeddings_batch(faces, gallery, threshold=0.6)
+    
+    assert [m[0] for m in matches] == ['4', '17', '33']
+    for face, (student_id, score) in zip(faces, matches):
+        assert abs(gallery.match(face, threshold=0.6)[1] - score) < 1e-4
+    
+    # Two near-identical faces cannot both claim the same student
+    twin = enrolled['8'][0]
+    matches = match_embeddings_batch([twin, twin + 0.01], gallery, threshold=0.6)
+    assert sum(1 for m in matches if m[0] == '8') == 1
+    
+    assert match_embeddings_batch([], gallery) == []
+
+def test_class_subset():
+    enrolled = make_enrolled()
+    gallery = FaceGallery.from_enrolled(enrolled)
+    class_gallery = gallery.subset(['3', '7', '40', 'unknown'])
+    
+    assert class_gallery.student_ids == ['3', '7', '40']
+    assert class_gallery.num_samples == 3 * 15
+    
+    # Students of the class match exactly as in the full gallery
+    query = enrolled['7'][2]
+    assert class_gallery.match(query, threshold=0.6) == gallery.match(query, threshold=0.6)
+    
+    # Students outside the class are never returned
+    assert class_gallery.match(enrolled['12'][0], threshold=0.6)[0] != '12'
+    assert len(gallery.subset([])) == 0
+
+def test_incremental_updates_match_full_rebuild():
+    enrolled = make_enrolled(num_students=20)
+    gallery = FaceGallery.from_enrolled({k: v for k, v in enrolled.items() if k != '19'})
+    
+    # Same operations on the dict, then compare with a gallery built from scratch
+    extra = make_enrolled(num_students=2, seed=9)
+    gallery.add_student('19', enrolled['19'])
+    gallery.append_samples('5', extra['0'])
+    gallery.append_samples('new', extra['1'])
+    assert gallery.remove_student('11')
+    assert not gallery.remove_student('missing')
+    
+    expected = dict(enrolled)
+    expected['5'] = np.vstack([enrolled['5'], extra['0']])
+    expected['new'] = extra['1']
+    del expected['11']
+    rebuilt = FaceGallery.from_enrolled(expected)
+    
+    assert sorted(gallery.student_ids) == sorted(rebuilt.student_ids)
+    assert gallery.num_samples == rebuilt.num_samples
+    for student_id in ('5', '19', 'new', '0'):
+        query = expected[student_id][-1]
+        assert gallery.match(query, threshold=0.6)[0] == student_id
+    assert gallery.match(enrolled['11'][0], threshold=0.6)[0] != '11'
+    
+    for student_id in list(gallery.student_ids):
+        gallery.remove_student(student_id)
+    assert len(gallery) == 0 and gallery.num_samples == 0
+
+def test_empty_gallery():
+    gallery = FaceGallery.from_enrolled({})
+    assert len(gallery) == 0
+    assert gallery.match(np.ones(128)) == (None, -1.0)
+
+if __name__ == '__main__':
+    test_gallery_matches_loop()
+    test_threshold_and_dict_input()
+    test_batch_matches_single_and_is_one_to_one()
+    test_class_subset()
+    test_incremental_updates_match_full_rebuild()
+    test_empty_gallery()
+    print("✅ FaceGallery tests passed")
@@ -0,0 +1,59 @@
+"""
+Test the ANN indexes against exact FaceGallery matching
+"""
+import numpy as np
+from face_utils import FaceGallery
+from face_index import IVFIndex, build_index
+from test_face_gallery import make_enrolled
+
+def test_ivf_full_probe_equals_exact():
+    gallery = FaceGallery.from_enrolled(make_enrolled(num_students=200))
+    queries = gallery.matrix[::37] + 0.05
+    
+    exact = [gallery.match(q, threshold=0.6) for q in queries]
+    
+    # Probing every list must give exactly the dense-scan answer
+    index = IVFIndex(gallery, nlist=16, nprobe=16)
+    gallery.set_index(index)
+    full = [gallery.match(q, threshold=0.6) for q in queries]
+    assert [r[0] for r in full] == [r[0] for r in exact]
+    assert np.allclose([r[1] for r in full], [r[1] for r in exact], atol=1e-4)
+    
+    # A partial probe should still find nearly all genuine matches
+    index.nprobe = 4
+    partial = [gallery.match(q, threshold=0.6) for q in queries]
+    recall = np.mean([p[0] == e[0] for p, e in zip(partial, exact)])
+    print(f"   IVF nprobe=4 recall: {recall:.3f}")
+    assert recall >= 0.9
+
+def test_ivf_follows_gallery_updates():
+    enrolled = make_enrolled(num_students=100)
+    gallery = FaceGallery.from_enrolled(enrolled)
+    index = IVFIndex(gallery, nlist=8, nprobe=8)
+    gallery.set_index(index)
+    
+    extra = make_enrolled(num_students=2, seed=5)
+    gallery.append_samples('10', extra['0'])
+    gallery.add_student('late', extra['1'])
+    gallery.remove_student('50')
+    
+    # Index still covers every row exactly once after the updates
+    rows = np.sort(np.concatenate(index.lists))
+    assert np.array_equal(rows, np.arange(gallery.num_samples))
+    
+    assert gallery.index is index
+    assert gallery.match(extra['0'][3], threshold=0.6)[0] == '10'
+    assert gallery.match(extra['1'][0], threshold=0.6)[0] == 'late'
+    assert gallery.match(enrolled['50'][0], threshold=0.6)[0] != '50'
+
+def test_build_index_falls_back_to_exact():
+    gallery = FaceGallery.from_enrolled(make_enrolled(num_students=10))
+    assert build_index(gallery) is None
+    assert build_index(gallery, backend="exact", min_samples=0) is None
+    assert isinstance(build_index(gallery, backend="ivf", min_samples=0), IVFIndex)
+
+if __name__ == '__main__':
+    test_ivf_full_probe_equals_exact()
+    test_ivf_follows_gallery_updates()
+    test_build_index_falls_back_to_exact()
+    print("✅ ANN index tests passed")
@@ -0,0 +1,26 @@
+"""
+Test the downscaled-detection helpers (box mapping back to the full frame)
+"""
+from face_utils import detection_scale, map_box_to_frame
+
+def test_detection_scale():
+    assert detection_scale((480, 640, 3), 640) == 1.0
+    assert detection_scale((1080, 1920, 3), 640) == 640 / 1920
+    assert detection_scale((1920, 1080, 3), 960) == 0.5
+    assert detection_scale((1080, 1920, 3), None) == 1.0
+
+def test_map_box_to_frame():
+    shape = (1080, 1920, 3)
+    scale = detection_scale(shape, 640)
+    
+    # A box on the 640x360 detection frame covers 3x the pixels on the full frame
+    assert map_box_to_frame([100, 50, 40, 40], scale, shape) == [300, 150, 120, 120]
+    
+    # Boxes touching the edge are clipped to the frame
+    assert map_box_to_frame([620, 340, 40, 40], scale, shape) == [1860, 1020, 60, 60]
+    assert map_box_to_frame([-5, -5, 20, 20], scale, shape) == [0, 0, 45, 45]
+
+if __name__ == '__main__':
+    test_detection_scale()
+    test_map_box_to_frame()
+    print("✅ Preprocessing tests passed")
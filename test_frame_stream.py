@@ -0,0 +1,93 @@
+"""
+Test the latest-frame stream with a stub recognizer (no model needed)
+"""
+import json
+import threading
+import time
+from frame_stream import FrameStream
+
+class StubRecognizer:
+    """Records the frames it was given; blocks on the first one until released"""
+    
+    def __init__(self):
+        self.frames = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    def __call__(self, frame):
+        self.frames.append(frame)
+        self.started.set()
+        self.release.wait(5)
+        return {'frame': frame.decode()}
+
+def wait_until(condition, seconds=5):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+def parse(message):
+    """SSE message -> (event type, data)"""
+    lines = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+def test_stale_frames_dropped():
+    recognizer = StubRecognizer()
+    stream = FrameStream(recognizer)
+    try:
+        stream.push(b'f1')
+        assert recognizer.started.wait(5)
+        
+        # The processor is busy with f1: each newer frame replaces the waiting one
+        for frame in (b'f2', b'f3', b'f4'):
+            assert stream.push(frame)
+        assert stream.stats()['dropped'] == 2
+        
+        recognizer.release.set()
+        wait_until(lambda: stream.processed == 2)
+        assert recognizer.frames == [b'f1', b'f4']
+        assert stream.stats() == {'received': 4, 'processed': 2, 'dropped': 2, 'subscribers': 0}
+    finally:
+        stream.close()
+
+def test_events_fan_out_to_every_subscriber():
+    recognizer = StubRecognizer()
+    recognizer.release.set()
+    stream = FrameStream(recognizer)
+    try:
+        subscribers = [stream.subscribe() for _ in range(3)]
+        for subscriber in subscribers:
+            assert next(subscriber) == 'retry: 2000\n\n'  # subscribed from here on
+        assert stream.stats()['subscribers'] == 3
+        
+        stream.push(b'f1')
+        for subscriber in subscribers:
+            event_type, data = parse(next(subscriber))
+            assert event_type == 'recognition'
+            assert data['frame'] == 'f1' and data['dropped_frames'] == 0 and 'latency_ms' in data
+    finally:
+        stream.close()
+
+def test_close_ends_subscribers():
+    stream = FrameStream(StubRecognizer())
+    subscribers = [stream.subscribe() for _ in range(2)]
+    for subscriber in subscribers:
+        next(subscriber)
+    
+    stream.close({'marked': 3})
+    for subscriber in subscribers:
+        assert parse(next(subscriber)) == ('end', {'marked': 3})
+        assert next(subscriber, None) is None  # generator finished
+    assert stream.stats()['subscribers'] == 0
+    
+    # Closed streams refuse frames, end new subscribers at once and stop their thread
+    assert not stream.push(b'late')
+    assert list(stream.subscribe()) == ['event: end\ndata: {}\n\n']
+    stream._thread.join(5)
+    assert not stream._thread.is_alive()
+
+if __name__ == '__main__':
+    test_stale_frames_dropped()
+    test_events_fan_out_to_every_subscriber()
+    test_close_ends_subscribers()
+    print("✅ Frame stream tests passed")
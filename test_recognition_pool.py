@@ -0,0 +1,118 @@
+"""
+Test the recognition worker pool with a stub embed function (no model needed)
+"""
+import os
+import time
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from recognition_pool import RecognitionPool, RecognitionBusy
+
+# Module level, so spawned workers can unpickle them
+
+def stub_warm_up():
+    return 0.25
+
+def stub_embed(image_bytes):
+    """b'sleep:<seconds>' sleeps, b'crash[:<seconds>]' kills the worker (after a delay), anything else echoes"""
+    if image_bytes.startswith(b'crash'):
+        time.sleep(float(image_bytes[6:] or 0))
+        os._exit(1)
+    if image_bytes.startswith(b'sleep:'):
+        time.sleep(float(image_bytes[6:]))
+    return os.getpid(), [image_bytes], (1, 1, 3)
+
+def wait_until(condition, seconds=10):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.05)
+
+def test_start_warms_every_worker():
+    pool = RecognitionPool(workers=3, embed_fn=stub_embed, warm_up=stub_warm_up)
+    try:
+        assert pool.start(timeout=60) == 3
+        workers = pool.health()['worker_stats']
+        assert len({w['pid'] for w in workers}) == 3
+        assert all(w['warmup_seconds'] == 0.25 for w in workers)
+    finally:
+        pool.shutdown()
+
+def test_busy_timeout_and_restart():
+    pool = RecognitionPool(workers=2, queue_size=2, timeout=0.5, embed_fn=stub_embed, warm_up=stub_warm_up)
+    try:
+        pool.start(timeout=60)
+        assert pool.embed(b'frame') == ([b'frame'], (1, 1, 3))
+        
+        # Timed-out frames keep their slot while the workers are still busy with them
+        for _ in range(2):
+            try:
+                pool.embed(b'sleep:2')
+                assert False, "expected a timeout"
+            except FutureTimeout:
+                pass
+        assert pool.health()['in_flight'] == 2
+        try:
+            pool.embed(b'frame')
+            assert False, "expected RecognitionBusy"
+        except RecognitionBusy:
+            pass
+        assert pool.health()['rejected'] == 1
+        
+        # The slots come back when the workers finish
+        wait_until(lambda: pool.health()['in_flight'] == 0)
+        assert pool.embed(b'frame')[0] == [b'frame']
+        
+        # A worker dying mid-frame restarts the pool; the next frame works
+        try:
+            pool.embed(b'crash')
+            assert False, "expected BrokenProcessPool"
+        except BrokenProcessPool:
+            pass
+        health = pool.health()
+        assert health['restarts'] == 1 and health['in_flight'] == 0
+        
+        pool.timeout = 60
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(pool.embed(b'frame'))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [([b'frame'], (1, 1, 3))] * 2
+        assert pool.health()['in_flight'] == 0
+    finally:
+        pool.shutdown()
+
+def test_one_restart_when_frames_share_a_dead_pool():
+    pool = RecognitionPool(workers=2, timeout=30, embed_fn=stub_embed, warm_up=stub_warm_up)
+    try:
+        pool.start(timeout=60)
+        errors = []
+        
+        def frame(image_bytes):
+            try:
+                pool.embed(image_bytes)
+            except Exception as e:
+                errors.append(type(e))
+        
+        # One worker dies while the other is still busy: both frames fail with the same broken pool
+        threads = [threading.Thread(target=frame, args=(b,)) for b in (b'sleep:3', b'crash:0.5')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == [BrokenProcessPool, BrokenProcessPool]
+        assert pool.health()['restarts'] == 1
+        
+        # The replacement pool was not shut down by the second failure
+        assert pool.embed(b'frame')[0] == [b'frame']
+        assert pool.health()['restarts'] == 1
+    finally:
+        pool.shutdown()
+
+if __name__ == '__main__':
+    test_start_warms_every_worker()
+    test_busy_timeout_and_restart()
+    test_one_restart_when_frames_share_a_dead_pool()
+    print("✅ Recognition pool tests passed")
@@ -0,0 +1,172 @@
+"""
+Test the bulk student import against a throwaway in-memory database
+"""
+import io
+import os
+import tempfile
+import zipfile
+import shutil
+import numpy as np
+from werkzeug.security import check_password_hash
+import face_utils
+import student_import
+from models import Student, User
+from testing_db import make_memory_db
+from embedding_store import EmbeddingStore
+
+SHEET = (
+    "Roll Number,Student Name,Class,Email\n"
+    "R1,Asha,10A,asha@example.com\n"
+    "R2,Ben,10A,\n"
+    ",No Roll,10B,\n"
+    "R1,Asha Again,10A,\n"
+    "S101,Existing,10B,\n"
+    "R3,Chen,10B,\n"
+)
+
+def make_db():
+    _, Session = make_memory_db()
+    db = Session()
+    db.add(Student(name='Demo Student', roll_no='S101', class_name='10B'))
+    db.commit()
+    return db
+
+def test_read_validate_and_insert_in_batches():
+    db = make_db()
+    rows = student_import.read_rows(io.BytesIO(SHEET.encode('utf-8-sig')), 'students.csv')
+    assert rows[0] == (2, {'name': 'Asha', 'roll_no': 'R1', 'class_name': '10A', 'email': 'asha@example.com'})
+    
+    progress = []
+    result = student_import.import_students(db, rows, batch_size=2, progress=lambda *p: progress.append(p))
+    
+    assert result['imported'] == 3
+    assert [(e['line'], e['error']) for e in result['errors']] == [
+        (4, 'Name and Roll Number are required'),
+        (5, 'Roll Number repeated in the file'),
+        (6, 'Roll Number already exists')
+    ]
+    assert progress == [('students', 2, 3), ('students', 3, 3)]
+    
+    users = {u.username: u for u in db.query(User).all()}
+    students = {s.roll_no: s for s in db.query(Student).all()}
+    assert set(users) == {'R1', 'R2', 'R3'}
+    assert users['R1'].student_id == students['R1'].id == result['students']['R1']
+    assert users['R1'].role == 'student' and users['R1'].email == 'asha@example.com'
+    assert check_password_hash(users['R2'].password_hash, 'R2')
+
+def test_read_xlsx():
+    from openpyxl import Workbook
+    workbook = Workbook()
+    workbook.active.append(['Name', 'Roll No', 'Class'])
+    workbook.active.append(['Asha', 101.0, '10A'])
+    workbook.active.append([None, None, None])
+    buf = io.BytesIO()
+    workbook.save(buf)
+    buf.seek(0)
+    
+    assert student_import.read_rows(buf, 'students.xlsx') == [
+        (2, {'name': 'Asha', 'roll_no': '101', 'class_name': '10A', 'email': None})
+    ]
+
+def test_enroll_photos_one_store_append_per_student():
+    db = make_db()
+    created, _ = student_import.insert_students(db, [
+        {'name': 'Asha', 'roll_no': 'R1', 'class_name': '10A', 'email': None},
+        {'name': 'Ben', 'roll_no': 'R2', 'class_name': '10A', 'email': None},
+        {'name': 'Chen', 'roll_no': 'R3', 'class_name': '10A', 'email': None}
+    ])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        photos = os.path.join(tmp, 'photos')
+        os.makedirs(os.path.join(photos, 'R1'))
+        for name in ('R1/a.jpg', 'R1/b.jpg', 'R2.jpg', 'R2_2.jpg', 'R3.jpg', 'X9.jpg'):
+            open(os.path.join(photos, name), 'w').close()
+        
+        # Images are their paths; only R3's photo has no face
+        def embed(images):
+            return [[] if path.endswith('R3.jpg') else [np.ones(4)] for path in images]
+        
+        encodings = os.path.join(tmp, 'encodings')
+        enrolled = []
+        # tmp holds only the photos folder, like an uploaded ZIP of a folder once unpacked
+        summary = student_import.enroll_photos(
+            db, created, tmp, encodings_folder=encodings, batch_images=3, embed=embed,
+            read_image=lambda path: path, on_enrolled=lambda sid, emb: enrolled.append((sid, len(emb)))
+        )
+        
+        assert summary == {'enrolled': 2, 'photos': 5, 'photos_without_face': 1, 'students_without_face': ['R3']}
+        assert sorted(enrolled) == [(created['R1'], 2), (created['R2'], 2)]
+        
+        index = EmbeddingStore(encodings).read_index()
+        assert index['rows'] == 4 and all(len(segments) == 1 for segments in index['students'].values())
+    
+    paths = {s.roll_no: s.encodings_path for s in db.query(Student).all()}
+    assert paths['R1'] and paths['R2'] and not paths['R3']
+
+def test_photo_without_face_not_enrolled_as_whole_image():
+    db = make_db()
+    created, _ = student_import.insert_students(db, [
+        {'name': 'Asha', 'roll_no': 'R1', 'class_name': '10A', 'email': None},
+        {'name': 'Ben', 'roll_no': 'R2', 'class_name': '10A', 'email': None}
+    ])
+    
+    # Like DeepFace: without enforce_detection, a photo with no face comes back whole (confidence 0)
+    def extract_faces(image, enforce_detection=False):
+        if image.endswith('R1.jpg'):
+            return [[np.ones((1, 4, 4, 3)), {'x': 10, 'y': 10, 'w': 50, 'h': 50}, 0.9]]
+        if enforce_detection:
+            raise ValueError("Face could not be detected.")
+        return [[np.zeros((1, 4, 4, 3)), {'x': 0, 'y': 0, 'w': 640, 'h': 480}, 0]]
+    
+    saved = face_utils._extract_faces, face_utils._embed_crops
+    face_utils._extract_faces = extract_faces
+    face_utils._embed_crops = lambda crops: np.ones((len(crops), 4)) / 2
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ('R1.jpg', 'R2.jpg'):
+                open(os.path.join(tmp, name), 'w').close()
+            summary = student_import.enroll_photos(db, created, tmp, encodings_folder=os.path.join(tmp, 'encodings'),
+                                                   read_image=lambda path: path)
+    finally:
+        face_utils._extract_faces, face_utils._embed_crops = saved
+    
+    assert summary == {'enrolled': 1, 'photos': 2, 'photos_without_face': 1, 'students_without_face': ['R2']}
+
+def test_photos_zip_limits_checked_before_extracting():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('R1/a.jpg', b'x' * 1000)
+        archive.writestr('R2.jpg', b'\0' * 100000)  # compresses to a few hundred bytes
+    
+    def extracted_dirs():
+        return {d for d in os.listdir(tempfile.gettempdir()) if d.startswith('student-photos-')}
+    
+    before = extracted_dirs()
+    for limits, message in (({'max_files': 1}, '2 files'), ({'max_bytes': 50000}, 'unpacks to')):
+        buf.seek(0)
+        try:
+            student_import.extract_photos_zip(buf, **limits)
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert message in str(e)
+    try:
+        student_import.extract_photos_zip(io.BytesIO(b'not a zip'))
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert '.zip' in str(e)
+    assert extracted_dirs() == before
+    
+    buf.seek(0)
+    tmp_dir = student_import.extract_photos_zip(buf)
+    try:
+        assert os.path.getsize(os.path.join(tmp_dir, 'R2.jpg')) == 100000
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    test_read_validate_and_insert_in_batches()
+    test_read_xlsx()
+    test_enroll_photos_one_store_append_per_student()
+    test_photo_without_face_not_enrolled_as_whole_image()
+    test_photos_zip_limits_checked_before_extracting()
+    print("✅ Student import tests passed")
@@ -0,0 +1,73 @@
+"""
+Test the TTL user cache behind Flask-Login's load_user
+"""
+from models import User
+from testing_db import make_memory_db
+from user_cache import UserCache
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def make_session():
+    _, Session = make_memory_db()
+    db = Session()
+    db.add(User(id=1, username='teacher1', password_hash='old', role='teacher'))
+    db.commit()
+    return Session
+
+def test_hits_expiry_and_invalidation():
+    Session = make_session()
+    loads = []
+    
+    def loader(user_id):
+        loads.append(user_id)
+        db = Session()
+        try:
+            return db.get(User, user_id)
+        finally:
+            db.close()
+    
+    clock = Clock()
+    cache = UserCache(loader, ttl=60, clock=clock)
+    
+    user = cache.get(1)
+    assert user.username == 'teacher1' and cache.get(1) is user
+    assert loads == [1]
+    
+    # Entries are detached copies: usable after every session is gone
+    db = Session()
+    db.get(User, 1).password_hash = 'new'
+    db.commit()
+    db.close()
+    assert cache.get(1).password_hash == 'old'
+    
+    cache.invalidate(1)
+    assert cache.get(1).password_hash == 'new'
+    assert loads == [1, 1]
+    
+    clock.now = 61
+    cache.get(1)
+    assert loads == [1, 1, 1]
+    
+    # Unknown users are not cached
+    assert cache.get(2) is None and cache.get(2) is None
+    
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['invalidations']) == (2, 5, 1)
+    assert stats['hit_rate'] == round(2 / 7, 4)
+
+def test_size_bound():
+    cache = UserCache(lambda user_id: User(id=user_id, username=f'u{user_id}', role='student'),
+                      ttl=60, max_entries=3, clock=Clock())
+    for user_id in range(10):
+        cache.get(user_id)
+    assert cache.stats()['entries'] == 3
+
+if __name__ == '__main__':
+    test_hits_expiry_and_invalidation()
+    test_size_bound()
+    print("✅ User cache tests passed")
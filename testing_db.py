@@ -0,0 +1,19 @@
+# testing_db.py
+"""
+Test Support: Throwaway Databases
+- In-memory SQLite with every table, built with the app's own engine settings
+"""
+
+from sqlalchemy.orm import sessionmaker
+from models import Base, make_engine
+
+def make_memory_db():
+    """
+    New in-memory SQLite database with every table.
+    
+    Returns:
+        engine, Session: The engine and a sessionmaker bound to it
+    """
+    engine = make_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)
@@ -0,0 +1,104 @@
+# user_cache.py
+"""
+User Cache for Flask-Login
+- load_user runs on every authenticated request (each recognize-frame poll
+  included); users are kept for a TTL instead of being read every time
+- Entries are detached copies of the user's columns, so they never expire
+  with a request's session and never lazy-load
+- Routes that change or delete a user invalidate its entry; other worker
+  processes see the change when their entry's TTL runs out
+- stats() reports hits, misses and the hit rate for monitoring
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import inspect
+
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '60'))  # seconds, 0 disables caching
+USER_CACHE_MAX_ENTRIES = 10000
+
+def detached_copy(obj):
+    """New, session-less instance of obj's class with the same column values"""
+    mapper = inspect(obj).mapper
+    return mapper.class_(**{attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs})
+
+class UserCache:
+    """
+    TTL cache of users by ID.
+    
+    Args:
+        loader: Callable(user_id) -> user or None (None is not cached)
+        ttl: Seconds an entry is served before the loader runs again
+        max_entries: Size bound; expired entries are dropped first, then the oldest
+        clock: Time source (monotonic seconds)
+    """
+    
+    def __init__(self, loader, ttl=USER_CACHE_TTL, max_entries=USER_CACHE_MAX_ENTRIES, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        
+        self._lock = threading.Lock()
+        self._entries = {}  # user_id -> (expires_at, user)
+        self._generation = 0  # bumped by invalidate() so a load racing with it isn't cached
+        
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, user_id):
+        """The cached user, or the loader's result (cached when found)"""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        
+        user = self.loader(user_id)
+        if user is None or self.ttl <= 0:
+            return user
+        
+        user = detached_copy(user)
+        with self._lock:
+            if generation != self._generation:
+                return user
+            if len(self._entries) >= self.max_entries:
+                self._evict(now)
+            self._entries[user_id] = (now + self.ttl, user)
+        return user
+    
+    def _evict(self, now):
+        for user_id in [uid for uid, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[user_id]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+    
+    def invalidate(self, *user_ids):
+        """Drop entries after the users were changed or deleted"""
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }